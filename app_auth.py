@@ -1,20 +1,28 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime, date, timedelta
 import pytz
 from streamlit_option_menu import option_menu
 from database.supabase_client import get_supabase_client
 from database.database_operations import DatabaseOperations
+from database.instrumentation import query_recorder
+from database.query_cache import query_cache
 from database.models import Property, Income, Expense, PropertyType, IncomeType, ExpenseType, Organization, UserOrganization, Budget, BudgetLine, BudgetPeriod, BudgetScope
 from llm.llm_insights import LLMInsights
 from services.geocoding import geocoding_service
+from services.recurrence import due_pending_transactions, next_due_dates
+from services.forecast import forecast_cash_flow, monthly_cash_flow
 import config
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Shown for properties missing from a bulk financial summary
+EMPTY_FINANCIAL_SUMMARY = {'total_income': 0, 'total_expenses': 0, 'net_income': 0, 'roi': 0}
+
 # Page configuration
 st.set_page_config(
     page_title="PropLedger - Rental Property Management",
@@ -1233,6 +1241,7 @@ def show_main_app():
                 "nav-link:hover": {"background-color": "#e9ecef", "color": "#1f77b4"},
             }
         )
+        query_recorder.begin_run(selected, enabled=st.session_state.get('show_query_performance', False))
         
         # Compact user info section
         if st.session_state.user:
@@ -1295,6 +1304,8 @@ def show_main_app():
             st.session_state.user = None
             st.rerun()
 
+        st.toggle("⏱️ Query performance", key="show_query_performance")
+
     # Main content based on selected page
     if selected == "Organizations Dashboard":
         # Organization selector for Organizations Dashboard
@@ -1485,8 +1496,7 @@ def show_main_app():
                                 
                                 with col2:
                                     # Get organization stats
-                                    properties = db.get_properties()
-                                    org_properties = [p for p in properties if p.organization_id == org.id]
+                                    org_properties = db.get_properties_by_organization(org.id)
 
                                 # Display metrics in organized layout
                                 st.markdown("---")
@@ -1497,15 +1507,11 @@ def show_main_app():
                                     total_value = sum(p.purchase_price for p in org_properties)
                                     total_rent = sum(p.monthly_rent for p in org_properties)
 
-                                    all_income = db.get_all_income()
-                                    all_expenses = db.get_all_expenses()
-
-                                    org_income = [inc for inc in all_income if inc.organization_id == org.id]
-                                    org_expenses = [exp for exp in all_expenses if exp.organization_id == org.id]
+                                    org_summary = db.get_organization_financial_summary(org.id)
 
-                                    total_income = sum(inc.amount for inc in org_income)
-                                    total_expenses = sum(exp.amount for exp in org_expenses)
-                                    net_income = total_income - total_expenses
+                                    total_income = org_summary['total_income']
+                                    total_expenses = org_summary['total_expenses']
+                                    net_income = org_summary['net_income']
                                     profit_margin = (net_income / total_income * 100) if total_income > 0 else 0
                                     roi = (net_income / total_value * 100) if total_value > 0 else 0
 
@@ -1537,7 +1543,7 @@ def show_main_app():
                                     st.metric("Properties", len(org_properties))
                             
                             # Add P&L Summary section
-                            if org_properties and (org_income or org_expenses):
+                            if org_properties and (total_income or total_expenses):
                                 st.markdown("---")
                                 st.markdown("### 📊 Profit & Loss Summary")
                                 
@@ -1725,17 +1731,19 @@ def show_main_app():
                 st.error("Please select an organization first.")
                 return
             
-            # Get organization name
-            org = db.get_organization_by_id(selected_org_id)
+            # Load the organization, its properties, rollup totals and only the latest
+            # transactions concurrently
+            org, org_properties, type_totals, recent_income, recent_expenses = db.gather(
+                lambda: db.get_organization_by_id(selected_org_id),
+                lambda: db.get_properties_by_organization(selected_org_id),
+                lambda: db.get_rollup_totals(selected_org_id),
+                lambda: db.get_income_by_organization(selected_org_id, limit=10),
+                lambda: db.get_expenses_by_organization(selected_org_id, limit=10)
+            )
             org_name = org.name if org else "Unknown Organization"
             
             st.info(f"Dashboard for: **{org_name}**")
             
-            # Real mode - use database with organization filtering
-            properties = db.get_properties()
-            # Filter properties by organization
-            org_properties = [p for p in properties if p.organization_id == selected_org_id]
-            
             if not org_properties:
                 st.info(f"No properties found for {org_name}. Add your first property to get started!")
                 st.markdown("### Quick Start")
@@ -1743,20 +1751,12 @@ def show_main_app():
                 st.markdown("2. Add income and expense records in their respective tabs")
                 st.markdown("3. View analytics and AI insights to optimize your portfolio")
             else:
-                # Get organization-specific financial data
-                all_income = db.get_all_income()
-                all_expenses = db.get_all_expenses()
-                
-                # Filter by organization
-                org_income = [inc for inc in all_income if inc.organization_id == selected_org_id]
-                org_expenses = [exp for exp in all_expenses if exp.organization_id == selected_org_id]
-                
                 # Calculate organization-specific financials
                 total_properties = len(org_properties)
                 total_monthly_rent = sum(prop.monthly_rent for prop in org_properties)
                 total_purchase_price = sum(prop.purchase_price for prop in org_properties)
-                total_income = sum(inc.amount for inc in org_income)
-                total_expenses = sum(exp.amount for exp in org_expenses)
+                total_income = sum(type_totals['income'].values())
+                total_expenses = sum(type_totals['expense'].values())
                 net_income = total_income - total_expenses
                 profit_margin = (net_income / total_income * 100) if total_income > 0 else 0
                 roi = (net_income / total_purchase_price * 100) if total_purchase_price > 0 else 0
@@ -1790,20 +1790,10 @@ def show_main_app():
                     st.markdown("#### 💰 Income & Expense Breakdown")
 
                     # Income breakdown
-                    income_by_type = {}
-                    for inc in org_income:
-                        income_type = inc.income_type.title()
-                        if income_type not in income_by_type:
-                            income_by_type[income_type] = 0
-                        income_by_type[income_type] += inc.amount
+                    income_by_type = {income_type.title(): amount for income_type, amount in type_totals['income'].items()}
 
                     # Expense breakdown
-                    expense_by_type = {}
-                    for exp in org_expenses:
-                        expense_type = exp.expense_type.title()
-                        if expense_type not in expense_by_type:
-                            expense_by_type[expense_type] = 0
-                        expense_by_type[expense_type] += exp.amount
+                    expense_by_type = {expense_type.title(): amount for expense_type, amount in type_totals['expense'].items()}
 
                     # Create single row layout for income and expenses
                     if income_by_type or expense_by_type:
@@ -1826,9 +1816,11 @@ def show_main_app():
                     # Get all transactions combined
                     all_transactions = []
 
+                    property_names = {p.id: p.name for p in org_properties}
+
                     # Add income transactions
-                    for inc in org_income:
-                        prop_name = next((p.name for p in org_properties if p.id == inc.property_id), "Unknown")
+                    for inc in recent_income:
+                        prop_name = property_names.get(inc.property_id, "Unknown")
                         all_transactions.append({
                             'Property': prop_name,
                             'Amount': inc.amount,
@@ -1841,8 +1833,8 @@ def show_main_app():
                         })
 
                     # Add expense transactions
-                    for exp in org_expenses:
-                        prop_name = next((p.name for p in org_properties if p.id == exp.property_id), "Unknown")
+                    for exp in recent_expenses:
+                        prop_name = property_names.get(exp.property_id, "Unknown")
                         all_transactions.append({
                             'Property': prop_name,
                             'Amount': exp.amount,
@@ -1906,14 +1898,7 @@ def show_main_app():
                     st.plotly_chart(fig, use_container_width=True)
                     
                     # Add a pie chart for income breakdown
-                    if org_income:
-                        income_by_type = {}
-                        for inc in org_income:
-                            income_type = inc.income_type.value.title()
-                            if income_type not in income_by_type:
-                                income_by_type[income_type] = 0
-                            income_by_type[income_type] += inc.amount
-                        
+                    if income_by_type or expense_by_type:
                         if income_by_type:
                             st.markdown("#### 💰 Income Breakdown")
                             pie_fig = go.Figure(data=[go.Pie(
@@ -1935,13 +1920,8 @@ def show_main_app():
                         # Add Expenses Breakdown pie chart
                         st.markdown("#### 💸 Expenses Breakdown")
                         
-                        # Calculate expenses by type
-                        expenses_by_type = {}
-                        for exp in org_expenses:
-                            expense_type = exp.expense_type.value.title()
-                            if expense_type not in expenses_by_type:
-                                expenses_by_type[expense_type] = 0
-                            expenses_by_type[expense_type] += exp.amount
+                        # Expenses by type from the rollup
+                        expenses_by_type = expense_by_type
                         
                         if expenses_by_type:
                             exp_pie_fig = go.Figure(data=[go.Pie(
@@ -1989,9 +1969,10 @@ def show_main_app():
             tab1, tab2, tab3 = st.tabs(["View Properties", "Add/Edit Property", "Managing Properties"])
 
             with tab1:
-                properties = db.get_properties()
-                # Filter properties by organization
-                org_properties = [p for p in properties if p.organization_id == selected_org_id]
+                org_properties, financial_summaries = db.gather(
+                    lambda: db.get_properties_by_organization(selected_org_id),
+                    lambda: db.get_financial_summaries(selected_org_id)
+                )
 
                 if org_properties:
                     for prop in org_properties:
@@ -2005,7 +1986,7 @@ def show_main_app():
                                 st.write(f"**Monthly Rent:** ${prop.monthly_rent:,.2f}")
 
                             with col2:
-                                financial_summary = db.get_property_financial_summary(prop.id)
+                                financial_summary = financial_summaries.get(prop.id, EMPTY_FINANCIAL_SUMMARY)
                                 st.write(f"**Total Income:** ${financial_summary['total_income']:,.2f}")
                                 st.write(f"**Total Expenses:** ${financial_summary['total_expenses']:,.2f}")
                                 st.write(f"**Net Income:** ${financial_summary['net_income']:,.2f}")
@@ -2149,8 +2130,7 @@ def show_main_app():
                 st.markdown("Manage your properties - view details, edit, or delete properties.")
                 
                 # Get properties for the organization
-                properties = db.get_properties()
-                org_properties = [p for p in properties if p.organization_id == selected_org_id]
+                org_properties = db.get_properties_by_organization(selected_org_id)
                 
                 if org_properties:
                     st.markdown(f"**Found {len(org_properties)} properties for {org_name}**")
@@ -2221,6 +2201,7 @@ def show_main_app():
                     st.markdown("---")
                     
                     # Create a more detailed property management interface
+                    financial_summaries = db.get_financial_summaries(selected_org_id)
                     for i, prop in enumerate(filtered_properties):
                         with st.container():
                             st.markdown("---")
@@ -2242,7 +2223,7 @@ def show_main_app():
                                 st.markdown(f"${prop.purchase_price:,.0f}")
                             
                             # Financial summary
-                            financial_summary = db.get_property_financial_summary(prop.id)
+                            financial_summary = financial_summaries.get(prop.id, EMPTY_FINANCIAL_SUMMARY)
                             
                             # Create columns for financial metrics
                             fin_col1, fin_col2, fin_col3, fin_col4 = st.columns(4)
@@ -2393,8 +2374,7 @@ def show_main_app():
             org_name = org.name if org else "Unknown Organization"
 
             # Get properties for this organization (used in both tabs)
-            properties = db.get_properties()
-            org_properties = [p for p in properties if p.organization_id == selected_org_id]
+            org_properties = db.get_properties_by_organization(selected_org_id)
         
         with accounting_tabs[0]:  # Income
             if is_demo_mode:
@@ -2480,7 +2460,7 @@ def show_main_app():
 
                         # Get income records based on filters
                         if selected_property_id == "All":
-                            income_records = db.get_all_income()
+                            income_records = db.get_income_by_organization(selected_org_id)
                         else:
                             income_records = db.get_income_by_property(selected_property_id)
 
@@ -2597,6 +2577,7 @@ def show_main_app():
                                             try:
                                                     # Delete the income record
                                                     success = db.client.table("income").delete().eq("id", inc.id).execute()
+                                                    db.invalidate_cache(["income"], selected_org_id)
                                                     if success.data:
                                                         st.success("Income transaction deleted successfully!")
                                                         # Clear the confirmation state
@@ -2654,6 +2635,7 @@ def show_main_app():
                                                         }
                                                     
                                                         result = db.client.table("income").update(update_data).eq("id", inc.id).execute()
+                                                        db.invalidate_cache(["income"], selected_org_id)
                                                         if result.data:
                                                             st.success("Income transaction updated successfully!")
                                                             # Clear the editing state
@@ -2843,6 +2825,7 @@ def show_main_app():
                                             }
                                         
                                             result = db.client.table("recurring_transactions").insert(recurring_data).execute()
+                                            db.invalidate_cache(["recurring_transactions"], selected_org_id)
                                             if result.data:
                                                 st.success("✅ Recurring income setup created successfully!")
                                                 st.rerun()
@@ -2899,6 +2882,7 @@ def show_main_app():
                                                         try:
                                                             # Deactivate recurring transaction
                                                             db.client.table("recurring_transactions").update({"is_active": False}).eq("id", recurring['id']).execute()
+                                                            db.invalidate_cache(["recurring_transactions"], selected_org_id)
                                                             st.success("Recurring income setup deleted successfully!")
                                                             if f"confirm_delete_recurring_income_{recurring['id']}" in st.session_state:
                                                                 del st.session_state[f"confirm_delete_recurring_income_{recurring['id']}"]
@@ -2957,6 +2941,7 @@ def show_main_app():
                                                                 }
                                                             
                                                                 result = db.client.table("recurring_transactions").update(update_data).eq("id", recurring['id']).execute()
+                                                                db.invalidate_cache(["recurring_transactions"], selected_org_id)
                                                                 if result.data:
                                                                     st.success("Recurring income updated successfully!")
                                                                     if f"editing_recurring_income_{recurring['id']}" in st.session_state:
@@ -3032,14 +3017,19 @@ def show_main_app():
                 
                     # Get pending income transactions
                     try:
-                        pending_income = db.client.table("pending_transactions").select("*").eq("organization_id", selected_org_id).eq("transaction_type", "income").eq("is_confirmed", False).execute()
+                        # Paged, so Confirm All covers every match rather than the first max-rows page
+                        pending_income = list(db.iter_rows("pending_transactions", [
+                            ("eq", "organization_id", selected_org_id),
+                            ("eq", "transaction_type", "income"),
+                            ("eq", "is_confirmed", False)
+                        ], desc=True))
                     
-                        if pending_income.data:
+                        if pending_income:
                             # Apply date filter
                             filtered_pending = []
                             current_date = datetime.now()
                         
-                            for pending in pending_income.data:
+                            for pending in pending_income:
                                 pending_date = datetime.fromisoformat(pending['transaction_date'].replace('Z', '+00:00'))
                             
                                 if date_filter_type == "Current Month":
@@ -3067,6 +3057,32 @@ def show_main_app():
                                     filtered_pending.append(pending)
                         
                             st.markdown(f"**Found {len(filtered_pending)} pending income transactions**")
+
+                            # Confirm everything matching the filters in one atomic call. The flag holds the
+                            # filters it was raised for, so changing them withdraws the confirmation.
+                            confirm_scope = (selected_org_id, date_filter_type, start_date, end_date)
+                            if st.session_state.get("confirming_all_pending_income") not in (None, confirm_scope):
+                                st.session_state.pop("confirming_all_pending_income")
+                            if filtered_pending:
+                                if st.button(f"✅ Confirm All {len(filtered_pending)}", key="confirm_all_pending_income"):
+                                    st.session_state.confirming_all_pending_income = confirm_scope
+                                    st.rerun()
+                                if st.session_state.get("confirming_all_pending_income") == confirm_scope:
+                                    st.warning(f"⚠️ This will move all {len(filtered_pending)} filtered transactions to regular income records. Continue?")
+                                    confirm_col1, confirm_col2 = st.columns(2)
+                                    with confirm_col1:
+                                        if st.button("✅ Yes, Move All", key="confirm_all_yes_pending_income", type="primary"):
+                                            st.session_state.pop("confirming_all_pending_income", None)
+                                            confirmed = db.confirm_pending_transactions([pending['id'] for pending in filtered_pending])
+                                            if confirmed:
+                                                st.success(f"Confirmed {confirmed} transactions and moved them to regular income!")
+                                                st.rerun()
+                                            else:
+                                                st.error("Failed to move transactions. Please try again.")
+                                    with confirm_col2:
+                                        if st.button("❌ Cancel", key="confirm_all_no_pending_income"):
+                                            st.session_state.pop("confirming_all_pending_income", None)
+                                            st.rerun()
                         
                             # Display pending transactions
                             for pending in filtered_pending:
@@ -3130,6 +3146,7 @@ def show_main_app():
                                                 try:
                                                     # Delete the pending transaction
                                                     db.client.table("pending_transactions").delete().eq("id", pending['id']).execute()
+                                                    db.invalidate_cache(["pending_transactions"], selected_org_id)
                                                     st.success("Pending transaction deleted successfully!")
                                                     if f"confirm_delete_pending_income_{pending['id']}" in st.session_state:
                                                         del st.session_state[f"confirm_delete_pending_income_{pending['id']}"]
@@ -3151,40 +3168,13 @@ def show_main_app():
                                     
                                         with confirm_col1:
                                             if st.button("✅ Yes, Move", key=f"confirm_yes_move_income_{pending['id']}", type="primary"):
-                                                try:
-                                                    # Move to regular income table
-                                                    # Include user_id to satisfy RLS insert policy
-                                                    current_user_id = None
-                                                    try:
-                                                        current_user_id = getattr(st.session_state.user, 'id', None)
-                                                    except Exception:
-                                                        try:
-                                                            current_user_id = st.session_state.user.get('id', None)
-                                                        except Exception:
-                                                            current_user_id = None
-                                                    income_data = {
-                                                        "user_id": current_user_id,
-                                                        "organization_id": pending['organization_id'],
-                                                        "property_id": pending['property_id'],
-                                                        "amount": pending['amount'],
-                                                        "income_type": pending['income_type'],
-                                                        "description": pending['description'],
-                                                        "transaction_date": pending['transaction_date']
-                                                    }
-                                                
-                                                    # Insert into income table
-                                                    result = db.client.table("income").insert(income_data).execute()
-                                                    if result.data:
-                                                        # Delete from pending table
-                                                        db.client.table("pending_transactions").delete().eq("id", pending['id']).execute()
-                                                        st.success("Transaction confirmed and moved to regular income!")
-                                                        if f"confirm_move_pending_income_{pending['id']}" in st.session_state:
-                                                            del st.session_state[f"confirm_move_pending_income_{pending['id']}"]
-                                                        st.rerun()
-                                                    else:
-                                                        st.error("Failed to move transaction. Please try again.")
-                                                except Exception as e:
-                                                    st.error(f"Error moving transaction: {str(e)}")
+                                                if db.confirm_pending_transaction(pending['id']):
+                                                    st.success("Transaction confirmed and moved to regular income!")
+                                                    if f"confirm_move_pending_income_{pending['id']}" in st.session_state:
+                                                        del st.session_state[f"confirm_move_pending_income_{pending['id']}"]
+                                                    st.rerun()
+                                                else:
+                                                    st.error("Failed to move transaction. Please try again.")
                                     
                                         with confirm_col2:
                                             if st.button("❌ Cancel", key=f"confirm_no_move_income_{pending['id']}"):
@@ -3235,6 +3225,7 @@ def show_main_app():
                                                         }
                                                     
                                                         result = db.client.table("pending_transactions").update(update_data).eq("id", pending['id']).execute()
+                                                        db.invalidate_cache(["pending_transactions"], selected_org_id)
                                                         if result.data:
                                                             st.success("Pending transaction updated successfully!")
                                                             if f"editing_pending_income_{pending['id']}" in st.session_state:
@@ -3344,7 +3335,7 @@ def show_main_app():
 
                     # Get expense records based on filters
                     if selected_property_id == "All":
-                        expense_records = db.get_all_expenses()
+                        expense_records = db.get_expenses_by_organization(selected_org_id)
                     else:
                         expense_records = db.get_expenses_by_property(selected_property_id)
 
@@ -3461,6 +3452,7 @@ def show_main_app():
                                                 try:
                                                     # Delete the expense record
                                                     success = db.client.table("expenses").delete().eq("id", exp.id).execute()
+                                                    db.invalidate_cache(["expenses"], selected_org_id)
                                                     if success.data:
                                                         st.success("Expense transaction deleted successfully!")
                                                         # Clear the confirmation state
@@ -3518,6 +3510,7 @@ def show_main_app():
                                                         }
                                                     
                                                         result = db.client.table("expenses").update(update_data).eq("id", exp.id).execute()
+                                                        db.invalidate_cache(["expenses"], selected_org_id)
                                                         if result.data:
                                                             st.success("Expense transaction updated successfully!")
                                                             # Clear the editing state
@@ -3707,6 +3700,7 @@ def show_main_app():
                                             }
                                         
                                             result = db.client.table("recurring_transactions").insert(recurring_data).execute()
+                                            db.invalidate_cache(["recurring_transactions"], selected_org_id)
                                             if result.data:
                                                 st.success("✅ Recurring expense setup created successfully!")
                                                 st.rerun()
@@ -3763,6 +3757,7 @@ def show_main_app():
                                                         try:
                                                             # Deactivate recurring transaction
                                                             db.client.table("recurring_transactions").update({"is_active": False}).eq("id", recurring['id']).execute()
+                                                            db.invalidate_cache(["recurring_transactions"], selected_org_id)
                                                             st.success("Recurring expense setup deleted successfully!")
                                                             if f"confirm_delete_recurring_expense_{recurring['id']}" in st.session_state:
                                                                 del st.session_state[f"confirm_delete_recurring_expense_{recurring['id']}"]
@@ -3821,6 +3816,7 @@ def show_main_app():
                                                                 }
                                                             
                                                                 result = db.client.table("recurring_transactions").update(update_data).eq("id", recurring['id']).execute()
+                                                                db.invalidate_cache(["recurring_transactions"], selected_org_id)
                                                                 if result.data:
                                                                     st.success("Recurring expense updated successfully!")
                                                                     if f"editing_recurring_expense_{recurring['id']}" in st.session_state:
@@ -3896,14 +3892,19 @@ def show_main_app():
                 
                     # Get pending expense transactions
                     try:
-                        pending_expenses = db.client.table("pending_transactions").select("*").eq("organization_id", selected_org_id).eq("transaction_type", "expense").eq("is_confirmed", False).execute()
+                        # Paged, so Confirm All covers every match rather than the first max-rows page
+                        pending_expenses = list(db.iter_rows("pending_transactions", [
+                            ("eq", "organization_id", selected_org_id),
+                            ("eq", "transaction_type", "expense"),
+                            ("eq", "is_confirmed", False)
+                        ], desc=True))
                     
-                        if pending_expenses.data:
+                        if pending_expenses:
                             # Apply date filter
                             filtered_pending = []
                             current_date = datetime.now()
                         
-                            for pending in pending_expenses.data:
+                            for pending in pending_expenses:
                                 pending_date = datetime.fromisoformat(pending['transaction_date'].replace('Z', '+00:00'))
                             
                                 if date_filter_type == "Current Month":
@@ -3931,6 +3932,32 @@ def show_main_app():
                                     filtered_pending.append(pending)
                         
                             st.markdown(f"**Found {len(filtered_pending)} pending expense transactions**")
+
+                            # Confirm everything matching the filters in one atomic call. The flag holds the
+                            # filters it was raised for, so changing them withdraws the confirmation.
+                            confirm_scope = (selected_org_id, date_filter_type, start_date, end_date)
+                            if st.session_state.get("confirming_all_pending_expense") not in (None, confirm_scope):
+                                st.session_state.pop("confirming_all_pending_expense")
+                            if filtered_pending:
+                                if st.button(f"✅ Confirm All {len(filtered_pending)}", key="confirm_all_pending_expense"):
+                                    st.session_state.confirming_all_pending_expense = confirm_scope
+                                    st.rerun()
+                                if st.session_state.get("confirming_all_pending_expense") == confirm_scope:
+                                    st.warning(f"⚠️ This will move all {len(filtered_pending)} filtered transactions to regular expenses records. Continue?")
+                                    confirm_col1, confirm_col2 = st.columns(2)
+                                    with confirm_col1:
+                                        if st.button("✅ Yes, Move All", key="confirm_all_yes_pending_expense", type="primary"):
+                                            st.session_state.pop("confirming_all_pending_expense", None)
+                                            confirmed = db.confirm_pending_transactions([pending['id'] for pending in filtered_pending])
+                                            if confirmed:
+                                                st.success(f"Confirmed {confirmed} transactions and moved them to regular expenses!")
+                                                st.rerun()
+                                            else:
+                                                st.error("Failed to move transactions. Please try again.")
+                                    with confirm_col2:
+                                        if st.button("❌ Cancel", key="confirm_all_no_pending_expense"):
+                                            st.session_state.pop("confirming_all_pending_expense", None)
+                                            st.rerun()
                         
                             # Display pending transactions
                             for pending in filtered_pending:
@@ -3993,6 +4020,7 @@ def show_main_app():
                                                 try:
                                                     # Delete the pending transaction
                                                     db.client.table("pending_transactions").delete().eq("id", pending['id']).execute()
+                                                    db.invalidate_cache(["pending_transactions"], selected_org_id)
                                                     st.success("Pending transaction deleted successfully!")
                                                     if f"confirm_delete_pending_expense_{pending['id']}" in st.session_state:
                                                         del st.session_state[f"confirm_delete_pending_expense_{pending['id']}"]
@@ -4014,40 +4042,13 @@ def show_main_app():
                                     
                                         with confirm_col1:
                                             if st.button("✅ Yes, Move", key=f"confirm_yes_move_expense_{pending['id']}", type="primary"):
-                                                try:
-                                                    # Move to regular expense table
-                                                    # Include user_id to satisfy RLS insert policy
-                                                    current_user_id = None
-                                                    try:
-                                                        current_user_id = getattr(st.session_state.user, 'id', None)
-                                                    except Exception:
-                                                        try:
-                                                            current_user_id = st.session_state.user.get('id', None)
-                                                        except Exception:
-                                                            current_user_id = None
-                                                    expense_data = {
-                                                        "user_id": current_user_id,
-                                                        "organization_id": pending['organization_id'],
-                                                        "property_id": pending['property_id'],
-                                                        "amount": pending['amount'],
-                                                        "expense_type": pending['expense_type'],
-                                                        "description": pending['description'],
-                                                        "transaction_date": pending['transaction_date']
-                                                    }
-                                                
-                                                    # Insert into expense table
-                                                    result = db.client.table("expenses").insert(expense_data).execute()
-                                                    if result.data:
-                                                        # Delete from pending table
-                                                        db.client.table("pending_transactions").delete().eq("id", pending['id']).execute()
-                                                        st.success("Transaction confirmed and moved to regular expenses!")
-                                                        if f"confirm_move_pending_expense_{pending['id']}" in st.session_state:
-                                                            del st.session_state[f"confirm_move_pending_expense_{pending['id']}"]
-                                                        st.rerun()
-                                                    else:
-                                                        st.error("Failed to move transaction. Please try again.")
-                                                except Exception as e:
-                                                    st.error(f"Error moving transaction: {str(e)}")
+                                                if db.confirm_pending_transaction(pending['id']):
+                                                    st.success("Transaction confirmed and moved to regular expenses!")
+                                                    if f"confirm_move_pending_expense_{pending['id']}" in st.session_state:
+                                                        del st.session_state[f"confirm_move_pending_expense_{pending['id']}"]
+                                                    st.rerun()
+                                                else:
+                                                    st.error("Failed to move transaction. Please try again.")
                                     
                                         with confirm_col2:
                                             if st.button("❌ Cancel", key=f"confirm_no_move_expense_{pending['id']}"):
@@ -4098,6 +4099,7 @@ def show_main_app():
                                                         }
                                                     
                                                         result = db.client.table("pending_transactions").update(update_data).eq("id", pending['id']).execute()
+                                                        db.invalidate_cache(["pending_transactions"], selected_org_id)
                                                         if result.data:
                                                             st.success("Pending transaction updated successfully!")
                                                             if f"editing_pending_expense_{pending['id']}" in st.session_state:
@@ -4798,19 +4800,17 @@ def show_main_app():
             
             # Real analytics for selected organization
             # Fetch data
-            income_result = db.supabase.table("income").select("*").eq("organization_id", selected_org_id).order("transaction_date").execute()
-            expense_result = db.supabase.table("expenses").select("*").eq("organization_id", selected_org_id).order("transaction_date").execute()
-            properties_result = db.supabase.table("properties").select("*").eq("organization_id", selected_org_id).execute()
-
-            income_rows = income_result.data or []
-            expense_rows = expense_result.data or []
-            properties = properties_result.data or []
-
-            inc_df = pd.DataFrame(income_rows)
-            exp_df = pd.DataFrame(expense_rows)
+            properties, inc_df, exp_df, recurring_rules = db.gather(
+                lambda: list(db.iter_rows_by_id("properties", [("eq", "organization_id", selected_org_id)])),
+                lambda: db.get_income_frame(selected_org_id),
+                lambda: db.get_expenses_frame(selected_org_id),
+                lambda: db.get_recurring_transactions_by_organization(selected_org_id)
+            )
 
             if inc_df.empty and exp_df.empty:
                 st.info("No financial data found for this organization.")
+                # The forecast only needs the recurring rules, so a new organization still gets it
+                show_cash_flow_forecast(recurring_rules, properties)
                 return
 
             # Calculate metrics
@@ -4819,16 +4819,18 @@ def show_main_app():
             net_profit = total_income - total_expenses
 
             # Calculate deltas (compare current month to previous month)
-            current_month = datetime.now().strftime('%Y-%m')
-            prev_month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+            current_month = pd.Period(datetime.now(), freq='M')
+            prev_month = current_month - 1
+            inc_months = inc_df['transaction_date'].dt.to_period('M')
+            exp_months = exp_df['transaction_date'].dt.to_period('M')
 
             # Current month income/expenses
-            current_income = float(inc_df[inc_df['transaction_date'].str.startswith(current_month)]['amount'].sum()) if not inc_df.empty else 0.0
-            current_expenses = float(exp_df[exp_df['transaction_date'].str.startswith(current_month)]['amount'].sum()) if not exp_df.empty else 0.0
+            current_income = float(inc_df.loc[inc_months == current_month, 'amount'].sum())
+            current_expenses = float(exp_df.loc[exp_months == current_month, 'amount'].sum())
 
             # Previous month income/expenses
-            prev_income = float(inc_df[inc_df['transaction_date'].str.startswith(prev_month)]['amount'].sum()) if not inc_df.empty else 0.0
-            prev_expenses = float(exp_df[exp_df['transaction_date'].str.startswith(prev_month)]['amount'].sum()) if not exp_df.empty else 0.0
+            prev_income = float(inc_df.loc[inc_months == prev_month, 'amount'].sum())
+            prev_expenses = float(exp_df.loc[exp_months == prev_month, 'amount'].sum())
 
             # Calculate percentage changes
             income_delta = ((current_income - prev_income) / prev_income * 100) if prev_income > 0 else 0
@@ -4858,12 +4860,11 @@ def show_main_app():
                 st.subheader("📈 Revenue Trend")
                 # Group income by date for revenue trend
                 if not inc_df.empty:
-                    inc_df['date'] = pd.to_datetime(inc_df['transaction_date'])
-                    daily_income = inc_df.groupby('date')['amount'].sum().reset_index()
+                    daily_income = inc_df.groupby('transaction_date')['amount'].sum().reset_index()
 
                     fig = go.Figure()
                     fig.add_trace(go.Scatter(
-                        x=daily_income['date'],
+                        x=daily_income['transaction_date'],
                         y=daily_income['amount'],
                         mode='lines+markers',
                         name='Revenue',
@@ -4878,21 +4879,10 @@ def show_main_app():
                 st.subheader("🏠 Property Performance")
                 # Property-wise income vs expenses
                 if properties:
-                    property_names = []
-                    property_income = []
-                    property_expenses = []
-
-                    for prop in properties:
-                        property_names.append(prop.get('name', 'Unknown'))
-                        prop_id = prop.get('id')
-
-                        # Get income for this property
-                        prop_inc = float(inc_df[inc_df['property_id'] == prop_id]['amount'].sum()) if not inc_df.empty and 'property_id' in inc_df.columns else 0.0
-                        property_income.append(prop_inc)
-
-                        # Get expenses for this property
-                        prop_exp = float(exp_df[exp_df['property_id'] == prop_id]['amount'].sum()) if not exp_df.empty and 'property_id' in exp_df.columns else 0.0
-                        property_expenses.append(prop_exp)
+                    property_ids = [prop.get('id') for prop in properties]
+                    property_names = [prop.get('name', 'Unknown') for prop in properties]
+                    property_income = inc_df.groupby('property_id')['amount'].sum().reindex(property_ids, fill_value=0.0).tolist()
+                    property_expenses = exp_df.groupby('property_id')['amount'].sum().reindex(property_ids, fill_value=0.0).tolist()
 
                     fig = go.Figure()
                     fig.add_trace(go.Bar(name='Income', x=property_names, y=property_income, marker_color='#2E8B57'))
@@ -4908,8 +4898,8 @@ def show_main_app():
 
             with col1:
                 # Pie chart for expense categories
-                if not exp_df.empty and 'expense_type' in exp_df.columns:
-                    exp_cat = exp_df.groupby('expense_type')['amount'].sum().reset_index()
+                if not exp_df.empty:
+                    exp_cat = exp_df.groupby('expense_type', observed=True)['amount'].sum().reset_index()
 
                     fig = go.Figure(data=[go.Pie(
                         labels=exp_cat['expense_type'],
@@ -4924,13 +4914,10 @@ def show_main_app():
             with col2:
                 # Monthly expense trend
                 if not exp_df.empty:
-                    exp_df['month'] = exp_df['transaction_date'].apply(lambda x: str(x)[:7])
-                    monthly_exp = exp_df.groupby('month')['amount'].sum().reset_index()
+                    monthly_exp = exp_df.groupby(exp_months.rename('month'))['amount'].sum().reset_index()
 
                     # Convert month to short format (Jan, Feb, etc.)
-                    monthly_exp['month_label'] = monthly_exp['month'].apply(
-                        lambda x: datetime.strptime(x + '-01', '%Y-%m-%d').strftime('%b')
-                    )
+                    monthly_exp['month_label'] = monthly_exp['month'].dt.strftime('%b')
 
                     fig = go.Figure()
                     fig.add_trace(go.Scatter(
@@ -4944,6 +4931,8 @@ def show_main_app():
                     st.plotly_chart(fig, use_container_width=True)
                 else:
                     st.info("No expense data available for monthly trend.")
+
+            show_cash_flow_forecast(recurring_rules, properties)
             
             return
         except UnboundLocalError as e:
@@ -5151,12 +5140,12 @@ def show_main_app():
             
             st.markdown("### Current Month Reminders")
             
+            # Statuses for all properties at once rather than a few queries per property
+            statuses = reminder_service.get_reminder_statuses(selected_org_id, current_month, current_year)
+            
             for property_obj in properties:
                 with st.expander(f"🏠 {property_obj.address}", expanded=False):
-                    # Get reminder status for this property
-                    status = reminder_service.get_reminder_status(
-                        property_obj.id, current_month, current_year
-                    )
+                    status = statuses.get(property_obj.id) or reminder_service.build_reminder_status([], False)
                     
                     col1, col2, col3 = st.columns(3)
                     
@@ -5365,19 +5354,16 @@ def show_main_app():
 
                     if generate_clicked or download_pdf_clicked or download_xls_clicked or auto_trigger:
                         try:
-                            # Get income data
-                            income_result = db.supabase.table("income").select("*").eq(
-                                "organization_id", selected_org_id
-                            ).gte("transaction_date", start_date.isoformat()).lt(
-                                "transaction_date", end_date.isoformat()
-                            ).execute()
-                            
-                            # Get expense data
-                            expense_result = db.supabase.table("expenses").select("*").eq(
-                                "organization_id", selected_org_id
-                            ).gte("transaction_date", start_date.isoformat()).lt(
-                                "transaction_date", end_date.isoformat()
-                            ).execute()
+                            # Get income and expense data for the period, paging past the max-rows cap
+                            period_filters = [
+                                ("eq", "organization_id", selected_org_id),
+                                ("gte", "transaction_date", start_date.isoformat()),
+                                ("lt", "transaction_date", end_date.isoformat()),
+                            ]
+                            income_rows, expense_rows = db.gather(
+                                lambda: list(db.iter_rows("income", period_filters)),
+                                lambda: list(db.iter_rows("expenses", period_filters))
+                            )
                             
                             org_title = org_name if org_name else "Organization"
                             # Determine friendly period text
@@ -5388,10 +5374,10 @@ def show_main_app():
                             else:
                                 period_text = f"Period: {start_date.strftime('%b %d, %Y')} - {end_date.strftime('%b %d, %Y')}"
 
-                            if income_result.data or expense_result.data:
+                            if income_rows or expense_rows:
                                 # Calculate totals
-                                total_income = sum(float(item.get('amount', 0)) for item in income_result.data)
-                                total_expenses = sum(float(item.get('amount', 0)) for item in expense_result.data)
+                                total_income = sum(float(item.get('amount', 0)) for item in income_rows)
+                                total_expenses = sum(float(item.get('amount', 0)) for item in expense_rows)
                                 net_profit = total_income - total_expenses
 
                                 # Show heading with org + period
@@ -5414,8 +5400,8 @@ def show_main_app():
                                 if report_type == "Yearly":
                                     def to_month(row):
                                         return str(row.get('transaction_date', '') or '')[:7]
-                                    income_df = pd.DataFrame(income_result.data)
-                                    expense_df = pd.DataFrame(expense_result.data)
+                                    income_df = pd.DataFrame(income_rows)
+                                    expense_df = pd.DataFrame(expense_rows)
                                     income_monthly = income_df.assign(month=income_df.apply(to_month, axis=1)).groupby('month')['amount'].sum() if not income_df.empty else pd.Series(dtype=float)
                                     expense_monthly = expense_df.assign(month=expense_df.apply(to_month, axis=1)).groupby('month')['amount'].sum() if not expense_df.empty else pd.Series(dtype=float)
                                     months = sorted(set(income_monthly.index).union(expense_monthly.index))
@@ -5428,13 +5414,13 @@ def show_main_app():
                                     st.plotly_chart(fig, use_container_width=True)
 
                                 # Category breakdown pies
-                                if income_result.data:
-                                    inc_df = pd.DataFrame(income_result.data)
+                                if income_rows:
+                                    inc_df = pd.DataFrame(income_rows)
                                     inc_by_cat = inc_df.groupby('income_type')['amount'].sum().reset_index() if 'income_type' in inc_df.columns else pd.DataFrame()
                                 else:
                                     inc_by_cat = pd.DataFrame()
-                                if expense_result.data:
-                                    exp_df = pd.DataFrame(expense_result.data)
+                                if expense_rows:
+                                    exp_df = pd.DataFrame(expense_rows)
                                     exp_by_cat = exp_df.groupby('expense_type')['amount'].sum().reset_index() if 'expense_type' in exp_df.columns else pd.DataFrame()
                                 else:
                                     exp_by_cat = pd.DataFrame()
@@ -5479,8 +5465,8 @@ def show_main_app():
                                     try:
                                         import plotly.io as pio
                                         # Rebuild dataframes for this run
-                                        income_df = pd.DataFrame(income_result.data)
-                                        expense_df = pd.DataFrame(expense_result.data)
+                                        income_df = pd.DataFrame(income_rows)
+                                        expense_df = pd.DataFrame(expense_rows)
 
                                         # Monthly trend (only for Yearly and when data present)
                                         if report_type == "Yearly" and (not income_df.empty or not expense_df.empty):
@@ -5588,8 +5574,9 @@ def show_main_app():
                         org_name_txn = 'Unknown Organization'
 
                 # Preload properties for this organization for filter and name lookup
-                props_res = db.supabase.table("properties").select("id,name,address").eq("organization_id", selected_org_id).execute()
-                properties_list = props_res.data or []
+                properties_list = list(db.iter_rows_by_id(
+                    "properties", [("eq", "organization_id", selected_org_id)], columns="id,name,address"
+                ))
                 prop_map = {p['id']: (p.get('name') or p.get('address') or f"Property {p['id']}") for p in properties_list}
                 prop_options = ["All"] + [prop_map[p['id']] for p in properties_list]
 
@@ -5646,17 +5633,17 @@ def show_main_app():
                     try:
                         rows = []
 
-                        # Helper to apply property filter
-                        def apply_common_filters(builder):
-                            builder = builder.eq("organization_id", selected_org_id).gte("transaction_date", txn_start.isoformat()).lt("transaction_date", txn_end.isoformat())
-                            if selected_property_id is not None:
-                                builder = builder.eq("property_id", selected_property_id)
-                            return builder
+                        # Filters shared by the income and expense queries
+                        common_filters = [
+                            ("eq", "organization_id", selected_org_id),
+                            ("gte", "transaction_date", txn_start.isoformat()),
+                            ("lt", "transaction_date", txn_end.isoformat()),
+                        ]
+                        if selected_property_id is not None:
+                            common_filters.append(("eq", "property_id", selected_property_id))
 
                         if txn_type_filter in ("All", "Income"):
-                            inc_builder = db.supabase.table("income").select("*")
-                            inc_res = apply_common_filters(inc_builder).execute()
-                            for r in inc_res.data or []:
+                            for r in db.iter_rows("income", common_filters):
                                 rows.append({
                                     'S.No.': 0,  # will fill after sort
                                     'Date': r.get('transaction_date'),
@@ -5667,9 +5654,7 @@ def show_main_app():
                                 })
 
                         if txn_type_filter in ("All", "Expenses"):
-                            exp_builder = db.supabase.table("expenses").select("*")
-                            exp_res = apply_common_filters(exp_builder).execute()
-                            for r in exp_res.data or []:
+                            for r in db.iter_rows("expenses", common_filters):
                                 rows.append({
                                     'S.No.': 0,  # will fill after sort
                                     'Date': r.get('transaction_date'),
@@ -5960,14 +5945,23 @@ def show_main_app():
                     if selected_property_id != "All":
                         st.markdown(f"**Property: {property_names[selected_property_id]}**")
                     
-                    # Get all income and expenses once for efficiency
+                    # Fetch the organization's income and expenses once, filtered server-side
+                    perf_property_id = selected_property_id if selected_property_id != "All" else None
                     try:
-                        all_income = db.get_all_income()
-                        all_expenses = db.get_all_expenses()
+                        perf_income = db.get_income_by_organization(selected_org_id, perf_property_id, start_date, end_date)
+                        perf_expenses = db.get_expenses_by_organization(selected_org_id, perf_property_id, start_date, end_date)
                     except Exception as e:
                         st.error(f"Error fetching financial data: {str(e)}")
-                        all_income = []
-                        all_expenses = []
+                        perf_income = []
+                        perf_expenses = []
+
+                    # Totals per property
+                    income_by_property = {}
+                    for inc in perf_income:
+                        income_by_property[inc.property_id] = income_by_property.get(inc.property_id, 0) + inc.amount
+                    expenses_by_property = {}
+                    for exp in perf_expenses:
+                        expenses_by_property[exp.property_id] = expenses_by_property.get(exp.property_id, 0) + exp.amount
                     
                     # Create property performance cards
                     prop_cols = st.columns(min(len(filtered_properties), 3))  # Max 3 properties per row
@@ -5975,25 +5969,8 @@ def show_main_app():
                     for i, prop in enumerate(filtered_properties):
                         with prop_cols[i % 3]:
                             try:
-                                
-                                # Filter by organization and property
-                                prop_income = [inc for inc in all_income if inc.organization_id == selected_org_id and inc.property_id == prop.id]
-                                prop_expenses = [exp for exp in all_expenses if exp.organization_id == selected_org_id and exp.property_id == prop.id]
-                                
-                                # Apply date filters if specified
-                                if start_date:
-                                    # Convert date to datetime for comparison
-                                    start_datetime = datetime.combine(start_date, datetime.min.time())
-                                    prop_income = [inc for inc in prop_income if inc.transaction_date >= start_datetime]
-                                    prop_expenses = [exp for exp in prop_expenses if exp.transaction_date >= start_datetime]
-                                if end_date:
-                                    # Convert date to datetime for comparison
-                                    end_datetime = datetime.combine(end_date, datetime.max.time())
-                                    prop_income = [inc for inc in prop_income if inc.transaction_date <= end_datetime]
-                                    prop_expenses = [exp for exp in prop_expenses if exp.transaction_date <= end_datetime]
-                                
-                                prop_total_income = sum(inc.amount for inc in prop_income)
-                                prop_total_expenses = sum(exp.amount for exp in prop_expenses)
+                                prop_total_income = income_by_property.get(prop.id, 0)
+                                prop_total_expenses = expenses_by_property.get(prop.id, 0)
                                 prop_net_income = prop_total_income - prop_total_expenses
                                 prop_roi = (prop_net_income / prop.purchase_price * 100) if prop.purchase_price > 0 else 0
                                 
@@ -6040,24 +6017,8 @@ def show_main_app():
                         roi_sum = 0
                         
                         for prop in filtered_properties:
-                            # Get property-specific income and expenses
-                            prop_income = [inc for inc in all_income if inc.organization_id == selected_org_id and inc.property_id == prop.id]
-                            prop_expenses = [exp for exp in all_expenses if exp.organization_id == selected_org_id and exp.property_id == prop.id]
-                            
-                            # Apply date filters if specified
-                            if start_date:
-                                # Convert date to datetime for comparison
-                                start_datetime = datetime.combine(start_date, datetime.min.time())
-                                prop_income = [inc for inc in prop_income if inc.transaction_date >= start_datetime]
-                                prop_expenses = [exp for exp in prop_expenses if exp.transaction_date >= start_datetime]
-                            if end_date:
-                                # Convert date to datetime for comparison
-                                end_datetime = datetime.combine(end_date, datetime.max.time())
-                                prop_income = [inc for inc in prop_income if inc.transaction_date <= end_datetime]
-                                prop_expenses = [exp for exp in prop_expenses if exp.transaction_date <= end_datetime]
-                            
-                            prop_total_income = sum(inc.amount for inc in prop_income)
-                            prop_total_expenses = sum(exp.amount for exp in prop_expenses)
+                            prop_total_income = income_by_property.get(prop.id, 0)
+                            prop_total_expenses = expenses_by_property.get(prop.id, 0)
                             
                             total_income += prop_total_income
                             total_expenses += prop_total_expenses
@@ -6094,102 +6055,110 @@ def show_main_app():
 
 def generate_pending_transactions_for_organization(organization_id: int):
     """Generate pending transactions for a specific organization"""
-    from datetime import datetime, timedelta, date
-    from database.models import RecurringTransaction, PendingTransaction, RecurringInterval
-    
     db = DatabaseOperations()
-    current_date = date.today()
-    
-    # Get all active recurring transactions for this organization
+    today = date.today()
     recurring_transactions = db.get_recurring_transactions_by_organization(organization_id)
-    
-    generated_count = 0
-    
-    for recurring in recurring_transactions:
-        # Check if we should generate a pending transaction
-        if not recurring.is_active:
-            continue
-            
-        # Check if we've passed the end date
-        if recurring.end_date and current_date > recurring.end_date.date():
-            continue
-        
-        # Calculate the latest due date on or before today
-        start_date = recurring.start_date.date()
-        next_due_date = start_date
-        if current_date > start_date:
-            if recurring.interval == RecurringInterval.WEEKLY:
-                weeks = (current_date - start_date).days // 7
-                next_due_date = start_date + timedelta(weeks=weeks)
-            elif recurring.interval == RecurringInterval.MONTHLY:
-                years = current_date.year - start_date.year
-                months = years * 12 + (current_date.month - start_date.month)
-                months = max(0, months)
-                y = start_date.year + (start_date.month - 1 + months) // 12
-                m = (start_date.month - 1 + months) % 12 + 1
-                dim = [31,29 if (y%4==0 and (y%100!=0 or y%400==0)) else 28,31,30,31,30,31,31,30,31,30,31][m-1]
-                d = min(start_date.day, dim)
-                next_due_date = date(y, m, d)
-            elif recurring.interval == RecurringInterval.QUARTERLY:
-                years = current_date.year - start_date.year
-                months = years * 12 + (current_date.month - start_date.month)
-                quarters = max(0, months // 3)
-                y = start_date.year + (start_date.month - 1 + quarters*3) // 12
-                m = (start_date.month - 1 + quarters*3) % 12 + 1
-                dim = [31,29 if (y%4==0 and (y%100!=0 or y%400==0)) else 28,31,30,31,30,31,31,30,31,30,31][m-1]
-                d = min(start_date.day, dim)
-                next_due_date = date(y, m, d)
-            elif recurring.interval == RecurringInterval.YEARLY:
-                y = current_date.year
-                m = start_date.month
-                dim = [31,29 if (y%4==0 and (y%100!=0 or y%400==0)) else 28,31,30,31,30,31,31,30,31,30,31][m-1]
-                d = min(start_date.day, dim)
-                next_due_date = date(y, m, d)
-        
-        # If next due date is today or in the past, generate pending transaction
-        if next_due_date <= current_date:
-            # Check if pending transaction already exists
-            existing_pending = db.get_pending_transactions_by_organization(organization_id)
-            already_pending = any(
-                pt.recurring_transaction_id == recurring.id and
-                pt.transaction_date.date() == next_due_date
-                for pt in existing_pending
-            )
+    pending = due_pending_transactions(recurring_transactions, today)
+    if not pending:
+        return 0
+    # Occurrences that already exist for their rule are skipped by the unique key on insert
+    generated = db.create_pending_transactions(pending)
+    if generated is None:
+        return 0
+    # Move the rules past today so the daily job doesn't pick them up again
+    db.advance_recurring_due_dates(next_due_dates(recurring_transactions, today))
+    return generated
+
+def show_cash_flow_forecast(recurring_rules, properties):
+    """Analytics cash-flow forecast projected from the active recurring transactions"""
+    st.markdown("---")
+    st.subheader("🔮 Cash-Flow Forecast")
+    horizon_years = st.selectbox(
+        "Forecast horizon",
+        options=[1, 2, 5, 10],
+        format_func=lambda years: f"{years} year" if years == 1 else f"{years} years",
+        key="forecast_horizon_years"
+    )
+    forecast = forecast_cash_flow(recurring_rules, date.today(), horizon_years * 12)
+
+    if forecast.empty:
+        st.info("No active recurring transactions to forecast. Add recurring income or expenses under Accounting.")
+    else:
+        monthly_forecast = monthly_cash_flow(forecast)
+        forecast_income = float(monthly_forecast['income'].sum())
+        forecast_expenses = float(monthly_forecast['expense'].sum())
 
-            # Also check if this transaction was already confirmed and exists in regular income/expense tables
-            already_confirmed = False
-            try:
-                if recurring.transaction_type == 'income':
-                    # Check income table for same property, amount, and date
-                    income_check = db.client.table("income").select("id").eq("organization_id", organization_id).eq("property_id", recurring.property_id).eq("amount", recurring.amount).eq("transaction_date", datetime.combine(next_due_date, datetime.min.time()).isoformat()).execute()
-                    already_confirmed = len(income_check.data) > 0
-                elif recurring.transaction_type == 'expense':
-                    # Check expense table for same property, amount, and date
-                    expense_check = db.client.table("expenses").select("id").eq("organization_id", organization_id).eq("property_id", recurring.property_id).eq("amount", recurring.amount).eq("transaction_date", datetime.combine(next_due_date, datetime.min.time()).isoformat()).execute()
-                    already_confirmed = len(expense_check.data) > 0
-            except Exception:
-                # If check fails, assume not confirmed
-                already_confirmed = False
-
-            if not already_pending and not already_confirmed:
-                # Create pending transaction
-                pending_transaction = PendingTransaction(
-                    organization_id=recurring.organization_id,
-                    property_id=recurring.property_id,
-                    transaction_type=recurring.transaction_type,
-                    income_type=recurring.income_type,
-                    expense_type=recurring.expense_type,
-                    amount=recurring.amount,
-                    description=recurring.description,
-                    transaction_date=datetime.combine(next_due_date, datetime.min.time()),
-                    recurring_transaction_id=recurring.id,
-                    is_confirmed=False
-                )
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Forecast Income", f"${forecast_income:,.2f}")
+        with col2:
+            st.metric("Forecast Expenses", f"${forecast_expenses:,.2f}")
+        with col3:
+            st.metric("Forecast Net", f"${forecast_income - forecast_expenses:,.2f}")
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(name='Income', x=monthly_forecast.index, y=monthly_forecast['income'], marker_color='#2E8B57'))
+        fig.add_trace(go.Bar(name='Expenses', x=monthly_forecast.index, y=monthly_forecast['expense'], marker_color='#DC143C'))
+        fig.add_trace(go.Scatter(
+            name='Net',
+            x=monthly_forecast.index,
+            y=monthly_forecast['net'],
+            mode='lines',
+            line=dict(color='#1f77b4')
+        ))
+        fig.update_layout(title="Projected Monthly Cash Flow", xaxis_title="Month", yaxis_title="Amount ($)", barmode='group')
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Per-property totals over the whole horizon
+        property_names = {prop.get('id'): prop.get('name', 'Unknown') for prop in properties}
+        by_property = forecast.pivot_table(
+            index='property_id', columns='transaction_type', values='amount', aggfunc='sum', fill_value=0.0
+        ).reindex(columns=['income', 'expense'], fill_value=0.0)
+        by_property['net'] = by_property['income'] - by_property['expense']
+        by_property = by_property.sort_values('net', ascending=False)
+        df_forecast = pd.DataFrame({
+            'Property': [property_names.get(property_id, f"Property {property_id}") for property_id in by_property.index],
+            'Income': by_property['income'].map(lambda value: f"${value:,.2f}").values,
+            'Expenses': by_property['expense'].map(lambda value: f"${value:,.2f}").values,
+            'Net': by_property['net'].map(lambda value: f"${value:,.2f}").values,
+        })
+        st.dataframe(df_forecast, use_container_width=True, hide_index=True)
+
+def show_query_performance_panel():
+    """Sidebar breakdown of the queries issued by this rerun, for spotting slow pages and N+1 patterns"""
+    run = query_recorder.current_run()
+    cache_stats = query_cache.stats()
 
-                if db.create_pending_transaction(pending_transaction):
-                    generated_count += 1
-    
-    return generated_count
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("**⏱️ Query Performance**")
+        st.caption(f"Rerun {run['rerun']} · {run['page']} · {run['elapsed_ms']:,.0f} ms wall time")
+
+        col1, col2 = st.columns(2)
+        col1.metric("Queries", run['queries'])
+        col2.metric("Query Time", f"{run['query_ms']:,.0f} ms")
+        col1.metric("Rows", f"{run['rows']:,}")
+        col2.metric("Payload", f"{run['bytes'] / 1024:,.1f} KB")
+        st.caption(f"Query cache: {cache_stats['hit_rate']:.0f}% hits, {cache_stats['entries']} entries")
+
+        if run['events']:
+            events_df = pd.DataFrame(run['events'])
+            events_df['filters'] = events_df['filters'].apply(', '.join)
+            shapes = events_df.groupby(['table', 'operation', 'filters']).agg(
+                calls=('ms', 'size'), ms=('ms', 'sum'), rows=('rows', 'sum')
+            ).reset_index().sort_values('ms', ascending=False)
+
+            repeated = shapes[shapes['calls'] > 1]
+            if not repeated.empty:
+                st.warning(f"{len(repeated)} query shape(s) ran more than once in this rerun")
+            st.dataframe(shapes, hide_index=True, use_container_width=True)
+
+        page_totals = query_recorder.page_totals()
+        if page_totals:
+            st.markdown("**By Page**")
+            st.dataframe(pd.DataFrame([
+                {'page': page, **totals} for page, totals in page_totals.items()
+            ]), hide_index=True, use_container_width=True)
 
 def main():
     """Main application function"""
@@ -6197,6 +6166,8 @@ def main():
     
     if st.session_state.authenticated:
         show_main_app()
+        if st.session_state.get('show_query_performance'):
+            show_query_performance_panel()
     else:
         show_auth_page()
 
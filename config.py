@@ -54,6 +54,68 @@ def get_streamlit_server_port():
         STREAMLIT_SERVER_PORT = int(get_config_value("STREAMLIT_SERVER_PORT", "streamlit_server_port", 8501))
     return STREAMLIT_SERVER_PORT
 
+def get_database_backend():
+    """'supabase' (default) or 'local' for the embedded SQLite backend used for offline profiling"""
+    return get_config_value("DATABASE_BACKEND", "database_backend", "supabase").lower()
+
+def get_local_database_path():
+    return get_config_value("LOCAL_DATABASE_PATH", "local_database_path", "propledger_local.db")
+
+def get_query_cache_ttl():
+    """Seconds a cached DatabaseOperations read stays fresh (0 disables caching)"""
+    return float(get_config_value("QUERY_CACHE_TTL", "query_cache_ttl", 60))
+
+def get_query_cache_max_entries():
+    return int(get_config_value("QUERY_CACHE_MAX_ENTRIES", "query_cache_max_entries", 512))
+
+def get_query_log_path():
+    """JSONL file that receives every instrumented query, or None to only record when the debug panel is on"""
+    return get_config_value("QUERY_LOG_PATH", "query_log_path")
+
+def get_notification_channels():
+    """Channels rent reminders are sent on: a comma-separated list of email and sms. Unset turns notifications off"""
+    channels = get_config_value("NOTIFICATION_CHANNELS", "notification_channels") or ""
+    return [channel.strip().lower() for channel in channels.split(",") if channel.strip()]
+
+def get_notification_workers():
+    """Concurrent deliveries in flight across all channels"""
+    return int(get_config_value("NOTIFICATION_WORKERS", "notification_workers", 20))
+
+def get_smtp_host():
+    """SMTP relay for reminder email; required when NOTIFICATION_CHANNELS includes email"""
+    return get_config_value("SMTP_HOST", "smtp_host")
+
+def get_smtp_port():
+    """SMTP port; 587 with SMTP_USE_TLS, otherwise 25, unless set"""
+    return int(get_config_value("SMTP_PORT", "smtp_port", 587 if get_smtp_use_tls() else 25))
+
+def get_smtp_username():
+    return get_config_value("SMTP_USERNAME", "smtp_username")
+
+def get_smtp_password():
+    return get_config_value("SMTP_PASSWORD", "smtp_password")
+
+def get_smtp_use_tls():
+    return str(get_config_value("SMTP_USE_TLS", "smtp_use_tls", "false")).lower() in ("1", "true", "yes")
+
+def get_notification_sender():
+    return get_config_value("NOTIFICATION_SENDER", "notification_sender", "PropLedger <reminders@propledger.local>")
+
+def get_email_rate_limit():
+    """Emails per second (0 for no limit)"""
+    return float(get_config_value("EMAIL_RATE_LIMIT", "email_rate_limit", 50))
+
+def get_sms_webhook_url():
+    """HTTP endpoint that accepts {"to", "body", "reference"} JSON and sends the SMS"""
+    return get_config_value("SMS_WEBHOOK_URL", "sms_webhook_url")
+
+def get_sms_webhook_token():
+    return get_config_value("SMS_WEBHOOK_TOKEN", "sms_webhook_token")
+
+def get_sms_rate_limit():
+    """Text messages per second (0 for no limit)"""
+    return float(get_config_value("SMS_RATE_LIMIT", "sms_rate_limit", 10))
+
 # Backward compatibility - create module-level variables that call functions
 # These will be set when first accessed
 def _get_config_values():
@@ -0,0 +1,157 @@
+-- PropLedger index benchmark
+--
+-- Builds a synthetic ledger in a scratch schema, runs EXPLAIN ANALYZE for every
+-- query shape the application issues with only the original single-column
+-- indexes, then applies migrations/003_composite_indexes.sql and runs them again.
+--
+-- Usage (from the repository root, against a disposable Postgres database):
+--   psql "$DATABASE_URL" -f database/benchmarks/index_benchmark.sql > bench_output.txt
+-- Override the dataset size with -v rows=500000 (income + expense rows in total).
+--
+-- Everything lives in the propledger_bench schema, which is dropped and recreated.
+
+\set ON_ERROR_STOP on
+\if :{?rows}
+\else
+    \set rows 5000000
+\endif
+\if :{?organizations}
+\else
+    \set organizations 50
+\endif
+\if :{?properties}
+\else
+    \set properties 10000
+\endif
+
+DROP SCHEMA IF EXISTS propledger_bench CASCADE;
+CREATE SCHEMA propledger_bench;
+SET search_path = propledger_bench;
+
+CREATE TABLE properties (
+    id SERIAL PRIMARY KEY,
+    organization_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    monthly_rent DECIMAL(10,2) NOT NULL
+);
+
+CREATE TABLE income (
+    id SERIAL PRIMARY KEY,
+    user_id UUID,
+    organization_id INTEGER,
+    property_id INTEGER NOT NULL,
+    amount DECIMAL(10,2) NOT NULL,
+    income_type VARCHAR(50) NOT NULL,
+    description TEXT NOT NULL,
+    transaction_date DATE NOT NULL
+);
+
+CREATE TABLE expenses (
+    id SERIAL PRIMARY KEY,
+    user_id UUID,
+    organization_id INTEGER,
+    property_id INTEGER NOT NULL,
+    amount DECIMAL(10,2) NOT NULL,
+    expense_type VARCHAR(50) NOT NULL,
+    description TEXT NOT NULL,
+    transaction_date DATE NOT NULL
+);
+
+CREATE TABLE recurring_transactions (
+    id SERIAL PRIMARY KEY,
+    organization_id INTEGER,
+    property_id INTEGER NOT NULL,
+    transaction_type VARCHAR(20) NOT NULL,
+    amount DECIMAL(10,2) NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE pending_transactions (
+    id SERIAL PRIMARY KEY,
+    organization_id INTEGER,
+    property_id INTEGER NOT NULL,
+    transaction_type VARCHAR(20) NOT NULL,
+    amount DECIMAL(10,2) NOT NULL,
+    transaction_date TIMESTAMP WITH TIME ZONE NOT NULL,
+    recurring_transaction_id INTEGER,
+    is_confirmed BOOLEAN DEFAULT FALSE
+);
+
+CREATE TABLE rent_reminders (
+    id SERIAL PRIMARY KEY,
+    property_id INTEGER NOT NULL,
+    organization_id INTEGER NOT NULL,
+    reminder_month INTEGER NOT NULL,
+    reminder_year INTEGER NOT NULL,
+    next_reminder_date DATE NOT NULL,
+    is_rent_recorded BOOLEAN DEFAULT FALSE,
+    reminder_count INTEGER DEFAULT 0,
+    max_reminders INTEGER DEFAULT 6
+);
+
+-- Synthetic data: properties spread evenly over organizations, ledger rows over five years
+INSERT INTO properties (organization_id, name, monthly_rent)
+SELECT 1 + (g % :organizations), 'Property ' || g, 800 + (g % 40) * 50
+FROM generate_series(1, :properties) AS g;
+
+INSERT INTO income (organization_id, property_id, amount, income_type, description, transaction_date)
+SELECT p.organization_id, p.id,
+       CASE WHEN g % 10 < 8 THEN p.monthly_rent ELSE round((random() * 200)::numeric, 2) END,
+       CASE WHEN g % 10 < 8 THEN 'rent' WHEN g % 10 = 8 THEN 'late_fee' ELSE 'other' END,
+       'Synthetic income',
+       DATE '2021-01-01' + (g % 1826)
+FROM generate_series(1, :rows / 2) AS g
+JOIN properties p ON p.id = 1 + (g % :properties);
+
+INSERT INTO expenses (organization_id, property_id, amount, expense_type, description, transaction_date)
+SELECT p.organization_id, p.id,
+       round((random() * 1500)::numeric, 2),
+       (ARRAY['mortgage', 'maintenance', 'repairs', 'utilities', 'insurance', 'taxes'])[1 + g % 6],
+       'Synthetic expense',
+       DATE '2021-01-01' + (g % 1826)
+FROM generate_series(1, :rows / 2) AS g
+JOIN properties p ON p.id = 1 + (g % :properties);
+
+INSERT INTO recurring_transactions (organization_id, property_id, transaction_type, amount, is_active)
+SELECT p.organization_id, p.id, t.kind, p.monthly_rent, (p.id % 20) <> 0
+FROM properties p
+CROSS JOIN (VALUES ('income'), ('expense')) AS t(kind);
+
+INSERT INTO pending_transactions (organization_id, property_id, transaction_type, amount, transaction_date, recurring_transaction_id)
+SELECT r.organization_id, r.property_id, r.transaction_type, r.amount,
+       TIMESTAMPTZ '2025-01-01' + make_interval(months => m), r.id
+FROM recurring_transactions r
+CROSS JOIN generate_series(0, 5) AS m;
+
+INSERT INTO rent_reminders (property_id, organization_id, reminder_month, reminder_year, next_reminder_date, is_rent_recorded, reminder_count)
+SELECT p.id, p.organization_id, 1 + m % 12, 2023 + m / 12,
+       make_date(2023 + m / 12, 1 + m % 12, 10), m < 22, (m % 6)
+FROM properties p
+CROSS JOIN generate_series(0, 23) AS m;
+
+-- Indexes that complete_schema.sql created before migration 003
+CREATE INDEX ON properties(organization_id);
+CREATE INDEX ON income(property_id);
+CREATE INDEX ON income(transaction_date);
+CREATE INDEX ON expenses(property_id);
+CREATE INDEX ON expenses(transaction_date);
+CREATE INDEX ON recurring_transactions(organization_id);
+CREATE INDEX ON pending_transactions(organization_id);
+CREATE INDEX ON pending_transactions(transaction_type);
+CREATE INDEX ON pending_transactions(is_confirmed);
+
+VACUUM ANALYZE;
+
+\echo '=================== BEFORE: single-column indexes ==================='
+\ir index_benchmark_queries.sql
+
+\echo '=================== Applying migrations/003_composite_indexes.sql ==================='
+\timing on
+\ir ../migrations/003_composite_indexes.sql
+\timing off
+VACUUM ANALYZE;
+
+\echo '=================== AFTER: composite indexes ==================='
+\ir index_benchmark_queries.sql
+
+RESET search_path;
@@ -0,0 +1,57 @@
+-- Query shapes issued by DatabaseOperations, RentReminderService and the Reports page.
+-- Included twice by index_benchmark.sql; expects search_path = propledger_bench.
+
+\echo '--- Organization ledger, first page (iter_rows, newest first)'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM income WHERE organization_id = 7
+ORDER BY transaction_date DESC, id DESC LIMIT 1000;
+
+\echo '--- Organization ledger, keyset continuation page'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM income WHERE organization_id = 7
+  AND (transaction_date < DATE '2024-06-30' OR (transaction_date = DATE '2024-06-30' AND id < 2000000))
+ORDER BY transaction_date DESC, id DESC LIMIT 1000;
+
+\echo '--- P&L report period (organization + year)'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM expenses WHERE organization_id = 7
+  AND transaction_date >= DATE '2024-01-01' AND transaction_date < DATE '2025-01-01'
+ORDER BY transaction_date, id LIMIT 1000;
+
+\echo '--- Budget analysis, organization scope'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT amount, expense_type, transaction_date FROM expenses
+WHERE organization_id = 7 AND transaction_date >= DATE '2024-01-01' AND transaction_date <= DATE '2024-12-31';
+
+\echo '--- Budget analysis, property scope'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT amount, expense_type, transaction_date FROM expenses
+WHERE property_id = 42 AND transaction_date >= DATE '2024-01-01' AND transaction_date <= DATE '2024-12-31';
+
+\echo '--- Property ledger (get_income_by_property)'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM income WHERE property_id = 42 ORDER BY transaction_date DESC;
+
+\echo '--- Rent recorded check (property + income_type + month)'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT id FROM income WHERE property_id = 42 AND income_type = 'rent'
+  AND transaction_date >= DATE '2024-03-01' AND transaction_date < DATE '2024-04-01';
+
+\echo '--- Rent reminders for a property and month'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM rent_reminders WHERE property_id = 42 AND reminder_month = 3 AND reminder_year = 2024;
+
+\echo '--- Due reminders'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM rent_reminders
+WHERE next_reminder_date <= DATE '2025-01-01' AND NOT is_rent_recorded AND reminder_count < max_reminders;
+
+\echo '--- Pending income for an organization'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM pending_transactions
+WHERE organization_id = 7 AND transaction_type = 'income' AND is_confirmed = FALSE
+ORDER BY transaction_date DESC, id DESC LIMIT 1000;
+
+\echo '--- Active recurring rules for an organization'
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM recurring_transactions WHERE organization_id = 7 AND is_active = TRUE;
@@ -92,6 +92,8 @@ CREATE TABLE IF NOT EXISTS recurring_transactions (
     start_date DATE NOT NULL,
     end_date DATE,
     is_active BOOLEAN DEFAULT TRUE,
+    -- Next occurrence not generated yet; NULL once the rule has ended
+    next_due_date DATE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -110,7 +112,9 @@ CREATE TABLE IF NOT EXISTS pending_transactions (
     recurring_transaction_id INTEGER REFERENCES recurring_transactions(id) ON DELETE SET NULL,
     is_confirmed BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    -- One row per rule and due date; confirmed rows stay (is_confirmed) so generation skips them
+    CONSTRAINT pending_transactions_recurring_date_key UNIQUE (recurring_transaction_id, transaction_date)
 );
 
 -- Create indexes for better performance
@@ -130,6 +134,56 @@ CREATE INDEX IF NOT EXISTS idx_pending_transactions_organization_id ON pending_t
 CREATE INDEX IF NOT EXISTS idx_pending_transactions_property_id ON pending_transactions(property_id);
 CREATE INDEX IF NOT EXISTS idx_pending_transactions_transaction_type ON pending_transactions(transaction_type);
 CREATE INDEX IF NOT EXISTS idx_pending_transactions_is_confirmed ON pending_transactions(is_confirmed);
+CREATE INDEX IF NOT EXISTS idx_properties_organization_id ON properties(organization_id);
+CREATE INDEX IF NOT EXISTS idx_income_property_id_amount ON income(property_id) INCLUDE (amount);
+CREATE INDEX IF NOT EXISTS idx_expenses_property_id_amount ON expenses(property_id) INCLUDE (amount);
+
+-- Organization ledger pages: organization_id + date range, ordered by (transaction_date, id)
+-- as iter_rows keyset-paginates. INCLUDE lets totals and type breakdowns run index-only.
+CREATE INDEX IF NOT EXISTS idx_income_org_date_id
+    ON income(organization_id, transaction_date, id) INCLUDE (property_id, amount, income_type);
+CREATE INDEX IF NOT EXISTS idx_expenses_org_date_id
+    ON expenses(organization_id, transaction_date, id) INCLUDE (property_id, amount, expense_type);
+
+-- Property ledger pages and budget analysis scoped to one property
+CREATE INDEX IF NOT EXISTS idx_income_property_date_id ON income(property_id, transaction_date, id);
+CREATE INDEX IF NOT EXISTS idx_expenses_property_date_id
+    ON expenses(property_id, transaction_date, id) INCLUDE (amount, expense_type);
+
+-- Rent-recorded checks: property_id + income_type + month range
+CREATE INDEX IF NOT EXISTS idx_income_property_type_date ON income(property_id, income_type, transaction_date);
+
+-- Open pending lists per organization and type, newest first
+CREATE INDEX IF NOT EXISTS idx_pending_transactions_open_org_type_date
+    ON pending_transactions(organization_id, transaction_type, transaction_date, id) WHERE NOT is_confirmed;
+
+-- Confirmed occurrence markers by date, for pruning old ones
+CREATE INDEX IF NOT EXISTS idx_pending_transactions_confirmed_date
+    ON pending_transactions(transaction_date) WHERE is_confirmed;
+
+-- Active recurring rules per organization
+CREATE INDEX IF NOT EXISTS idx_recurring_transactions_org_active
+    ON recurring_transactions(organization_id) WHERE is_active;
+
+-- Recurring rules due for generation
+CREATE INDEX IF NOT EXISTS idx_recurring_transactions_next_due
+    ON recurring_transactions(next_due_date, id) WHERE is_active;
+
+-- rent_reminders is created by the reminders setup script, so only key and index it when present
+DO $$
+BEGIN
+    IF to_regclass('rent_reminders') IS NOT NULL THEN
+        -- One reminder per property and month; create_monthly_reminders upserts against it
+        ALTER TABLE rent_reminders
+            DROP CONSTRAINT IF EXISTS rent_reminders_property_month_year_key;
+        ALTER TABLE rent_reminders
+            ADD CONSTRAINT rent_reminders_property_month_year_key UNIQUE (property_id, reminder_month, reminder_year);
+        CREATE INDEX IF NOT EXISTS idx_rent_reminders_due
+            ON rent_reminders(next_reminder_date) WHERE NOT is_rent_recorded;
+        CREATE INDEX IF NOT EXISTS idx_rent_reminders_org_year_month
+            ON rent_reminders(organization_id, reminder_year, reminder_month);
+    END IF;
+END $$;
 
 -- Create updated_at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -153,6 +207,26 @@ CREATE TRIGGER update_expenses_updated_at BEFORE UPDATE ON expenses
 CREATE TRIGGER update_recurring_transactions_updated_at BEFORE UPDATE ON recurring_transactions
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- New rules and schedule edits restart from the start date, so rules written directly
+-- by the app are picked up without every writer computing the next occurrence
+CREATE OR REPLACE FUNCTION reset_recurring_next_due_date()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        NEW.next_due_date := COALESCE(NEW.next_due_date, NEW.start_date);
+    ELSIF NEW.start_date IS DISTINCT FROM OLD.start_date
+       OR NEW.end_date IS DISTINCT FROM OLD.end_date
+       OR NEW.interval IS DISTINCT FROM OLD.interval
+       OR (NEW.is_active AND NOT OLD.is_active) THEN
+        NEW.next_due_date := NEW.start_date;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reset_recurring_next_due_date BEFORE INSERT OR UPDATE ON recurring_transactions
+    FOR EACH ROW EXECUTE FUNCTION reset_recurring_next_due_date();
+
 CREATE TRIGGER update_pending_transactions_updated_at BEFORE UPDATE ON pending_transactions
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
@@ -400,25 +474,381 @@ CREATE POLICY "Users can delete pending transactions in their organizations" ON
     );
 
 -- Create views for financial reporting
-CREATE OR REPLACE VIEW property_financial_summary AS
+-- Income and expenses are summed per property in separate LATERAL subqueries,
+-- so each property costs one index lookup per table instead of an
+-- income x expense cross product. security_invoker keeps the callers' RLS
+-- policies in force, so organization members see shared properties.
+DROP VIEW IF EXISTS property_financial_summary;
+CREATE VIEW property_financial_summary WITH (security_invoker = true) AS
 SELECT 
     p.id,
+    p.organization_id,
     p.user_id,
     p.name,
     p.address,
     p.monthly_rent,
-    COALESCE(SUM(i.amount), 0) as total_income,
-    COALESCE(SUM(e.amount), 0) as total_expenses,
-    COALESCE(SUM(i.amount), 0) - COALESCE(SUM(e.amount), 0) as net_income,
+    inc_totals.total_income,
+    exp_totals.total_expenses,
+    inc_totals.total_income - exp_totals.total_expenses as net_income,
     CASE 
-        WHEN COALESCE(SUM(i.amount), 0) > 0 
-        THEN ((COALESCE(SUM(i.amount), 0) - COALESCE(SUM(e.amount), 0)) / COALESCE(SUM(i.amount), 0)) * 100
+        WHEN inc_totals.total_income > 0 
+        THEN ((inc_totals.total_income - exp_totals.total_expenses) / inc_totals.total_income) * 100
         ELSE 0 
     END as roi_percentage
 FROM properties p
-LEFT JOIN income i ON p.id = i.property_id AND p.user_id = i.user_id
-LEFT JOIN expenses e ON p.id = e.property_id AND p.user_id = e.user_id
-GROUP BY p.id, p.user_id, p.name, p.address, p.monthly_rent;
+LEFT JOIN LATERAL (
+    SELECT COALESCE(SUM(i.amount), 0) AS total_income
+    FROM income i
+    WHERE i.property_id = p.id
+) inc_totals ON TRUE
+LEFT JOIN LATERAL (
+    SELECT COALESCE(SUM(e.amount), 0) AS total_expenses
+    FROM expenses e
+    WHERE e.property_id = p.id
+) exp_totals ON TRUE;
+
+-- Monthly ledger rollup: one row per organization, property, month, kind and type,
+-- kept current by triggers on income and expenses so reports read a few hundred
+-- pre-aggregated rows instead of re-summing the raw ledger.
+CREATE TABLE IF NOT EXISTS ledger_monthly_rollup (
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('income', 'expense')),
+    type VARCHAR(50) NOT NULL,
+    total_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (organization_id, property_id, month, kind, type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ledger_monthly_rollup_org_month ON ledger_monthly_rollup(organization_id, month);
+CREATE INDEX IF NOT EXISTS idx_ledger_monthly_rollup_property_month ON ledger_monthly_rollup(property_id, month);
+
+-- Organization-level months, summed across properties
+CREATE OR REPLACE VIEW ledger_monthly_org_rollup WITH (security_invoker = true) AS
+SELECT
+    organization_id,
+    month,
+    kind,
+    type,
+    SUM(total_amount) AS total_amount,
+    SUM(transaction_count)::INTEGER AS transaction_count
+FROM ledger_monthly_rollup
+GROUP BY organization_id, month, kind, type;
+
+-- Apply a signed delta to one rollup bucket. Rows without an organization are not rolled up.
+CREATE OR REPLACE FUNCTION bump_ledger_monthly_rollup(
+    p_organization_id INTEGER,
+    p_property_id INTEGER,
+    p_transaction_date DATE,
+    p_kind TEXT,
+    p_type TEXT,
+    p_amount NUMERIC,
+    p_count INTEGER
+)
+RETURNS void AS $$
+BEGIN
+    IF p_organization_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO ledger_monthly_rollup AS r (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+    VALUES (p_organization_id, p_property_id, date_trunc('month', p_transaction_date)::DATE, p_kind, p_type, p_amount, p_count)
+    ON CONFLICT (organization_id, property_id, month, kind, type) DO UPDATE
+    SET total_amount = r.total_amount + EXCLUDED.total_amount,
+        transaction_count = r.transaction_count + EXCLUDED.transaction_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Row trigger shared by income and expenses: remove the old row's contribution, add the new one's
+CREATE OR REPLACE FUNCTION maintain_ledger_monthly_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_kind TEXT := CASE WHEN TG_TABLE_NAME = 'income' THEN 'income' ELSE 'expense' END;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_ledger_monthly_rollup(
+            OLD.organization_id, OLD.property_id, OLD.transaction_date, v_kind,
+            to_jsonb(OLD) ->> (v_kind || '_type'), -OLD.amount, -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_ledger_monthly_rollup(
+            NEW.organization_id, NEW.property_id, NEW.transaction_date, v_kind,
+            to_jsonb(NEW) ->> (v_kind || '_type'), NEW.amount, 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS maintain_income_monthly_rollup ON income;
+CREATE TRIGGER maintain_income_monthly_rollup AFTER INSERT OR UPDATE OR DELETE ON income
+    FOR EACH ROW EXECUTE FUNCTION maintain_ledger_monthly_rollup();
+
+DROP TRIGGER IF EXISTS maintain_expenses_monthly_rollup ON expenses;
+CREATE TRIGGER maintain_expenses_monthly_rollup AFTER INSERT OR UPDATE OR DELETE ON expenses
+    FOR EACH ROW EXECUTE FUNCTION maintain_ledger_monthly_rollup();
+
+ALTER TABLE ledger_monthly_rollup ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view ledger rollups in their organizations" ON ledger_monthly_rollup;
+CREATE POLICY "Users can view ledger rollups in their organizations" ON ledger_monthly_rollup
+    FOR SELECT USING (
+        organization_id IN (
+            SELECT organization_id 
+            FROM user_organizations 
+            WHERE user_id = auth.uid()
+        )
+    );
+
+-- Per-property income, expenses, net income and ROI for an organization in one call.
+-- Income and expenses are aggregated separately before joining to properties.
+CREATE OR REPLACE FUNCTION get_property_financial_summaries(
+    p_organization_id INTEGER,
+    p_start_date DATE DEFAULT NULL,
+    p_end_date DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    property_id INTEGER,
+    total_income NUMERIC,
+    total_expenses NUMERIC,
+    net_income NUMERIC,
+    roi NUMERIC
+) AS $$
+    SELECT
+        p.id,
+        COALESCE(inc_totals.total, 0),
+        COALESCE(exp_totals.total, 0),
+        COALESCE(inc_totals.total, 0) - COALESCE(exp_totals.total, 0),
+        CASE
+            WHEN COALESCE(inc_totals.total, 0) > 0
+            THEN (inc_totals.total - COALESCE(exp_totals.total, 0)) / inc_totals.total * 100
+            ELSE 0
+        END
+    FROM properties p
+    LEFT JOIN (
+        SELECT i.property_id, SUM(i.amount) AS total
+        FROM income i
+        JOIN properties ip ON ip.id = i.property_id
+        WHERE ip.organization_id = p_organization_id
+          AND (p_start_date IS NULL OR i.transaction_date >= p_start_date)
+          AND (p_end_date IS NULL OR i.transaction_date <= p_end_date)
+        GROUP BY i.property_id
+    ) inc_totals ON inc_totals.property_id = p.id
+    LEFT JOIN (
+        SELECT e.property_id, SUM(e.amount) AS total
+        FROM expenses e
+        JOIN properties ep ON ep.id = e.property_id
+        WHERE ep.organization_id = p_organization_id
+          AND (p_start_date IS NULL OR e.transaction_date >= p_start_date)
+          AND (p_end_date IS NULL OR e.transaction_date <= p_end_date)
+        GROUP BY e.property_id
+    ) exp_totals ON exp_totals.property_id = p.id
+    WHERE p.organization_id = p_organization_id
+    ORDER BY p.id;
+$$ LANGUAGE sql STABLE;
+
+-- Copy pending transactions into income and expenses and mark them confirmed in one
+-- statement, so a batch is confirmed completely or not at all. Missing or already
+-- confirmed ids are skipped; the confirmed rows are returned so callers know which
+-- organizations changed. New rows belong to the caller, as the income and expenses
+-- insert policies require.
+CREATE OR REPLACE FUNCTION confirm_pending_transactions(p_ids INTEGER[])
+RETURNS TABLE (
+    pending_id INTEGER,
+    organization_id INTEGER
+) AS $$
+    WITH moved AS (
+        UPDATE pending_transactions
+        SET is_confirmed = TRUE
+        WHERE id = ANY(p_ids) AND NOT is_confirmed
+        RETURNING *
+    ),
+    new_income AS (
+        INSERT INTO income (user_id, organization_id, property_id, amount, income_type, description, transaction_date)
+        SELECT auth.uid(), organization_id, property_id, amount, income_type, description, transaction_date::DATE
+        FROM moved
+        WHERE transaction_type = 'income'
+    ),
+    new_expenses AS (
+        INSERT INTO expenses (user_id, organization_id, property_id, amount, expense_type, description, transaction_date)
+        SELECT auth.uid(), organization_id, property_id, amount, expense_type, description, transaction_date::DATE
+        FROM moved
+        WHERE transaction_type = 'expense'
+    )
+    SELECT id, organization_id FROM moved ORDER BY id;
+$$ LANGUAGE sql VOLATILE;
+
+-- Delete confirmed occurrence markers dated before p_before, returning how many were removed.
+-- Generation only ever inserts a rule's latest due date on or before today, which is at
+-- most one interval (a year) back, so older markers can no longer block a duplicate.
+CREATE OR REPLACE FUNCTION prune_confirmed_pending_transactions(p_before DATE)
+RETURNS INTEGER AS $$
+    WITH pruned AS (
+        DELETE FROM pending_transactions
+        WHERE is_confirmed AND transaction_date < p_before
+        RETURNING id
+    )
+    SELECT COUNT(*)::INTEGER FROM pruned;
+$$ LANGUAGE sql VOLATILE;
+
+-- Set each rule's next due date after generation, in one call for the whole batch
+CREATE OR REPLACE FUNCTION advance_recurring_due_dates(p_ids INTEGER[], p_next_due_dates DATE[])
+RETURNS INTEGER AS $$
+    WITH advanced AS (
+        UPDATE recurring_transactions r
+        SET next_due_date = u.next_due_date
+        FROM unnest(p_ids, p_next_due_dates) AS u(id, next_due_date)
+        WHERE r.id = u.id
+        RETURNING r.id
+    )
+    SELECT COUNT(*)::INTEGER FROM advanced;
+$$ LANGUAGE sql VOLATILE;
+
+-- One keyset page of due rent reminders, ordered by id: unrecorded, next reminder on or
+-- before today and still under max_reminders. The RPC result is capped by max-rows like
+-- any other read, so callers page with p_after_id instead of reading them all at once.
+-- Reminders whose delivery has failed on p_max_failures days since they were last sent
+-- are left out, so an unreachable recipient or relay stops being retried.
+-- plpgsql with a declared result so it can be created before rent_reminders exists.
+CREATE OR REPLACE FUNCTION get_due_reminders_page(p_after_id INTEGER, p_limit INTEGER, p_max_failures INTEGER)
+RETURNS TABLE (
+    id INTEGER,
+    property_id INTEGER,
+    organization_id INTEGER,
+    user_id TEXT,
+    reminder_month INTEGER,
+    reminder_year INTEGER,
+    reminder_date DATE,
+    last_sent_date DATE,
+    next_reminder_date DATE,
+    is_rent_recorded BOOLEAN,
+    reminder_count INTEGER,
+    max_reminders INTEGER,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT r.id::INTEGER, r.property_id::INTEGER, r.organization_id::INTEGER, r.user_id::TEXT,
+           r.reminder_month::INTEGER, r.reminder_year::INTEGER, r.reminder_date::DATE,
+           r.last_sent_date::DATE, r.next_reminder_date::DATE, r.is_rent_recorded,
+           r.reminder_count::INTEGER, r.max_reminders::INTEGER,
+           r.created_at::TIMESTAMPTZ, r.updated_at::TIMESTAMPTZ
+    FROM rent_reminders r
+    WHERE r.id > p_after_id
+      AND NOT r.is_rent_recorded
+      AND r.next_reminder_date <= CURRENT_DATE
+      AND r.reminder_count < r.max_reminders
+      AND (
+          SELECT COUNT(DISTINCT n.created_at::DATE)
+          FROM reminder_notifications n
+          WHERE n.reminder_id = r.id
+            AND NOT n.delivered
+            AND (r.last_sent_date IS NULL OR n.created_at::DATE > r.last_sent_date)
+      ) < p_max_failures
+    ORDER BY r.id
+    LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Push reminders' next reminder date p_days out without counting a send: used to retry
+-- undelivered reminders on a later day and to skip reminders with no recipient address.
+CREATE OR REPLACE FUNCTION defer_reminders(p_ids INTEGER[], p_days INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    deferred INTEGER;
+BEGIN
+    UPDATE rent_reminders
+    SET next_reminder_date = CURRENT_DATE + p_days
+    WHERE id = ANY(p_ids);
+    GET DIAGNOSTICS deferred = ROW_COUNT;
+    RETURN deferred;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+-- Record a dispatched batch of rent reminders in one call: stamp today as the send date,
+-- schedule the next reminder five days out and bump the count, all server-side.
+-- plpgsql so the function can be created before the reminders setup script has
+-- created rent_reminders.
+CREATE OR REPLACE FUNCTION mark_reminders_sent(p_ids INTEGER[])
+RETURNS INTEGER AS $$
+DECLARE
+    marked INTEGER;
+BEGIN
+    UPDATE rent_reminders
+    SET last_sent_date = CURRENT_DATE,
+        next_reminder_date = CURRENT_DATE + 5,
+        reminder_count = reminder_count + 1
+    WHERE id = ANY(p_ids);
+    GET DIAGNOSTICS marked = ROW_COUNT;
+    RETURN marked;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+-- Delivery log for rent reminder notifications, one row per reminder, channel and
+-- recipient. The dispatcher records results in bulk as batches complete.
+CREATE TABLE IF NOT EXISTS reminder_notifications (
+    id BIGSERIAL PRIMARY KEY,
+    reminder_id INTEGER NOT NULL,
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    channel VARCHAR(10) NOT NULL CHECK (channel IN ('email', 'sms')),
+    recipient TEXT NOT NULL,
+    delivered BOOLEAN NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_reminder_notifications_reminder ON reminder_notifications(reminder_id);
+CREATE INDEX IF NOT EXISTS idx_reminder_notifications_org_created ON reminder_notifications(organization_id, created_at);
+
+ALTER TABLE reminder_notifications ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view reminder notifications in their organizations" ON reminder_notifications;
+CREATE POLICY "Users can view reminder notifications in their organizations" ON reminder_notifications
+    FOR SELECT USING (
+        organization_id IN (
+            SELECT organization_id 
+            FROM user_organizations 
+            WHERE user_id = auth.uid()
+        )
+    );
+
+DROP POLICY IF EXISTS "Users can insert reminder notifications in their organizations" ON reminder_notifications;
+CREATE POLICY "Users can insert reminder notifications in their organizations" ON reminder_notifications
+    FOR INSERT WITH CHECK (
+        organization_id IN (
+            SELECT organization_id 
+            FROM user_organizations 
+            WHERE user_id = auth.uid()
+        )
+    );
+
+-- Email and phone of the users reminders are sent to. auth.users is not exposed through
+-- the API, so this reads it as the definer, limited to the service role, the caller and
+-- members of the caller's organizations.
+CREATE OR REPLACE FUNCTION get_user_contacts(p_user_ids UUID[])
+RETURNS TABLE (
+    user_id UUID,
+    email TEXT,
+    phone TEXT
+) AS $$
+    SELECT u.id, u.email::TEXT, NULLIF(u.phone, '')::TEXT
+    FROM auth.users u
+    WHERE u.id = ANY(p_user_ids)
+      AND (
+          auth.role() = 'service_role'
+          OR u.id = auth.uid()
+          OR EXISTS (
+              SELECT 1
+              FROM user_organizations mine
+              JOIN user_organizations theirs ON theirs.organization_id = mine.organization_id
+              WHERE mine.user_id = auth.uid() AND theirs.user_id = u.id
+          )
+      );
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
 
 -- Grant necessary permissions
 GRANT USAGE ON SCHEMA public TO anon, authenticated;
@@ -426,6 +856,10 @@ GRANT ALL ON ALL TABLES IN SCHEMA public TO anon, authenticated;
 GRANT ALL ON ALL SEQUENCES IN SCHEMA public TO anon, authenticated;
 GRANT ALL ON ALL FUNCTIONS IN SCHEMA public TO anon, authenticated;
 
+-- The rollup helper is SECURITY DEFINER and only meant for the ledger triggers; without
+-- this any API caller could rewrite another organization's rollup
+REVOKE EXECUTE ON FUNCTION bump_ledger_monthly_rollup(INTEGER, INTEGER, DATE, TEXT, TEXT, NUMERIC, INTEGER) FROM PUBLIC, anon, authenticated;
+
 -- Insert sample data for testing (optional)
 -- Note: This will only work if you have a user with a specific UUID
 -- You can remove this section if you don't want sample data
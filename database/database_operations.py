@@ -1,15 +1,130 @@
 from database.supabase_client import get_supabase_client
-from database.models import Property, Income, Expense, Category, Organization, UserOrganization, Budget, BudgetLine, BudgetPeriod, BudgetScope, RecurringTransaction, PendingTransaction
-from typing import List, Optional
+from database.query_cache import query_cache, cached_query
+from database.models import Property, Income, Expense, Category, Organization, UserOrganization, Budget, BudgetLine, BudgetPeriod, BudgetScope, RecurringTransaction, PendingTransaction, LedgerRollup, IncomeType, ExpenseType
+from typing import Callable, Iterator, List, Optional
+import pandas as pd
 import streamlit as st
-from datetime import datetime
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+import threading
+
+# Rows fetched per request by iter_rows. Must not exceed the PostgREST
+# max-rows setting (1000 on Supabase by default), otherwise a capped page
+# is mistaken for the last one.
+DEFAULT_PAGE_SIZE = 1000
+
+# Rows per multi-row insert in create_incomes/create_expenses
+DEFAULT_INSERT_BATCH_SIZE = 500
+
+# Upper bound on concurrent requests issued by DatabaseOperations.gather
+GATHER_MAX_WORKERS = 8
+
+# Columns selected for ledger DataFrames; the type column is appended per table
+LEDGER_FRAME_COLUMNS = ["id", "organization_id", "property_id", "amount", "description", "transaction_date"]
 
 class DatabaseOperations:
     def __init__(self):
         self.client = get_supabase_client()
         self.supabase = self.client  # Alias for compatibility with rent reminder service
+        self.cache = query_cache
+
+    def invalidate_cache(self, tables: List[str], organization_id: int = None):
+        """Drop cached reads of tables after a write that bypasses DatabaseOperations"""
+        self.cache.invalidate(tables, organization_id)
+    
+    # Concurrency
+    def gather(self, *calls: Callable) -> list:
+        """Run independent reads concurrently and return their results in call order.
+
+        Each call is a zero-argument callable, e.g. lambda: db.get_income_frame(org_id).
+        The worker threads share the Supabase client's HTTP connection pool, so a page
+        loading N unrelated queries waits for the slowest one instead of all N in turn.
+        Worker threads are attached to the current script run so st.error and the
+        other st.* calls in the error handlers still render.
+        """
+        if len(calls) < 2:
+            return [call() for call in calls]
+
+        ctx = get_script_run_ctx()
+
+        def attach_context():
+            if ctx is not None:
+                add_script_run_ctx(threading.current_thread(), ctx)
+
+        with ThreadPoolExecutor(max_workers=min(len(calls), GATHER_MAX_WORKERS), initializer=attach_context) as pool:
+            futures = [pool.submit(call) for call in calls]
+            return [future.result() for future in futures]
+
+    # Paging
+    def iter_rows(self, table: str, filters: Optional[list] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                  columns: str = "*", desc: bool = False) -> Iterator[dict]:
+        """Stream rows from a ledger table, keyset-paginated on (transaction_date, id).
+
+        `filters` is a list of (operator, column, value) tuples applied with the
+        matching PostgREST builder method, e.g. ("eq", "organization_id", 1).
+        Pages are fetched lazily, so callers can aggregate or build a DataFrame
+        without holding more than one page of raw rows at a time.
+        """
+        last_row = None
+        while True:
+            query = self.client.table(table).select(columns)
+            for operator, column, value in filters or []:
+                query = getattr(query, operator)(column, value)
+            if last_row is not None:
+                query = query.or_(self._keyset_condition(last_row, desc))
+            result = query.order("transaction_date", desc=desc).order("id", desc=desc).limit(page_size).execute()
+            rows = result.data or []
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last_row = rows[-1]
+
+    def iter_rows_by_id(self, table: str, filters: Optional[list] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                        columns: str = "*") -> Iterator[dict]:
+        """Stream rows from any table with an id column, keyset-paginated on id.
+
+        Takes the same (operator, column, value) filters as iter_rows; use it for reads
+        that can exceed the server's max-rows cap, such as an organization's properties.
+        """
+        last_id = None
+        while True:
+            query = self.client.table(table).select(columns)
+            for operator, column, value in filters or []:
+                query = getattr(query, operator)(column, value)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            result = query.order("id").limit(page_size).execute()
+            rows = result.data or []
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]['id']
+
+    @staticmethod
+    def _keyset_condition(last_row: dict, desc: bool) -> str:
+        """PostgREST `or` filter selecting rows strictly after last_row in (transaction_date, id) order"""
+        op = "lt" if desc else "gt"
+        last_date = f'"{last_row["transaction_date"]}"'
+        return f"transaction_date.{op}.{last_date},and(transaction_date.eq.{last_date},id.{op}.{last_row['id']})"
+
+    @staticmethod
+    def _ledger_filters(organization_id: int = None, property_id: int = None, start_date: datetime = None, end_date: datetime = None) -> list:
+        """Build iter_rows filters for an optional organization, property and inclusive date range"""
+        filters = []
+        if organization_id:
+            filters.append(("eq", "organization_id", organization_id))
+        if property_id:
+            filters.append(("eq", "property_id", property_id))
+        if start_date:
+            filters.append(("gte", "transaction_date", start_date.isoformat()))
+        if end_date:
+            filters.append(("lte", "transaction_date", end_date.isoformat()))
+        return filters
     
     # Organization Operations
+    @cached_query("organizations", "user_organizations")
     def get_user_organizations(self, user_id: str) -> List[Organization]:
         """Get all organizations for a user"""
         try:
@@ -21,9 +136,27 @@ class DatabaseOperations:
                     organizations.append(Organization(**org_data))
             return organizations
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching user organizations: {str(e)}")
             return []
     
+    def get_organization_ids(self, page_size: int = DEFAULT_PAGE_SIZE) -> Optional[List[int]]:
+        """Ids of every organization in ascending order, for jobs that work through all of them (None on failure)"""
+        try:
+            ids = []
+            while True:
+                query = self.client.table("organizations").select("id").order("id").limit(page_size)
+                if ids:
+                    query = query.gt("id", ids[-1])
+                result = query.execute()
+                ids.extend(row['id'] for row in result.data)
+                if len(result.data) < page_size:
+                    return ids
+        except Exception as e:
+            st.error(f"Error fetching organization ids: {str(e)}")
+            return None
+    
+    @cached_query("organizations", organization_arg="org_id")
     def get_organization_by_id(self, org_id: int) -> Optional[Organization]:
         """Get organization by ID"""
         try:
@@ -32,6 +165,7 @@ class DatabaseOperations:
                 return Organization(**result.data[0])
             return None
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching organization: {str(e)}")
             return None
     
@@ -54,6 +188,7 @@ class DatabaseOperations:
                 )
                 user_org_dict = user_org.dict(exclude={'id', 'joined_at'})
                 self.client.table("user_organizations").insert(user_org_dict).execute()
+                self.cache.invalidate(["organizations", "user_organizations"])
                 
                 return org
             return None
@@ -75,6 +210,7 @@ class DatabaseOperations:
                 property_dict['organization_id'] = organization_id
             
             result = self.client.table("properties").insert(property_dict).execute()
+            self.cache.invalidate(["properties"], organization_id)
             if result.data:
                 return Property(**result.data[0])
             return None
@@ -82,15 +218,18 @@ class DatabaseOperations:
             st.error(f"Error creating property: {str(e)}")
             return None
     
+    @cached_query("properties")
     def get_properties(self) -> List[Property]:
         """Get all properties"""
         try:
             result = self.client.table("properties").select("*").execute()
             return [Property(**prop) for prop in result.data]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching properties: {str(e)}")
             return []
     
+    @cached_query("properties")
     def get_property(self, property_id: int) -> Optional[Property]:
         """Get a specific property by ID"""
         try:
@@ -99,9 +238,11 @@ class DatabaseOperations:
                 return Property(**result.data[0])
             return None
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching property: {str(e)}")
             return None
     
+    @cached_query("properties")
     def get_property_by_id(self, property_id: str) -> Optional[Property]:
         """Get a specific property by ID (string version for rent reminders)"""
         try:
@@ -110,18 +251,36 @@ class DatabaseOperations:
                 return Property(**result.data[0])
             return None
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching property: {str(e)}")
             return None
     
+    def get_properties_by_ids(self, property_ids: List[int], batch_size: int = DEFAULT_PAGE_SIZE) -> Optional[dict]:
+        """Properties for a set of ids, across organizations, as {id: Property}; one in_ query per batch_size ids.
+
+        Returns None if any batch fails, so callers can tell a failed read from ids that don't exist.
+        """
+        property_ids = sorted(set(property_ids))
+        properties = {}
+        try:
+            for start in range(0, len(property_ids), batch_size):
+                result = self.client.table("properties").select("*").in_(
+                    "id", property_ids[start:start + batch_size]
+                ).execute()
+                properties.update((row['id'], Property(**row)) for row in result.data)
+            return properties
+        except Exception as e:
+            self.cache.mark_failed()
+            st.error(f"Error fetching properties: {str(e)}")
+            return None
+    
+    @cached_query("properties", organization_arg="organization_id")
     def get_properties_by_organization(self, organization_id: str) -> List[Property]:
         """Get all properties for a specific organization"""
         try:
-            result = self.client.table("properties").select("*").eq("organization_id", organization_id).execute()
-            properties = []
-            for row in result.data:
-                properties.append(Property(**row))
-            return properties
+            return [Property(**row) for row in self.iter_rows_by_id("properties", [("eq", "organization_id", organization_id)])]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching properties by organization: {str(e)}")
             return []
     
@@ -132,6 +291,7 @@ class DatabaseOperations:
             property_dict['purchase_date'] = property_dict['purchase_date'].isoformat()
             
             result = self.client.table("properties").update(property_dict).eq("id", property_id).execute()
+            self.cache.invalidate(["properties"])
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error updating property: {str(e)}")
@@ -141,6 +301,8 @@ class DatabaseOperations:
         """Delete a property"""
         try:
             result = self.client.table("properties").delete().eq("id", property_id).execute()
+            # Ledger rows and budgets cascade with the property
+            self.cache.invalidate(["properties", "income", "expenses", "budgets", "budget_lines"])
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error deleting property: {str(e)}")
@@ -160,6 +322,7 @@ class DatabaseOperations:
                 income_dict['organization_id'] = organization_id
             
             result = self.client.table("income").insert(income_dict).execute()
+            self.cache.invalidate(["income"], income_dict.get('organization_id'))
             if result.data:
                 return Income(**result.data[0])
             return None
@@ -167,24 +330,45 @@ class DatabaseOperations:
             st.error(f"Error creating income: {str(e)}")
             return None
     
+    def create_incomes(self, incomes: List[Income], user_id: str = None, organization_id: int = None,
+                       batch_size: int = DEFAULT_INSERT_BATCH_SIZE) -> dict:
+        """Create income records with multi-row inserts; see _insert_ledger_rows for the result"""
+        return self._insert_ledger_rows("income", incomes, user_id, organization_id, batch_size)
+    
+    @cached_query("income")
     def get_income_by_property(self, property_id: int) -> List[Income]:
         """Get all income records for a property"""
         try:
             result = self.client.table("income").select("*").eq("property_id", property_id).order("transaction_date", desc=True).execute()
             return [Income(**inc) for inc in result.data]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching income: {str(e)}")
             return []
     
+    @cached_query("income")
     def get_all_income(self) -> List[Income]:
         """Get all income records"""
         try:
-            result = self.client.table("income").select("*").order("transaction_date", desc=True).execute()
-            return [Income(**inc) for inc in result.data]
+            return [Income(**inc) for inc in self.iter_rows("income", desc=True)]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching income: {str(e)}")
             return []
-    
+
+    @cached_query("income", organization_arg="organization_id")
+    def get_income_by_organization(self, organization_id: int, property_id: int = None, start_date: datetime = None, end_date: datetime = None,
+                                   limit: int = None) -> List[Income]:
+        """Get income records for an organization, newest first, optionally narrowed to a property, date range and count"""
+        try:
+            filters = self._ledger_filters(organization_id, property_id, start_date, end_date)
+            rows = self.iter_rows("income", filters, page_size=min(limit, DEFAULT_PAGE_SIZE) if limit else DEFAULT_PAGE_SIZE, desc=True)
+            return [Income(**inc) for inc in islice(rows, limit)]
+        except Exception as e:
+            self.cache.mark_failed()
+            st.error(f"Error fetching organization income: {str(e)}")
+            return []
+
     # Expense Operations
     def create_expense(self, expense: Expense, user_id: str = None, organization_id: int = None) -> Optional[Expense]:
         """Create a new expense record"""
@@ -199,6 +383,7 @@ class DatabaseOperations:
                 expense_dict['organization_id'] = organization_id
             
             result = self.client.table("expenses").insert(expense_dict).execute()
+            self.cache.invalidate(["expenses"], expense_dict.get('organization_id'))
             if result.data:
                 return Expense(**result.data[0])
             return None
@@ -206,28 +391,144 @@ class DatabaseOperations:
             st.error(f"Error creating expense: {str(e)}")
             return None
     
+    def create_expenses(self, expenses: List[Expense], user_id: str = None, organization_id: int = None,
+                        batch_size: int = DEFAULT_INSERT_BATCH_SIZE) -> dict:
+        """Create expense records with multi-row inserts; see _insert_ledger_rows for the result"""
+        return self._insert_ledger_rows("expenses", expenses, user_id, organization_id, batch_size)
+    
+    def _insert_ledger_rows(self, table: str, records: list, user_id: str = None, organization_id: int = None,
+                            batch_size: int = DEFAULT_INSERT_BATCH_SIZE) -> dict:
+        """Insert ledger records batch_size rows per request.
+
+        A batch that fails is retried row by row, so one bad record doesn't sink its
+        neighbours. Returns {'ids': [...], 'errors': [{'index': i, 'error': message}]},
+        with ids aligned to the input and None where the row failed.
+        """
+        rows = []
+        for record in records:
+            row = record.dict(exclude={'id', 'created_at', 'updated_at'})
+            row['transaction_date'] = row['transaction_date'].isoformat()
+            # Add user_id and organization_id for RLS compliance
+            if user_id:
+                row['user_id'] = user_id
+            if organization_id:
+                row['organization_id'] = organization_id
+            rows.append(row)
+
+        ids, errors = [None] * len(rows), []
+        for start in range(0, len(rows), max(1, batch_size)):
+            batch = rows[start:start + batch_size]
+            try:
+                result = self.client.table(table).insert(batch).execute()
+                for offset, created in enumerate(result.data or []):
+                    ids[start + offset] = created['id']
+            except Exception:
+                for offset, row in enumerate(batch):
+                    try:
+                        result = self.client.table(table).insert(row).execute()
+                        ids[start + offset] = result.data[0]['id'] if result.data else None
+                    except Exception as e:
+                        errors.append({'index': start + offset, 'error': str(e)})
+
+        for org_id in {row.get('organization_id') for row in rows}:
+            self.cache.invalidate([table], org_id)
+        if errors:
+            st.error(f"Error creating {table}: {len(errors)} of {len(rows)} records failed, e.g. {errors[0]['error']}")
+        return {'ids': ids, 'errors': errors}
+    
+    @cached_query("expenses")
     def get_expenses_by_property(self, property_id: int) -> List[Expense]:
         """Get all expense records for a property"""
         try:
             result = self.client.table("expenses").select("*").eq("property_id", property_id).order("transaction_date", desc=True).execute()
             return [Expense(**exp) for exp in result.data]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching expenses: {str(e)}")
             return []
     
+    @cached_query("expenses")
     def get_all_expenses(self) -> List[Expense]:
         """Get all expense records"""
         try:
-            result = self.client.table("expenses").select("*").order("transaction_date", desc=True).execute()
-            return [Expense(**exp) for exp in result.data]
+            return [Expense(**exp) for exp in self.iter_rows("expenses", desc=True)]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching expenses: {str(e)}")
             return []
-    
+
+    @cached_query("expenses", organization_arg="organization_id")
+    def get_expenses_by_organization(self, organization_id: int, property_id: int = None, start_date: datetime = None, end_date: datetime = None,
+                                     limit: int = None) -> List[Expense]:
+        """Get expense records for an organization, newest first, optionally narrowed to a property, date range and count"""
+        try:
+            filters = self._ledger_filters(organization_id, property_id, start_date, end_date)
+            rows = self.iter_rows("expenses", filters, page_size=min(limit, DEFAULT_PAGE_SIZE) if limit else DEFAULT_PAGE_SIZE, desc=True)
+            return [Expense(**exp) for exp in islice(rows, limit)]
+        except Exception as e:
+            self.cache.mark_failed()
+            st.error(f"Error fetching organization expenses: {str(e)}")
+            return []
+
+    # DataFrame Operations
+    @staticmethod
+    def _ledger_frame(rows: Iterator[dict], type_column: str, types) -> pd.DataFrame:
+        """Build a typed ledger DataFrame straight from JSON rows, without per-row model construction"""
+        columns = LEDGER_FRAME_COLUMNS + [type_column]
+        df = pd.DataFrame.from_records(list(rows), columns=columns)
+        return df.astype({
+            "id": "Int64",
+            "organization_id": "Int64",
+            "property_id": "Int64",
+            "amount": "float64",
+            "description": "string",
+            type_column: pd.CategoricalDtype([t.value for t in types]),
+        }).assign(transaction_date=pd.to_datetime(df["transaction_date"], format="ISO8601"))
+
+    @cached_query("income", organization_arg="organization_id")
+    def get_income_frame(self, organization_id: int = None, property_id: int = None, start_date: datetime = None,
+                         end_date: datetime = None) -> pd.DataFrame:
+        """Get income records as a DataFrame: datetime64 transaction_date, categorical income_type, float64 amount"""
+        try:
+            filters = self._ledger_filters(organization_id, property_id, start_date, end_date)
+            columns = ", ".join(LEDGER_FRAME_COLUMNS + ["income_type"])
+            return self._ledger_frame(self.iter_rows("income", filters, columns=columns), "income_type", IncomeType)
+        except Exception as e:
+            self.cache.mark_failed()
+            st.error(f"Error fetching income: {str(e)}")
+            return self._ledger_frame([], "income_type", IncomeType)
+
+    @cached_query("expenses", organization_arg="organization_id")
+    def get_expenses_frame(self, organization_id: int = None, property_id: int = None, start_date: datetime = None,
+                           end_date: datetime = None) -> pd.DataFrame:
+        """Get expense records as a DataFrame: datetime64 transaction_date, categorical expense_type, float64 amount"""
+        try:
+            filters = self._ledger_filters(organization_id, property_id, start_date, end_date)
+            columns = ", ".join(LEDGER_FRAME_COLUMNS + ["expense_type"])
+            return self._ledger_frame(self.iter_rows("expenses", filters, columns=columns), "expense_type", ExpenseType)
+        except Exception as e:
+            self.cache.mark_failed()
+            st.error(f"Error fetching expenses: {str(e)}")
+            return self._ledger_frame([], "expense_type", ExpenseType)
+
     # Financial Summary Operations
+    @cached_query("properties", "income", "expenses")
     def get_property_financial_summary(self, property_id: int, start_date: datetime = None, end_date: datetime = None) -> dict:
         """Get financial summary for a property"""
         try:
+            if not start_date and not end_date:
+                # All-time totals come pre-aggregated from the summary view
+                result = self.client.table("property_financial_summary").select(
+                    "total_income, total_expenses, net_income, roi_percentage"
+                ).eq("id", property_id).execute()
+                row = result.data[0] if result.data else {}
+                return {
+                    'total_income': float(row.get('total_income', 0)),
+                    'total_expenses': float(row.get('total_expenses', 0)),
+                    'net_income': float(row.get('net_income', 0)),
+                    'roi': float(row.get('roi_percentage', 0))
+                }
+            
             income_query = self.client.table("income").select("amount").eq("property_id", property_id)
             expense_query = self.client.table("expenses").select("amount").eq("property_id", property_id)
             
@@ -253,9 +554,96 @@ class DatabaseOperations:
                 'roi': (net_income / total_income * 100) if total_income > 0 else 0
             }
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error calculating financial summary: {str(e)}")
             return {'total_income': 0, 'total_expenses': 0, 'net_income': 0, 'roi': 0}
     
+    @cached_query("properties", "income", "expenses", organization_arg="organization_id")
+    def get_organization_financial_summary(self, organization_id: int) -> dict:
+        """Get all-time income, expense and net totals for an organization from the summary view"""
+        try:
+            # Paged, so organizations with more properties than the max-rows cap are fully counted
+            total_income = total_expenses = 0.0
+            for row in self.iter_rows_by_id("property_financial_summary", [("eq", "organization_id", organization_id)],
+                                            columns="id, total_income, total_expenses"):
+                total_income += float(row['total_income'])
+                total_expenses += float(row['total_expenses'])
+            return {
+                'total_income': total_income,
+                'total_expenses': total_expenses,
+                'net_income': total_income - total_expenses
+            }
+        except Exception as e:
+            self.cache.mark_failed()
+            st.error(f"Error calculating organization summary: {str(e)}")
+            return {'total_income': 0, 'total_expenses': 0, 'net_income': 0}
+    
+    @cached_query("properties", "income", "expenses", organization_arg="organization_id")
+    def get_financial_summaries(self, organization_id: int, start_date: datetime = None, end_date: datetime = None) -> dict:
+        """Get financial summaries for every property in an organization in one call, keyed by property ID"""
+        try:
+            params = {
+                "p_organization_id": organization_id,
+                "p_start_date": start_date.isoformat() if start_date else None,
+                "p_end_date": end_date.isoformat() if end_date else None
+            }
+            result = self.client.rpc("get_property_financial_summaries", params).execute()
+            return {
+                row['property_id']: {
+                    'total_income': float(row['total_income']),
+                    'total_expenses': float(row['total_expenses']),
+                    'net_income': float(row['net_income']),
+                    'roi': float(row['roi'])
+                }
+                for row in result.data or []
+            }
+        except Exception as e:
+            self.cache.mark_failed()
+            st.error(f"Error calculating financial summaries: {str(e)}")
+            return {}
+    
+    # Ledger Rollup Operations
+    @cached_query("income", "expenses", organization_arg="organization_id")
+    def get_monthly_rollup(self, organization_id: int, start_date: datetime = None, end_date: datetime = None,
+                           property_id: int = None, kind: str = None) -> List[LedgerRollup]:
+        """Get pre-aggregated monthly totals by type, per property or for the whole organization.
+
+        Dates are matched at month granularity: any month overlapping the range is included.
+        """
+        try:
+            if property_id:
+                query = self.client.table("ledger_monthly_rollup").select("*").eq("property_id", property_id)
+            else:
+                query = self.client.table("ledger_monthly_org_rollup").select("*")
+            query = query.eq("organization_id", organization_id)
+            if kind:
+                query = query.eq("kind", kind)
+            if start_date:
+                query = query.gte("month", start_date.replace(day=1).isoformat())
+            if end_date:
+                query = query.lte("month", end_date.isoformat())
+            result = query.order("month").execute()
+            return [LedgerRollup(**row) for row in result.data]
+        except Exception as e:
+            self.cache.mark_failed()
+            st.error(f"Error fetching ledger rollup: {str(e)}")
+            return []
+    
+    def get_rollup_totals(self, organization_id: int, start_date: datetime = None, end_date: datetime = None,
+                          property_id: int = None, by: str = "type") -> dict:
+        """Sum the monthly rollup into {'income': {key: total}, 'expense': {key: total}}, keyed by type, month ('YYYY-MM') or year"""
+        totals = {'income': {}, 'expense': {}}
+        for row in self.get_monthly_rollup(organization_id, start_date, end_date, property_id):
+            if by == "month":
+                key = row.month.strftime('%Y-%m')
+            elif by == "year":
+                key = row.month.year
+            else:
+                key = row.type
+            bucket = totals[row.kind]
+            bucket[key] = bucket.get(key, 0) + row.total_amount
+        return totals
+    
     # Budget Operations
     def create_budget(self, budget: Budget) -> Optional[Budget]:
         """Create a new budget"""
@@ -265,6 +653,7 @@ class DatabaseOperations:
             budget_dict['end_date'] = budget_dict['end_date'].isoformat()
             
             result = self.client.table("budgets").insert(budget_dict).execute()
+            self.cache.invalidate(["budgets"], budget.organization_id)
             if result.data:
                 return Budget(**result.data[0])
             return None
@@ -272,24 +661,29 @@ class DatabaseOperations:
             st.error(f"Error creating budget: {str(e)}")
             return None
     
+    @cached_query("budgets", organization_arg="organization_id")
     def get_budgets_by_organization(self, organization_id: int) -> List[Budget]:
         """Get all budgets for an organization"""
         try:
             result = self.client.table("budgets").select("*").eq("organization_id", organization_id).order("created_at", desc=True).execute()
             return [Budget(**budget) for budget in result.data]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching budgets: {str(e)}")
             return []
     
+    @cached_query("budgets")
     def get_budgets_by_property(self, property_id: int) -> List[Budget]:
         """Get all budgets for a specific property"""
         try:
             result = self.client.table("budgets").select("*").eq("property_id", property_id).order("created_at", desc=True).execute()
             return [Budget(**budget) for budget in result.data]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching property budgets: {str(e)}")
             return []
     
+    @cached_query("budgets")
     def get_budget_by_id(self, budget_id: int) -> Optional[Budget]:
         """Get a specific budget by ID"""
         try:
@@ -298,6 +692,7 @@ class DatabaseOperations:
                 return Budget(**result.data[0])
             return None
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching budget: {str(e)}")
             return None
     
@@ -309,6 +704,7 @@ class DatabaseOperations:
             budget_dict['end_date'] = budget_dict['end_date'].isoformat()
             
             result = self.client.table("budgets").update(budget_dict).eq("id", budget_id).execute()
+            self.cache.invalidate(["budgets"], budget.organization_id)
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error updating budget: {str(e)}")
@@ -318,6 +714,7 @@ class DatabaseOperations:
         """Delete a budget"""
         try:
             result = self.client.table("budgets").delete().eq("id", budget_id).execute()
+            self.cache.invalidate(["budgets", "budget_lines"])
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error deleting budget: {str(e)}")
@@ -329,6 +726,7 @@ class DatabaseOperations:
             budget_line_dict = budget_line.dict(exclude={'id', 'created_at', 'updated_at'})
             
             result = self.client.table("budget_lines").insert(budget_line_dict).execute()
+            self.cache.invalidate(["budget_lines"])
             if result.data:
                 return BudgetLine(**result.data[0])
             return None
@@ -336,6 +734,7 @@ class DatabaseOperations:
             st.error(f"Error creating budget line: {str(e)}")
             return None
     
+    @cached_query("budget_lines")
     def get_budget_lines(self, budget_id: int) -> List[BudgetLine]:
         """Get all budget lines for a budget"""
         try:
@@ -346,6 +745,7 @@ class DatabaseOperations:
                 budget_lines.append(BudgetLine(**budget_line_data))
             return budget_lines
         except Exception as e:
+            self.cache.mark_failed()
             # If budget_lines table doesn't exist or has issues, return empty list
             # This prevents the error from breaking the budget overview
             return []
@@ -356,6 +756,7 @@ class DatabaseOperations:
             budget_line_dict = budget_line.dict(exclude={'id', 'created_at', 'updated_at'})
             
             result = self.client.table("budget_lines").update(budget_line_dict).eq("id", budget_line_id).execute()
+            self.cache.invalidate(["budget_lines"])
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error updating budget line: {str(e)}")
@@ -365,11 +766,13 @@ class DatabaseOperations:
         """Delete a budget line"""
         try:
             result = self.client.table("budget_lines").delete().eq("id", budget_line_id).execute()
+            self.cache.invalidate(["budget_lines"])
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error deleting budget line: {str(e)}")
             return False
     
+    @cached_query("budgets", "budget_lines", "expenses")
     def get_budget_analysis(self, budget_id: int, start_date: datetime = None, end_date: datetime = None) -> dict:
         """Get budget analysis with actual vs budgeted amounts"""
         try:
@@ -427,6 +830,7 @@ class DatabaseOperations:
             
             return analysis
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error calculating budget analysis: {str(e)}")
             return {}
     
@@ -434,12 +838,13 @@ class DatabaseOperations:
     def create_recurring_transaction(self, recurring_transaction: RecurringTransaction) -> Optional[RecurringTransaction]:
         """Create a new recurring transaction"""
         try:
-            recurring_dict = recurring_transaction.dict(exclude={'id', 'created_at', 'updated_at'})
+            recurring_dict = recurring_transaction.dict(exclude={'id', 'next_due_date', 'created_at', 'updated_at'})
             recurring_dict['start_date'] = recurring_dict['start_date'].isoformat()
             if recurring_dict.get('end_date'):
                 recurring_dict['end_date'] = recurring_dict['end_date'].isoformat()
             
             result = self.client.table("recurring_transactions").insert(recurring_dict).execute()
+            self.cache.invalidate(["recurring_transactions"], recurring_transaction.organization_id)
             if result.data:
                 return RecurringTransaction(**result.data[0])
             return None
@@ -447,24 +852,70 @@ class DatabaseOperations:
             st.error(f"Error creating recurring transaction: {str(e)}")
             return None
     
+    @cached_query("recurring_transactions", organization_arg="organization_id")
     def get_recurring_transactions_by_organization(self, organization_id: int) -> List[RecurringTransaction]:
         """Get all recurring transactions for an organization"""
         try:
             result = self.client.table("recurring_transactions").select("*").eq("organization_id", organization_id).eq("is_active", True).execute()
             return [RecurringTransaction(**rt) for rt in result.data]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching recurring transactions: {str(e)}")
             return []
     
+    def get_due_recurring_transactions(self, as_of: date, organization_ids: Optional[List[int]] = None,
+                                       page_size: int = DEFAULT_PAGE_SIZE) -> Optional[List[RecurringTransaction]]:
+        """Active recurring transactions whose next due date is on or before as_of, across all organizations or only organization_ids.
+
+        Returns None on failure rather than an empty list, so callers don't record the
+        organizations as having nothing due.
+        """
+        try:
+            rules, last_id = [], 0
+            while True:
+                query = self.client.table("recurring_transactions").select("*").eq("is_active", True).lte(
+                    "next_due_date", as_of.isoformat()
+                )
+                if organization_ids is not None:
+                    query = query.in_("organization_id", organization_ids)
+                result = query.gt("id", last_id).order("id").limit(page_size).execute()
+                rules.extend(RecurringTransaction(**rt) for rt in result.data)
+                if len(result.data) < page_size:
+                    return rules
+                last_id = result.data[-1]['id']
+        except Exception as e:
+            st.error(f"Error fetching due recurring transactions: {str(e)}")
+            return None
+    
+    def advance_recurring_due_dates(self, next_due_dates: dict, batch_size: int = DEFAULT_PAGE_SIZE) -> int:
+        """Store {recurring id: next due date or None} after generation, returning how many rules were updated"""
+        items = list(next_due_dates.items())
+        advanced = 0
+        try:
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                result = self.client.rpc("advance_recurring_due_dates", {
+                    "p_ids": [recurring_id for recurring_id, _ in batch],
+                    "p_next_due_dates": [due.isoformat() if due else None for _, due in batch]
+                }).execute()
+                advanced += result.data or 0
+            return advanced
+        except Exception as e:
+            st.error(f"Error advancing recurring due dates: {str(e)}")
+            return advanced
+        finally:
+            self.cache.invalidate(["recurring_transactions"])
+    
     def update_recurring_transaction(self, recurring_id: int, recurring_transaction: RecurringTransaction) -> bool:
         """Update a recurring transaction"""
         try:
-            recurring_dict = recurring_transaction.dict(exclude={'id', 'created_at', 'updated_at'})
+            recurring_dict = recurring_transaction.dict(exclude={'id', 'next_due_date', 'created_at', 'updated_at'})
             recurring_dict['start_date'] = recurring_dict['start_date'].isoformat()
             if recurring_dict.get('end_date'):
                 recurring_dict['end_date'] = recurring_dict['end_date'].isoformat()
             
             result = self.client.table("recurring_transactions").update(recurring_dict).eq("id", recurring_id).execute()
+            self.cache.invalidate(["recurring_transactions"], recurring_transaction.organization_id)
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error updating recurring transaction: {str(e)}")
@@ -474,6 +925,7 @@ class DatabaseOperations:
         """Delete a recurring transaction"""
         try:
             result = self.client.table("recurring_transactions").delete().eq("id", recurring_id).execute()
+            self.cache.invalidate(["recurring_transactions"])
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error deleting recurring transaction: {str(e)}")
@@ -487,6 +939,7 @@ class DatabaseOperations:
             pending_dict['transaction_date'] = pending_dict['transaction_date'].isoformat()
             
             result = self.client.table("pending_transactions").insert(pending_dict).execute()
+            self.cache.invalidate(["pending_transactions"], pending_transaction.organization_id)
             if result.data:
                 return PendingTransaction(**result.data[0])
             return None
@@ -494,16 +947,96 @@ class DatabaseOperations:
             st.error(f"Error creating pending transaction: {str(e)}")
             return None
     
+    def create_pending_transactions(self, pending_transactions: List[PendingTransaction],
+                                    batch_size: int = DEFAULT_INSERT_BATCH_SIZE) -> Optional[int]:
+        """Insert generated pending transactions in batches, returning how many were new (None on failure).
+
+        Occurrences already recorded for their recurring rule, confirmed or not, are
+        skipped by the (recurring_transaction_id, transaction_date) unique key, so
+        concurrent or repeated generation can't create duplicates. Occurrences already
+        in the ledger are skipped too, which covers confirmations made before migration
+        006 and confirmed markers removed by prune_confirmed_pending_transactions.
+        """
+        rows = []
+        try:
+            recorded = self._recorded_occurrences(pending_transactions)
+        except Exception as e:
+            st.error(f"Error checking recorded transactions: {str(e)}")
+            return None
+        for pending_transaction in pending_transactions:
+            if self._occurrence_key(pending_transaction) in recorded:
+                continue
+            pending_dict = pending_transaction.dict(exclude={'id', 'created_at', 'updated_at'})
+            pending_dict['transaction_date'] = pending_dict['transaction_date'].isoformat()
+            rows.append(pending_dict)
+
+        created = 0
+        try:
+            for start in range(0, len(rows), max(1, batch_size)):
+                result = self.client.table("pending_transactions").upsert(
+                    rows[start:start + batch_size],
+                    on_conflict="recurring_transaction_id,transaction_date",
+                    ignore_duplicates=True
+                ).execute()
+                created += len(result.data or [])
+            return created
+        except Exception as e:
+            st.error(f"Error creating pending transactions: {str(e)}")
+            return None
+        finally:
+            for organization_id in {row['organization_id'] for row in rows}:
+                self.cache.invalidate(["pending_transactions"], organization_id)
+    
+    @staticmethod
+    def _occurrence_key(pending_transaction: PendingTransaction) -> tuple:
+        category = pending_transaction.income_type if pending_transaction.transaction_type == "income" else pending_transaction.expense_type
+        return (
+            pending_transaction.property_id,
+            pending_transaction.transaction_type,
+            getattr(category, "value", category),
+            pending_transaction.transaction_date.date().isoformat()
+        )
+
+    def _recorded_occurrences(self, pending_transactions: List[PendingTransaction], batch_size: int = 200) -> set:
+        """Occurrence keys of income and expense rows on the same property, category and date as a pending transaction.
+
+        Amounts are not compared, so a confirmation whose amount was edited afterwards still counts.
+        """
+        recorded = set()
+        for kind, table, type_column in (("income", "income", "income_type"), ("expense", "expenses", "expense_type")):
+            candidates = [pending for pending in pending_transactions if pending.transaction_type == kind]
+            if not candidates:
+                continue
+            property_ids = sorted({pending.property_id for pending in candidates})
+            dates = sorted({pending.transaction_date.date().isoformat() for pending in candidates})
+            for start in range(0, len(property_ids), batch_size):
+                filters = [("in_", "property_id", property_ids[start:start + batch_size]), ("in_", "transaction_date", dates)]
+                for row in self.iter_rows(table, filters, columns=f"id, property_id, {type_column}, transaction_date"):
+                    recorded.add((row['property_id'], kind, row[type_column], row['transaction_date'][:10]))
+        return recorded
+
+    def prune_confirmed_pending_transactions(self, before: date) -> Optional[int]:
+        """Delete confirmed occurrence markers dated before `before`, returning how many were removed (None on failure)"""
+        try:
+            result = self.client.rpc("prune_confirmed_pending_transactions", {"p_before": before.isoformat()}).execute()
+            self.cache.invalidate(["pending_transactions"])
+            return result.data or 0
+        except Exception as e:
+            st.error(f"Error pruning confirmed pending transactions: {str(e)}")
+            return None
+
+    @cached_query("pending_transactions", organization_arg="organization_id")
     def get_pending_transactions_by_organization(self, organization_id: int, transaction_type: str = None) -> List[PendingTransaction]:
         """Get all pending transactions for an organization"""
         try:
-            query = self.client.table("pending_transactions").select("*").eq("organization_id", organization_id)
+            # Confirmed rows stay behind as markers for generation and aren't pending any more
+            filters = [("eq", "organization_id", organization_id), ("eq", "is_confirmed", False)]
             if transaction_type:
-                query = query.eq("transaction_type", transaction_type)
+                filters.append(("eq", "transaction_type", transaction_type))
             
-            result = query.order("transaction_date", desc=True).execute()
-            return [PendingTransaction(**pt) for pt in result.data]
+            return [PendingTransaction(**pt) for pt in self.iter_rows("pending_transactions", filters, desc=True)]
         except Exception as e:
+            self.cache.mark_failed()
             st.error(f"Error fetching pending transactions: {str(e)}")
             return []
     
@@ -514,6 +1047,7 @@ class DatabaseOperations:
             pending_dict['transaction_date'] = pending_dict['transaction_date'].isoformat()
             
             result = self.client.table("pending_transactions").update(pending_dict).eq("id", pending_id).execute()
+            self.cache.invalidate(["pending_transactions"], pending_transaction.organization_id)
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error updating pending transaction: {str(e)}")
@@ -523,6 +1057,7 @@ class DatabaseOperations:
         """Delete a pending transaction"""
         try:
             result = self.client.table("pending_transactions").delete().eq("id", pending_id).execute()
+            self.cache.invalidate(["pending_transactions"])
             return len(result.data) > 0
         except Exception as e:
             st.error(f"Error deleting pending transaction: {str(e)}")
@@ -530,39 +1065,28 @@ class DatabaseOperations:
     
     def confirm_pending_transaction(self, pending_id: int) -> bool:
         """Confirm a pending transaction by moving it to the appropriate table"""
+        return self.confirm_pending_transactions([pending_id]) == 1
+    
+    def confirm_pending_transactions(self, pending_ids: List[int], batch_size: int = DEFAULT_PAGE_SIZE) -> int:
+        """Confirm pending transactions, returning how many were moved.
+
+        Each batch is one atomic call; batches keep the returned rows under the
+        server's max-rows cap so the count stays exact for large selections.
+        """
+        if not pending_ids:
+            return 0
+        pending_ids = [int(pending_id) for pending_id in pending_ids]
+        moved, organization_ids = 0, set()
         try:
-            # Get the pending transaction
-            result = self.client.table("pending_transactions").select("*").eq("id", pending_id).execute()
-            if not result.data:
-                return False
-            
-            pending_data = result.data[0]
-            
-            # Create the appropriate transaction based on type
-            if pending_data['transaction_type'] == 'income':
-                income_data = {
-                    'organization_id': pending_data['organization_id'],
-                    'property_id': pending_data['property_id'],
-                    'amount': pending_data['amount'],
-                    'income_type': pending_data['income_type'],
-                    'description': pending_data['description'],
-                    'transaction_date': pending_data['transaction_date']
-                }
-                self.client.table("income").insert(income_data).execute()
-            else:  # expense
-                expense_data = {
-                    'organization_id': pending_data['organization_id'],
-                    'property_id': pending_data['property_id'],
-                    'amount': pending_data['amount'],
-                    'expense_type': pending_data['expense_type'],
-                    'description': pending_data['description'],
-                    'transaction_date': pending_data['transaction_date']
-                }
-                self.client.table("expenses").insert(expense_data).execute()
-            
-            # Delete the pending transaction
-            self.client.table("pending_transactions").delete().eq("id", pending_id).execute()
-            return True
+            for start in range(0, len(pending_ids), batch_size):
+                result = self.client.rpc("confirm_pending_transactions", {"p_ids": pending_ids[start:start + batch_size]}).execute()
+                confirmed = result.data or []
+                moved += len(confirmed)
+                organization_ids.update(row['organization_id'] for row in confirmed)
+            return moved
         except Exception as e:
-            st.error(f"Error confirming pending transaction: {str(e)}")
-            return False
+            st.error(f"Error confirming pending transactions: {str(e)}")
+            return moved
+        finally:
+            for organization_id in organization_ids:
+                self.cache.invalidate(["pending_transactions", "income", "expenses"], organization_id)
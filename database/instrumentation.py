@@ -0,0 +1,225 @@
+"""
+Query instrumentation
+Wraps the Supabase client to time every PostgREST request and attribute it to a Streamlit rerun and page
+"""
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config import get_query_log_path
+
+# Events kept in memory per rerun; the JSONL log still gets every one
+MAX_RUN_EVENTS = 5000
+
+# Seconds between sweeps for ended Streamlit sessions
+PRUNE_INTERVAL_SECONDS = 60
+
+
+class QueryRecorder:
+    """Collects query events per Streamlit session, grouped into reruns and pages.
+
+    Recording is off unless the session turned it on in begin_run or a JSONL
+    log path is configured, so an uninstrumented rerun only pays for the
+    proxy method calls. Callers outside a Streamlit session that never call
+    begin_run (the generator script, the scheduler daemon) only write to the
+    log, so a long-running process doesn't accumulate events.
+    """
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        # session_id -> current run: {'rerun', 'page', 'enabled', 'started', 'events'}
+        self._runs = {}
+        # session_id -> page -> running totals across reruns
+        self._page_totals = {}
+        self._last_prune = time.monotonic()
+
+    def begin_run(self, page: str, enabled: bool = False):
+        """Start a new rerun for the calling session; queries recorded afterwards are attributed to page"""
+        session_id = _session_id()
+        with self._lock:
+            self._prune_ended_sessions()
+            previous = self._runs.get(session_id)
+            self._runs[session_id] = {
+                'rerun': previous['rerun'] + 1 if previous else 1,
+                'page': page,
+                'enabled': enabled or self.log_path is not None,
+                'keep_events': True,
+                'started': time.perf_counter(),
+                'events': []
+            }
+
+    def is_recording(self) -> bool:
+        with self._lock:
+            return self._current_run(_session_id())['enabled']
+
+    def record(self, table: str, operation: str, filters: list, rows: int, payload_bytes: int, seconds: float):
+        session_id = _session_id()
+        with self._lock:
+            run = self._current_run(session_id)
+            event = {
+                'table': table,
+                'operation': operation,
+                'filters': filters,
+                'rows': rows,
+                'bytes': payload_bytes,
+                'ms': round(seconds * 1000, 2)
+            }
+            if run['keep_events'] and len(run['events']) < MAX_RUN_EVENTS:
+                run['events'].append(event)
+            totals = self._page_totals.setdefault(session_id, {}).setdefault(
+                run['page'], {'queries': 0, 'rows': 0, 'bytes': 0, 'ms': 0.0, 'reruns': set()}
+            )
+            totals['queries'] += 1
+            totals['rows'] += rows
+            totals['bytes'] += payload_bytes
+            totals['ms'] += event['ms']
+            totals['reruns'].add(run['rerun'])
+            if self.log_path:
+                line = {
+                    'timestamp': datetime.now().isoformat(),
+                    'session': session_id,
+                    'rerun': run['rerun'],
+                    'page': run['page'],
+                    **event
+                }
+                with open(self.log_path, 'a', encoding='utf-8') as log_file:
+                    log_file.write(json.dumps(line) + '\n')
+
+    def current_run(self) -> dict:
+        """The calling session's current rerun: page, events and totals"""
+        with self._lock:
+            run = self._current_run(_session_id())
+            events = list(run['events'])
+            return {
+                'rerun': run['rerun'],
+                'page': run['page'],
+                'events': events,
+                'queries': len(events),
+                'rows': sum(event['rows'] for event in events),
+                'bytes': sum(event['bytes'] for event in events),
+                'query_ms': sum(event['ms'] for event in events),
+                'elapsed_ms': (time.perf_counter() - run['started']) * 1000
+            }
+
+    def page_totals(self) -> dict:
+        """Per-page totals for the calling session across all recorded reruns"""
+        with self._lock:
+            totals = self._page_totals.get(_session_id(), {})
+            return {
+                page: {**values, 'reruns': len(values['reruns'])}
+                for page, values in totals.items()
+            }
+
+    def _current_run(self, session_id):
+        run = self._runs.get(session_id)
+        if run is None:
+            # Scripts and other callers outside a Streamlit session never call begin_run;
+            # their run never ends, so its events go to the log only
+            run = self._runs[session_id] = {
+                'rerun': 1,
+                'page': None,
+                'enabled': self.log_path is not None,
+                'keep_events': False,
+                'started': time.perf_counter(),
+                'events': []
+            }
+        return run
+
+    def _prune_ended_sessions(self):
+        """Drop runs and page totals of Streamlit sessions that have closed"""
+        now = time.monotonic()
+        if now - self._last_prune < PRUNE_INTERVAL_SECONDS or not Runtime.exists():
+            return
+        self._last_prune = now
+        runtime = Runtime.instance()
+        for session_id in [sid for sid in self._runs.keys() | self._page_totals.keys() if sid is not None]:
+            if not runtime.is_active_session(session_id):
+                self._runs.pop(session_id, None)
+                self._page_totals.pop(session_id, None)
+
+
+def _session_id():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+class InstrumentedClient:
+    """Supabase client proxy whose table() and rpc() builders report each execute() to a QueryRecorder"""
+
+    def __init__(self, client, recorder: QueryRecorder):
+        self._client = client
+        self._recorder = recorder
+
+    def table(self, table_name: str):
+        return _InstrumentedQuery(self._client.table(table_name), self._recorder, table_name)
+
+    def from_(self, table_name: str):
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, *args, **kwargs):
+        builder = self._client.rpc(fn, params or {}, *args, **kwargs)
+        return _InstrumentedQuery(builder, self._recorder, fn, operation="rpc")
+
+    def __getattr__(self, name):
+        # auth, storage, postgrest and anything else pass straight through
+        return getattr(self._client, name)
+
+
+# Builder methods recorded as the query's operation rather than as a filter
+_OPERATIONS = {"select", "insert", "update", "upsert", "delete"}
+
+
+class _InstrumentedQuery:
+    def __init__(self, builder, recorder: QueryRecorder, table: str, operation: str = None, filters: list = None):
+        self._builder = builder
+        self._recorder = recorder
+        self._table = table
+        self._operation = operation
+        self._filters = filters if filters is not None else []
+
+    def _wrap(self, builder, operation, filters):
+        return _InstrumentedQuery(builder, self._recorder, self._table, operation, filters)
+
+    def execute(self):
+        if not self._recorder.is_recording():
+            return self._builder.execute()
+
+        started = time.perf_counter()
+        response = self._builder.execute()
+        seconds = time.perf_counter() - started
+
+        data = response.data
+        rows = len(data) if isinstance(data, list) else int(bool(data))
+        # Re-encoded size of the decoded payload, close to what came over the wire
+        payload_bytes = len(json.dumps(data, separators=(",", ":"), default=str)) if data else 0
+        self._recorder.record(self._table, self._operation or "select", self._filters, rows, payload_bytes, seconds)
+        return response
+
+    def __getattr__(self, name):
+        attribute = getattr(self._builder, name)
+        if not callable(attribute):
+            # Properties such as not_ return a builder
+            if hasattr(attribute, "execute"):
+                return self._wrap(attribute, self._operation, self._filters + [name.rstrip("_")])
+            return attribute
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            if not hasattr(result, "execute"):
+                return result
+            if name in _OPERATIONS:
+                return self._wrap(result, name, self._filters)
+            # Keep the operator and column; values stay out of the log
+            column = args[0] if args and isinstance(args[0], str) and name != "or_" else None
+            return self._wrap(result, self._operation, self._filters + [f"{name.rstrip('_')} {column}" if column else name.rstrip("_")])
+        return call
+
+
+# One recorder per process; events are separated by Streamlit session inside it
+query_recorder = QueryRecorder(log_path=get_query_log_path())
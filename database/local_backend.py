@@ -0,0 +1,632 @@
+"""
+Local database backend
+Embedded SQLite implementation of the slice of the Supabase client API the app uses,
+so pages, services and scripts can be profiled without a Supabase project
+"""
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Optional
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_schema.sql")
+
+# PostgREST filter operators and their SQL comparison
+_COMPARISONS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class LocalAPIError(Exception):
+    """Raised for failed local queries, worded like the PostgREST errors callers already check for"""
+
+
+class LocalResponse:
+    def __init__(self, data, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class LocalClient:
+    """Drop-in for supabase.Client backed by a SQLite file (or ":memory:")"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        # gather() runs queries from worker threads; SQLite connections need serialized access
+        self._lock = threading.RLock()
+        with open(SCHEMA_PATH, encoding="utf-8") as schema_file:
+            self._connection.executescript(schema_file.read())
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._columns = {}
+        self._boolean_columns = set()
+        self._date_columns = set()
+        self._load_catalog()
+        self.auth = LocalAuth()
+
+    def _load_catalog(self):
+        tables = self._connection.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view')"
+        ).fetchall()
+        for (table,) in tables:
+            info = self._connection.execute(f'PRAGMA table_info("{table}")').fetchall()
+            self._columns[table] = [column["name"] for column in info]
+            for column in info:
+                declared = (column["type"] or "").upper()
+                if declared == "BOOLEAN":
+                    self._boolean_columns.add(column["name"])
+                elif declared == "DATE":
+                    self._date_columns.add((table, column["name"]))
+
+    def table(self, table_name: str) -> "LocalQuery":
+        return LocalQuery(self, table_name)
+
+    def from_(self, table_name: str) -> "LocalQuery":
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, *args, **kwargs) -> "LocalRpc":
+        return LocalRpc(self, fn, params or {})
+
+    def execute_sql(self, sql: str, params=(), many: bool = False) -> list:
+        """Run one statement and return its rows as PostgREST-style dicts"""
+        with self._lock:
+            try:
+                if many:
+                    self._connection.execute("BEGIN")
+                    try:
+                        self._connection.executemany(sql, params)
+                        self._connection.execute("COMMIT")
+                    except Exception:
+                        self._connection.execute("ROLLBACK")
+                        raise
+                    return []
+                cursor = self._connection.execute(sql, params)
+                return [self._to_json(row) for row in cursor.fetchall()]
+            except sqlite3.OperationalError as e:
+                match = re.search(r"no such table: (\w+)", str(e))
+                if match:
+                    raise LocalAPIError(f"Could not find the table 'public.{match.group(1)}' in the schema cache") from e
+                raise LocalAPIError(str(e)) from e
+            except sqlite3.IntegrityError as e:
+                raise LocalAPIError(str(e)) from e
+
+    def execute_many_returning(self, statements: list) -> list:
+        """Run several (sql, params) statements in one transaction, collecting the returned rows"""
+        with self._lock:
+            rows = []
+            try:
+                self._connection.execute("BEGIN")
+                for sql, params in statements:
+                    rows.extend(self._to_json(row) for row in self._connection.execute(sql, params).fetchall())
+                self._connection.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._connection.execute("ROLLBACK")
+                raise LocalAPIError(str(e)) from e
+            return rows
+
+    def columns(self, table: str) -> list:
+        if table not in self._columns:
+            raise LocalAPIError(f"Could not find the table 'public.{table}' in the schema cache")
+        return self._columns[table]
+
+    def is_date_column(self, table: str, column: str) -> bool:
+        return (table, column) in self._date_columns
+
+    def _to_json(self, row: sqlite3.Row) -> dict:
+        data = dict(row)
+        for column in self._boolean_columns.intersection(data):
+            if data[column] is not None:
+                data[column] = bool(data[column])
+        return data
+
+
+def local_user_id(email: str) -> str:
+    """The stable user ID LocalAuth assigns to an email"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"propledger-local:{email}"))
+
+
+class LocalAuth:
+    """Password-less stand-in for supabase.auth: any email signs in as a stable local user"""
+
+    def __init__(self):
+        self._user = None
+
+    def _response(self, credentials: dict):
+        email = credentials.get("email", "local@example.com")
+        self._user = SimpleNamespace(
+            id=local_user_id(email),
+            email=email,
+            user_metadata=credentials.get("options", {}).get("data", {})
+        )
+        return SimpleNamespace(user=self._user, session=None)
+
+    def sign_in_with_password(self, credentials: dict):
+        return self._response(credentials)
+
+    def sign_up(self, credentials: dict):
+        return self._response(credentials)
+
+    def get_user(self, jwt: str = None):
+        return SimpleNamespace(user=self._user) if self._user else None
+
+    def sign_out(self):
+        self._user = None
+
+
+def _to_param(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "value"):  # str enums
+        return value.value
+    return value
+
+
+def _split_top_level(text: str) -> list:
+    """Split a PostgREST logic-tree string on commas outside parentheses and quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _singular(name: str) -> str:
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    return name[:-1] if name.endswith("s") else name
+
+
+class LocalQuery:
+    """Chainable builder mirroring postgrest-py's request builders; SQL is generated on execute()"""
+
+    def __init__(self, client: LocalClient, table: str):
+        self._client = client
+        self._table = table
+        self._operation = "select"
+        self._columns = "*"
+        self._payload = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+        self._returning = True
+        self._count = None
+        self._where = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+
+    # Operations
+    def select(self, *columns, count=None, head=False):
+        self._operation = "select"
+        self._columns = ",".join(columns) if columns else "*"
+        self._count = count
+        return self
+
+    def insert(self, json, *, count=None, returning="representation", upsert=False, default_to_null=True):
+        self._operation = "upsert" if upsert else "insert"
+        self._payload = json
+        self._returning = getattr(returning, "value", returning) != "minimal"
+        return self
+
+    def upsert(self, json, *, count=None, returning="representation", ignore_duplicates=False, on_conflict="", default_to_null=True):
+        self._operation = "upsert"
+        self._payload = json
+        self._returning = getattr(returning, "value", returning) != "minimal"
+        self._ignore_duplicates = ignore_duplicates
+        self._on_conflict = on_conflict or "id"
+        return self
+
+    def update(self, json, *, count=None, returning="representation"):
+        self._operation = "update"
+        self._payload = json
+        self._returning = getattr(returning, "value", returning) != "minimal"
+        return self
+
+    def delete(self, *, count=None, returning="representation"):
+        self._operation = "delete"
+        self._returning = getattr(returning, "value", returning) != "minimal"
+        return self
+
+    # Filters
+    def _compare(self, column: str, operator: str, value):
+        sql, params = self._condition(column, operator, value)
+        self._where.append(sql)
+        self._params.extend(params)
+        return self
+
+    def eq(self, column, value):
+        return self._compare(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._compare(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._compare(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._compare(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._compare(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._compare(column, "lte", value)
+
+    def like(self, column, pattern):
+        return self._compare(column, "like", pattern)
+
+    def ilike(self, column, pattern):
+        return self._compare(column, "ilike", pattern)
+
+    def is_(self, column, value):
+        return self._compare(column, "is", value)
+
+    def in_(self, column, values):
+        return self._compare(column, "in", list(values))
+
+    def or_(self, filters: str, reference_table: str = None):
+        sql, params = self._logic_tree("or", filters)
+        self._where.append(sql)
+        self._params.extend(params)
+        return self
+
+    def order(self, column, *, desc=False, nullsfirst=None, foreign_table=None):
+        direction = "DESC" if desc else "ASC"
+        nulls = "" if nullsfirst is None else (" NULLS FIRST" if nullsfirst else " NULLS LAST")
+        self._order.append(f'"{column}" {direction}{nulls}')
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        self._limit = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def _condition(self, column: str, operator: str, value) -> tuple:
+        """SQL and parameters for one column filter"""
+        quoted = f'"{column}"'
+        if operator == "is":
+            keyword = {None: "NULL", "null": "NULL", True: "TRUE", "true": "TRUE", False: "FALSE", "false": "FALSE"}[value]
+            return f"{quoted} IS {keyword}", []
+        if operator == "in":
+            if not value:
+                return "0", []
+            return f"{quoted} IN ({', '.join('?' for _ in value)})", [_to_param(v) for v in value]
+        if operator in ("like", "ilike"):
+            return f"{quoted} LIKE ?", [str(value).replace("*", "%")]
+
+        value = _to_param(value)
+        if isinstance(value, str) and self._client.is_date_column(self._table, column):
+            return self._date_condition(quoted, operator, value)
+        return f"{quoted} {_COMPARISONS[operator]} ?", [value]
+
+    @staticmethod
+    def _date_condition(quoted: str, operator: str, value: str) -> tuple:
+        """Compare a DATE column with a date or timestamp the way Postgres does, keeping the column indexable.
+
+        Postgres promotes the date to midnight; for a timestamp later than midnight that is
+        equivalent to comparing against its date with the operator tightened or loosened.
+        """
+        day, time_part = value[:10], value[11:19]
+        if not time_part or time_part == "00:00:00":
+            return f"{quoted} {_COMPARISONS[operator]} ?", [day]
+        if operator == "eq":
+            return "0", []
+        if operator == "neq":
+            return "1", []
+        adjusted = {"gt": ">", "gte": ">", "lt": "<=", "lte": "<="}[operator]
+        return f"{quoted} {adjusted} ?", [day]
+
+    def _logic_tree(self, joiner: str, filters: str) -> tuple:
+        """Translate a PostgREST or=/and= filter string such as
+        'transaction_date.lt."2024-01-01",and(transaction_date.eq."2024-01-01",id.lt.5)'
+        """
+        clauses, params = [], []
+        for part in _split_top_level(filters):
+            nested = re.match(r"^(and|or)\((.*)\)$", part)
+            if nested:
+                sql, nested_params = self._logic_tree(nested.group(1), nested.group(2))
+            else:
+                column, operator, value = part.split(".", 2)
+                negate = operator == "not"
+                if negate:
+                    operator, value = value.split(".", 1)
+                if operator == "in":
+                    value = [_unquote(v) for v in _split_top_level(value.strip("()"))]
+                elif operator == "is":
+                    value = value.lower()
+                else:
+                    value = _unquote(value)
+                sql, nested_params = self._condition(column, operator, value)
+                if negate:
+                    sql = f"NOT ({sql})"
+            clauses.append(f"({sql})")
+            params.extend(nested_params)
+        return f" {joiner.upper()} ".join(clauses), params
+
+    def _write_param(self, column: str, value):
+        """Values bound for a write; timestamps written to DATE columns keep only the date, as Postgres casts them"""
+        value = _to_param(value)
+        if isinstance(value, str) and len(value) > 10 and self._client.is_date_column(self._table, column):
+            return value[:10]
+        return value
+
+    # Execution
+    def execute(self) -> LocalResponse:
+        if self._operation == "select":
+            return self._execute_select()
+        if self._operation in ("insert", "upsert"):
+            return self._execute_insert()
+        return self._execute_write()
+
+    def _where_sql(self) -> str:
+        return f" WHERE {' AND '.join(self._where)}" if self._where else ""
+
+    def _execute_select(self) -> LocalResponse:
+        table_columns = self._client.columns(self._table)
+        selected, embeds = [], []
+        for item in _split_top_level(self._columns):
+            embed = re.match(r"^(\w+)\((.*)\)$", item)
+            if embed:
+                embeds.append((embed.group(1), embed.group(2) or "*"))
+            else:
+                selected.append(item)
+
+        select_all = not selected or "*" in selected
+        columns = ["*"] if select_all else [f'"{column}"' for column in selected]
+        added = []
+        for name, _ in embeds:
+            foreign_key = f"{_singular(name)}_id"
+            if foreign_key not in table_columns:
+                raise LocalAPIError(f"Could not find a relationship between '{self._table}' and '{name}' in the schema cache")
+            if not select_all and foreign_key not in selected:
+                columns.append(f'"{foreign_key}"')
+                added.append(foreign_key)
+
+        sql = f'SELECT {", ".join(columns)} FROM "{self._table}"{self._where_sql()}'
+        if self._order:
+            sql += f" ORDER BY {', '.join(self._order)}"
+        if self._limit is not None:
+            sql += f" LIMIT {int(self._limit)}"
+            if self._offset:
+                sql += f" OFFSET {int(self._offset)}"
+        rows = self._client.execute_sql(sql, self._params)
+
+        for name, embed_columns in embeds:
+            self._embed(rows, name, embed_columns)
+        for row in rows:
+            for column in added:
+                row.pop(column, None)
+
+        count = None
+        if self._count:
+            count = self._client.execute_sql(
+                f'SELECT COUNT(*) AS count FROM "{self._table}"{self._where_sql()}', self._params
+            )[0]["count"]
+        return LocalResponse(rows, count)
+
+    def _embed(self, rows: list, name: str, embed_columns: str):
+        """Attach the parent row referenced by <name>_id, as PostgREST does for many-to-one embeds"""
+        foreign_key = f"{_singular(name)}_id"
+        ids = sorted({row[foreign_key] for row in rows if row.get(foreign_key) is not None})
+        parents = {}
+        if ids:
+            columns = "*" if embed_columns.strip() == "*" else ", ".join(f'"{c.strip()}"' for c in embed_columns.split(","))
+            if columns != "*" and '"id"' not in columns:
+                columns += ', "id"'
+            parent_rows = self._client.execute_sql(
+                f'SELECT {columns} FROM "{name}" WHERE id IN ({", ".join("?" for _ in ids)})', ids
+            )
+            parents = {parent["id"]: parent for parent in parent_rows}
+        for row in rows:
+            row[name] = parents.get(row.get(foreign_key))
+
+    def _execute_insert(self) -> LocalResponse:
+        records = self._payload if isinstance(self._payload, list) else [self._payload]
+        if not records:
+            return LocalResponse([])
+        columns = list(dict.fromkeys(column for record in records for column in record))
+        column_sql = ", ".join(f'"{column}"' for column in columns)
+        sql = f'INSERT INTO "{self._table}" ({column_sql}) VALUES ({", ".join("?" for _ in columns)})'
+        if self._operation == "upsert":
+            conflict = ", ".join(f'"{column.strip()}"' for column in self._on_conflict.split(","))
+            updates = [column for column in columns if column not in [c.strip() for c in self._on_conflict.split(",")]]
+            if self._ignore_duplicates or not updates:
+                sql += f" ON CONFLICT ({conflict}) DO NOTHING"
+            else:
+                sql += f" ON CONFLICT ({conflict}) DO UPDATE SET " + ", ".join(f'"{c}" = excluded."{c}"' for c in updates)
+        params = [[self._write_param(column, record.get(column)) for column in columns] for record in records]
+
+        if not self._returning:
+            self._client.execute_sql(sql, params, many=True)
+            return LocalResponse([])
+        sql += " RETURNING *"
+        return LocalResponse(self._client.execute_many_returning([(sql, p) for p in params]))
+
+    def _execute_write(self) -> LocalResponse:
+        if self._operation == "update":
+            assignments = ", ".join(f'"{column}" = ?' for column in self._payload)
+            sql = f'UPDATE "{self._table}" SET {assignments}{self._where_sql()}'
+            params = [self._write_param(column, value) for column, value in self._payload.items()] + self._params
+        else:
+            sql = f'DELETE FROM "{self._table}"{self._where_sql()}'
+            params = self._params
+        if self._returning:
+            sql += " RETURNING *"
+        return LocalResponse(self._client.execute_sql(sql, params))
+
+
+class LocalRpc:
+    """Postgres functions the app calls, reimplemented over the local schema"""
+
+    def __init__(self, client: LocalClient, fn: str, params: dict):
+        self._client = client
+        self._fn = fn
+        self._params = params
+
+    def execute(self) -> LocalResponse:
+        function = _RPC_FUNCTIONS.get(self._fn)
+        if function is None:
+            raise LocalAPIError(f"Could not find the function public.{self._fn} in the schema cache")
+        return LocalResponse(function(self._client, **self._params))
+
+
+_RPC_FUNCTIONS = {}
+
+
+def _rpc(name: str):
+    def register(function):
+        _RPC_FUNCTIONS[name] = function
+        return function
+    return register
+
+
+@_rpc("get_property_financial_summaries")
+def _get_property_financial_summaries(client: LocalClient, p_organization_id, p_start_date=None, p_end_date=None) -> list:
+    date_filter = "AND (? IS NULL OR transaction_date >= ?) AND (? IS NULL OR transaction_date <= ?)"
+    start, end = (p_start_date or None), (p_end_date or None)
+    start, end = (start[:10] if start else None), (end[:10] if end else None)
+    rows = client.execute_sql(f"""
+        SELECT
+            p.id AS property_id,
+            COALESCE(inc_totals.total, 0) AS total_income,
+            COALESCE(exp_totals.total, 0) AS total_expenses,
+            COALESCE(inc_totals.total, 0) - COALESCE(exp_totals.total, 0) AS net_income,
+            CASE
+                WHEN COALESCE(inc_totals.total, 0) > 0
+                THEN (inc_totals.total - COALESCE(exp_totals.total, 0)) / inc_totals.total * 100
+                ELSE 0
+            END AS roi
+        FROM properties p
+        LEFT JOIN (
+            SELECT property_id, SUM(amount) AS total FROM income
+            WHERE organization_id = ? {date_filter} GROUP BY property_id
+        ) inc_totals ON inc_totals.property_id = p.id
+        LEFT JOIN (
+            SELECT property_id, SUM(amount) AS total FROM expenses
+            WHERE organization_id = ? {date_filter} GROUP BY property_id
+        ) exp_totals ON exp_totals.property_id = p.id
+        WHERE p.organization_id = ?
+        ORDER BY p.id
+    """, [p_organization_id, start, start, end, end, p_organization_id, start, start, end, end, p_organization_id])
+    return rows
+
+
+@_rpc("get_due_reminders_page")
+def _get_due_reminders_page(client: LocalClient, p_after_id, p_limit, p_max_failures) -> list:
+    return client.execute_sql("""
+        SELECT * FROM rent_reminders r
+        WHERE id > ?
+          AND NOT is_rent_recorded
+          AND next_reminder_date <= date('now', 'localtime')
+          AND reminder_count < max_reminders
+          AND (
+              SELECT COUNT(DISTINCT date(n.created_at))
+              FROM reminder_notifications n
+              WHERE n.reminder_id = r.id
+                AND NOT n.delivered
+                AND (r.last_sent_date IS NULL OR date(n.created_at) > r.last_sent_date)
+          ) < ?
+        ORDER BY id
+        LIMIT ?
+    """, [int(p_after_id), int(p_max_failures), int(p_limit)])
+
+
+@_rpc("defer_reminders")
+def _defer_reminders(client: LocalClient, p_ids, p_days) -> int:
+    ids = [int(reminder_id) for reminder_id in p_ids or []]
+    if not ids:
+        return 0
+    placeholders = ", ".join("?" for _ in ids)
+    rows = client.execute_sql(
+        f"UPDATE rent_reminders SET next_reminder_date = date('now', 'localtime', ?) WHERE id IN ({placeholders}) RETURNING id",
+        [f"+{int(p_days)} days", *ids]
+    )
+    return len(rows)
+
+
+@_rpc("mark_reminders_sent")
+def _mark_reminders_sent(client: LocalClient, p_ids) -> int:
+    ids = [int(reminder_id) for reminder_id in p_ids or []]
+    if not ids:
+        return 0
+    placeholders = ", ".join("?" for _ in ids)
+    rows = client.execute_sql(f"""
+        UPDATE rent_reminders
+        SET last_sent_date = date('now', 'localtime'),
+            next_reminder_date = date('now', 'localtime', '+5 days'),
+            reminder_count = reminder_count + 1
+        WHERE id IN ({placeholders})
+        RETURNING id
+    """, ids)
+    return len(rows)
+
+
+@_rpc("get_user_contacts")
+def _get_user_contacts(client: LocalClient, p_user_ids) -> list:
+    # There is no auth.users table locally; like LocalAuth, every user gets a stand-in
+    # address, which the local SMTP sink in services/notifications.py accepts
+    return [
+        {"user_id": user_id, "email": f"{user_id}@propledger.local", "phone": None}
+        for user_id in dict.fromkeys(p_user_ids or [])
+    ]
+
+
+@_rpc("prune_confirmed_pending_transactions")
+def _prune_confirmed_pending_transactions(client: LocalClient, p_before) -> int:
+    rows = client.execute_sql(
+        "DELETE FROM pending_transactions WHERE is_confirmed AND transaction_date < ? RETURNING id",
+        [p_before[:10]]
+    )
+    return len(rows)
+
+
+@_rpc("confirm_pending_transactions")
+def _confirm_pending_transactions(client: LocalClient, p_ids) -> list:
+    ids = [int(pending_id) for pending_id in p_ids or []]
+    if not ids:
+        return []
+    user = client.auth.get_user()
+    user_id = user.user.id if user else None
+    placeholders = ", ".join("?" for _ in ids)
+    moved = f"SELECT * FROM pending_transactions WHERE id IN ({placeholders}) AND NOT is_confirmed"
+    rows = client.execute_many_returning([
+        (f"""INSERT INTO income (user_id, organization_id, property_id, amount, income_type, description, transaction_date)
+             SELECT ?, organization_id, property_id, amount, income_type, description, substr(transaction_date, 1, 10)
+             FROM ({moved}) WHERE transaction_type = 'income'""", [user_id, *ids]),
+        (f"""INSERT INTO expenses (user_id, organization_id, property_id, amount, expense_type, description, transaction_date)
+             SELECT ?, organization_id, property_id, amount, expense_type, description, substr(transaction_date, 1, 10)
+             FROM ({moved}) WHERE transaction_type = 'expense'""", [user_id, *ids]),
+        (f"""UPDATE pending_transactions SET is_confirmed = 1 WHERE id IN ({placeholders}) AND NOT is_confirmed
+             RETURNING id AS pending_id, organization_id""", ids),
+    ])
+    return sorted(rows, key=lambda row: row["pending_id"])
+
+
+@_rpc("advance_recurring_due_dates")
+def _advance_recurring_due_dates(client: LocalClient, p_ids, p_next_due_dates) -> int:
+    rows = client.execute_many_returning([
+        ("UPDATE recurring_transactions SET next_due_date = ? WHERE id = ? RETURNING id", [next_due_date, recurring_id])
+        for recurring_id, next_due_date in zip(p_ids or [], p_next_due_dates or [])
+    ])
+    return len(rows)
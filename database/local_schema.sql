@@ -0,0 +1,321 @@
+-- PropLedger local schema for the embedded SQLite backend
+-- Mirrors complete_schema.sql closely enough for DatabaseOperations, RentReminderService
+-- and the scripts to run unchanged. Supabase-only pieces (auth.users, RLS, GRANTs) are left out.
+-- Dates and timestamps are stored as ISO-8601 text, booleans as 0/1.
+
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS organizations (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    description TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS user_organizations (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT,
+    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
+    role VARCHAR(50) DEFAULT 'member' CHECK (role IN ('owner', 'admin', 'member')),
+    joined_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    UNIQUE(user_id, organization_id)
+);
+
+CREATE TABLE IF NOT EXISTS properties (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT,
+    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    address TEXT NOT NULL,
+    property_type VARCHAR(50) NOT NULL CHECK (property_type IN ('apartment', 'house', 'condo', 'townhouse', 'commercial')),
+    purchase_price REAL NOT NULL,
+    purchase_date DATE NOT NULL,
+    monthly_rent REAL NOT NULL,
+    description TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS income (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT,
+    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    amount REAL NOT NULL,
+    income_type VARCHAR(50) NOT NULL CHECK (income_type IN ('rent', 'deposit', 'late_fee', 'other')),
+    description TEXT NOT NULL,
+    transaction_date DATE NOT NULL,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT,
+    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    amount REAL NOT NULL,
+    expense_type VARCHAR(50) NOT NULL CHECK (expense_type IN ('mortgage', 'maintenance', 'repairs', 'utilities', 'insurance', 'taxes', 'management', 'advertising', 'legal', 'hoa', 'home_warranty', 'other')),
+    description TEXT NOT NULL,
+    transaction_date DATE NOT NULL,
+    receipt_url TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT,
+    name VARCHAR(100) NOT NULL,
+    type VARCHAR(20) NOT NULL CHECK (type IN ('income', 'expense')),
+    description TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS recurring_transactions (
+    id INTEGER PRIMARY KEY,
+    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    transaction_type VARCHAR(20) NOT NULL CHECK (transaction_type IN ('income', 'expense')),
+    income_type VARCHAR(50),
+    expense_type VARCHAR(50),
+    amount REAL NOT NULL,
+    description TEXT NOT NULL,
+    interval VARCHAR(20) NOT NULL CHECK (interval IN ('weekly', 'monthly', 'quarterly', 'yearly')),
+    start_date DATE NOT NULL,
+    end_date DATE,
+    is_active BOOLEAN DEFAULT 1,
+    next_due_date DATE,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS pending_transactions (
+    id INTEGER PRIMARY KEY,
+    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    transaction_type VARCHAR(20) NOT NULL CHECK (transaction_type IN ('income', 'expense')),
+    income_type VARCHAR(50),
+    expense_type VARCHAR(50),
+    amount REAL NOT NULL,
+    description TEXT NOT NULL,
+    transaction_date TIMESTAMP NOT NULL,
+    recurring_transaction_id INTEGER REFERENCES recurring_transactions(id) ON DELETE SET NULL,
+    is_confirmed BOOLEAN DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS rent_reminders (
+    id INTEGER PRIMARY KEY,
+    property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    user_id TEXT,
+    reminder_month INTEGER NOT NULL,
+    reminder_year INTEGER NOT NULL,
+    reminder_date DATE NOT NULL,
+    last_sent_date DATE,
+    next_reminder_date DATE NOT NULL,
+    is_rent_recorded BOOLEAN DEFAULT 0,
+    reminder_count INTEGER DEFAULT 0,
+    max_reminders INTEGER DEFAULT 6,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS budgets (
+    id INTEGER PRIMARY KEY,
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER REFERENCES properties(id) ON DELETE CASCADE,
+    user_id TEXT,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    budget_amount REAL NOT NULL,
+    period VARCHAR(20) NOT NULL,
+    scope VARCHAR(20) NOT NULL,
+    start_date TIMESTAMP NOT NULL,
+    end_date TIMESTAMP NOT NULL,
+    is_active BOOLEAN DEFAULT 1,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS budget_lines (
+    id INTEGER PRIMARY KEY,
+    budget_id INTEGER NOT NULL REFERENCES budgets(id) ON DELETE CASCADE,
+    category_id INTEGER REFERENCES categories(id) ON DELETE CASCADE,
+    budgeted_amount REAL NOT NULL,
+    actual_amount REAL DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+-- Same composite indexes as migration 003 (SQLite has no INCLUDE, so the covered columns are appended)
+CREATE INDEX IF NOT EXISTS idx_properties_organization_id ON properties(organization_id);
+CREATE INDEX IF NOT EXISTS idx_income_org_date_id ON income(organization_id, transaction_date, id, property_id, amount, income_type);
+CREATE INDEX IF NOT EXISTS idx_expenses_org_date_id ON expenses(organization_id, transaction_date, id, property_id, amount, expense_type);
+CREATE INDEX IF NOT EXISTS idx_income_property_date_id ON income(property_id, transaction_date, id);
+CREATE INDEX IF NOT EXISTS idx_expenses_property_date_id ON expenses(property_id, transaction_date, id, amount, expense_type);
+CREATE INDEX IF NOT EXISTS idx_income_property_type_date ON income(property_id, income_type, transaction_date);
+CREATE INDEX IF NOT EXISTS idx_pending_transactions_open_org_type_date ON pending_transactions(organization_id, transaction_type, transaction_date, id) WHERE NOT is_confirmed;
+CREATE UNIQUE INDEX IF NOT EXISTS pending_transactions_recurring_date_key ON pending_transactions(recurring_transaction_id, transaction_date);
+CREATE INDEX IF NOT EXISTS idx_pending_transactions_confirmed_date ON pending_transactions(transaction_date) WHERE is_confirmed;
+CREATE INDEX IF NOT EXISTS idx_recurring_transactions_org_active ON recurring_transactions(organization_id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_recurring_transactions_next_due ON recurring_transactions(next_due_date, id) WHERE is_active;
+CREATE UNIQUE INDEX IF NOT EXISTS rent_reminders_property_month_year_key ON rent_reminders(property_id, reminder_month, reminder_year);
+CREATE INDEX IF NOT EXISTS idx_rent_reminders_due ON rent_reminders(next_reminder_date) WHERE NOT is_rent_recorded;
+CREATE INDEX IF NOT EXISTS idx_rent_reminders_org_year_month ON rent_reminders(organization_id, reminder_year, reminder_month);
+CREATE INDEX IF NOT EXISTS idx_budgets_organization_id ON budgets(organization_id);
+CREATE INDEX IF NOT EXISTS idx_budget_lines_budget_id ON budget_lines(budget_id);
+
+-- SQLite has no LATERAL; correlated scalar subqueries give the same per-property sums
+CREATE VIEW IF NOT EXISTS property_financial_summary AS
+SELECT
+    id,
+    organization_id,
+    user_id,
+    name,
+    address,
+    monthly_rent,
+    total_income,
+    total_expenses,
+    total_income - total_expenses AS net_income,
+    CASE
+        WHEN total_income > 0
+        THEN (total_income - total_expenses) / total_income * 100
+        ELSE 0
+    END AS roi_percentage
+FROM (
+    SELECT
+        p.*,
+        (SELECT COALESCE(SUM(i.amount), 0) FROM income i WHERE i.property_id = p.id) AS total_income,
+        (SELECT COALESCE(SUM(e.amount), 0) FROM expenses e WHERE e.property_id = p.id) AS total_expenses
+    FROM properties p
+);
+
+CREATE TABLE IF NOT EXISTS ledger_monthly_rollup (
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('income', 'expense')),
+    type VARCHAR(50) NOT NULL,
+    total_amount REAL NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (organization_id, property_id, month, kind, type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ledger_monthly_rollup_org_month ON ledger_monthly_rollup(organization_id, month);
+CREATE INDEX IF NOT EXISTS idx_ledger_monthly_rollup_property_month ON ledger_monthly_rollup(property_id, month);
+
+CREATE TABLE IF NOT EXISTS reminder_notifications (
+    id INTEGER PRIMARY KEY,
+    reminder_id INTEGER NOT NULL,
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    channel VARCHAR(10) NOT NULL CHECK (channel IN ('email', 'sms')),
+    recipient TEXT NOT NULL,
+    delivered BOOLEAN NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    error TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_reminder_notifications_reminder ON reminder_notifications(reminder_id);
+CREATE INDEX IF NOT EXISTS idx_reminder_notifications_org_created ON reminder_notifications(organization_id, created_at);
+
+CREATE VIEW IF NOT EXISTS ledger_monthly_org_rollup AS
+SELECT
+    organization_id,
+    month,
+    kind,
+    type,
+    SUM(total_amount) AS total_amount,
+    SUM(transaction_count) AS transaction_count
+FROM ledger_monthly_rollup
+GROUP BY organization_id, month, kind, type;
+
+-- Rollup triggers: remove the old row's contribution, add the new one's.
+-- The WHERE clauses skip rows without an organization, like bump_ledger_monthly_rollup.
+CREATE TRIGGER IF NOT EXISTS income_rollup_insert AFTER INSERT ON income
+BEGIN
+    INSERT INTO ledger_monthly_rollup (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+    SELECT NEW.organization_id, NEW.property_id, substr(NEW.transaction_date, 1, 7) || '-01', 'income', NEW.income_type, NEW.amount, 1
+    WHERE NEW.organization_id IS NOT NULL
+    ON CONFLICT (organization_id, property_id, month, kind, type) DO UPDATE
+    SET total_amount = total_amount + excluded.total_amount,
+        transaction_count = transaction_count + excluded.transaction_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS income_rollup_delete AFTER DELETE ON income
+BEGIN
+    UPDATE ledger_monthly_rollup
+    SET total_amount = total_amount - OLD.amount,
+        transaction_count = transaction_count - 1
+    WHERE organization_id = OLD.organization_id AND property_id = OLD.property_id
+      AND month = substr(OLD.transaction_date, 1, 7) || '-01' AND kind = 'income' AND type = OLD.income_type;
+END;
+
+CREATE TRIGGER IF NOT EXISTS income_rollup_update AFTER UPDATE ON income
+BEGIN
+    UPDATE ledger_monthly_rollup
+    SET total_amount = total_amount - OLD.amount,
+        transaction_count = transaction_count - 1
+    WHERE organization_id = OLD.organization_id AND property_id = OLD.property_id
+      AND month = substr(OLD.transaction_date, 1, 7) || '-01' AND kind = 'income' AND type = OLD.income_type;
+    INSERT INTO ledger_monthly_rollup (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+    SELECT NEW.organization_id, NEW.property_id, substr(NEW.transaction_date, 1, 7) || '-01', 'income', NEW.income_type, NEW.amount, 1
+    WHERE NEW.organization_id IS NOT NULL
+    ON CONFLICT (organization_id, property_id, month, kind, type) DO UPDATE
+    SET total_amount = total_amount + excluded.total_amount,
+        transaction_count = transaction_count + excluded.transaction_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_rollup_insert AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO ledger_monthly_rollup (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+    SELECT NEW.organization_id, NEW.property_id, substr(NEW.transaction_date, 1, 7) || '-01', 'expense', NEW.expense_type, NEW.amount, 1
+    WHERE NEW.organization_id IS NOT NULL
+    ON CONFLICT (organization_id, property_id, month, kind, type) DO UPDATE
+    SET total_amount = total_amount + excluded.total_amount,
+        transaction_count = transaction_count + excluded.transaction_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_rollup_delete AFTER DELETE ON expenses
+BEGIN
+    UPDATE ledger_monthly_rollup
+    SET total_amount = total_amount - OLD.amount,
+        transaction_count = transaction_count - 1
+    WHERE organization_id = OLD.organization_id AND property_id = OLD.property_id
+      AND month = substr(OLD.transaction_date, 1, 7) || '-01' AND kind = 'expense' AND type = OLD.expense_type;
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_rollup_update AFTER UPDATE ON expenses
+BEGIN
+    UPDATE ledger_monthly_rollup
+    SET total_amount = total_amount - OLD.amount,
+        transaction_count = transaction_count - 1
+    WHERE organization_id = OLD.organization_id AND property_id = OLD.property_id
+      AND month = substr(OLD.transaction_date, 1, 7) || '-01' AND kind = 'expense' AND type = OLD.expense_type;
+    INSERT INTO ledger_monthly_rollup (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+    SELECT NEW.organization_id, NEW.property_id, substr(NEW.transaction_date, 1, 7) || '-01', 'expense', NEW.expense_type, NEW.amount, 1
+    WHERE NEW.organization_id IS NOT NULL
+    ON CONFLICT (organization_id, property_id, month, kind, type) DO UPDATE
+    SET total_amount = total_amount + excluded.total_amount,
+        transaction_count = transaction_count + excluded.transaction_count;
+END;
+
+-- next_due_date restarts from start_date for new rules and schedule edits
+CREATE TRIGGER IF NOT EXISTS recurring_next_due_insert AFTER INSERT ON recurring_transactions
+WHEN NEW.next_due_date IS NULL
+BEGIN
+    UPDATE recurring_transactions SET next_due_date = NEW.start_date WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS recurring_next_due_update AFTER UPDATE OF start_date, end_date, interval, is_active ON recurring_transactions
+WHEN NEW.start_date IS NOT OLD.start_date
+  OR NEW.end_date IS NOT OLD.end_date
+  OR NEW.interval IS NOT OLD.interval
+  OR (NEW.is_active AND NOT OLD.is_active)
+BEGIN
+    UPDATE recurring_transactions SET next_due_date = NEW.start_date WHERE id = NEW.id;
+END;
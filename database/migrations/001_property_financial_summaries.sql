@@ -0,0 +1,51 @@
+-- Migration 001: bulk per-property financial summaries
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+
+-- Per-property income, expenses, net income and ROI for an organization in one call.
+-- Income and expenses are aggregated separately before joining to properties.
+CREATE OR REPLACE FUNCTION get_property_financial_summaries(
+    p_organization_id INTEGER,
+    p_start_date DATE DEFAULT NULL,
+    p_end_date DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    property_id INTEGER,
+    total_income NUMERIC,
+    total_expenses NUMERIC,
+    net_income NUMERIC,
+    roi NUMERIC
+) AS $$
+    SELECT
+        p.id,
+        COALESCE(inc_totals.total, 0),
+        COALESCE(exp_totals.total, 0),
+        COALESCE(inc_totals.total, 0) - COALESCE(exp_totals.total, 0),
+        CASE
+            WHEN COALESCE(inc_totals.total, 0) > 0
+            THEN (inc_totals.total - COALESCE(exp_totals.total, 0)) / inc_totals.total * 100
+            ELSE 0
+        END
+    FROM properties p
+    LEFT JOIN (
+        SELECT i.property_id, SUM(i.amount) AS total
+        FROM income i
+        JOIN properties ip ON ip.id = i.property_id
+        WHERE ip.organization_id = p_organization_id
+          AND (p_start_date IS NULL OR i.transaction_date >= p_start_date)
+          AND (p_end_date IS NULL OR i.transaction_date <= p_end_date)
+        GROUP BY i.property_id
+    ) inc_totals ON inc_totals.property_id = p.id
+    LEFT JOIN (
+        SELECT e.property_id, SUM(e.amount) AS total
+        FROM expenses e
+        JOIN properties ep ON ep.id = e.property_id
+        WHERE ep.organization_id = p_organization_id
+          AND (p_start_date IS NULL OR e.transaction_date >= p_start_date)
+          AND (p_end_date IS NULL OR e.transaction_date <= p_end_date)
+        GROUP BY e.property_id
+    ) exp_totals ON exp_totals.property_id = p.id
+    WHERE p.organization_id = p_organization_id
+    ORDER BY p.id;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION get_property_financial_summaries(INTEGER, DATE, DATE) TO anon, authenticated;
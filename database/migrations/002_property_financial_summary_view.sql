@@ -0,0 +1,43 @@
+-- Migration 002: rebuild property_financial_summary without the income x expense join
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+
+-- Covering indexes for the per-property sums and organization filtering
+CREATE INDEX IF NOT EXISTS idx_properties_organization_id ON properties(organization_id);
+CREATE INDEX IF NOT EXISTS idx_income_property_id_amount ON income(property_id) INCLUDE (amount);
+CREATE INDEX IF NOT EXISTS idx_expenses_property_id_amount ON expenses(property_id) INCLUDE (amount);
+
+-- Create views for financial reporting
+-- Income and expenses are summed per property in separate LATERAL subqueries,
+-- so each property costs one index lookup per table instead of an
+-- income x expense cross product. security_invoker keeps the callers' RLS
+-- policies in force, so organization members see shared properties.
+DROP VIEW IF EXISTS property_financial_summary;
+CREATE VIEW property_financial_summary WITH (security_invoker = true) AS
+SELECT 
+    p.id,
+    p.organization_id,
+    p.user_id,
+    p.name,
+    p.address,
+    p.monthly_rent,
+    inc_totals.total_income,
+    exp_totals.total_expenses,
+    inc_totals.total_income - exp_totals.total_expenses as net_income,
+    CASE 
+        WHEN inc_totals.total_income > 0 
+        THEN ((inc_totals.total_income - exp_totals.total_expenses) / inc_totals.total_income) * 100
+        ELSE 0 
+    END as roi_percentage
+FROM properties p
+LEFT JOIN LATERAL (
+    SELECT COALESCE(SUM(i.amount), 0) AS total_income
+    FROM income i
+    WHERE i.property_id = p.id
+) inc_totals ON TRUE
+LEFT JOIN LATERAL (
+    SELECT COALESCE(SUM(e.amount), 0) AS total_expenses
+    FROM expenses e
+    WHERE e.property_id = p.id
+) exp_totals ON TRUE;
+
+GRANT SELECT ON property_financial_summary TO anon, authenticated;
@@ -0,0 +1,38 @@
+-- Migration 003: composite indexes matching the application's query shapes
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+-- Table names are unqualified so database/benchmarks/index_benchmark.sql can
+-- apply the same indexes to its synthetic schema via search_path.
+
+-- Organization ledger pages: organization_id + date range, ordered by (transaction_date, id)
+-- as iter_rows keyset-paginates. INCLUDE lets totals and type breakdowns run index-only.
+CREATE INDEX IF NOT EXISTS idx_income_org_date_id
+    ON income(organization_id, transaction_date, id) INCLUDE (property_id, amount, income_type);
+CREATE INDEX IF NOT EXISTS idx_expenses_org_date_id
+    ON expenses(organization_id, transaction_date, id) INCLUDE (property_id, amount, expense_type);
+
+-- Property ledger pages and budget analysis scoped to one property
+CREATE INDEX IF NOT EXISTS idx_income_property_date_id ON income(property_id, transaction_date, id);
+CREATE INDEX IF NOT EXISTS idx_expenses_property_date_id
+    ON expenses(property_id, transaction_date, id) INCLUDE (amount, expense_type);
+
+-- Rent-recorded checks: property_id + income_type + month range
+CREATE INDEX IF NOT EXISTS idx_income_property_type_date ON income(property_id, income_type, transaction_date);
+
+-- Pending lists per organization and type, newest first
+CREATE INDEX IF NOT EXISTS idx_pending_transactions_org_type_date
+    ON pending_transactions(organization_id, transaction_type, transaction_date, id);
+
+-- Active recurring rules per organization
+CREATE INDEX IF NOT EXISTS idx_recurring_transactions_org_active
+    ON recurring_transactions(organization_id) WHERE is_active;
+
+-- rent_reminders is created by the reminders setup script, so only index it when present
+DO $$
+BEGIN
+    IF to_regclass('rent_reminders') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_rent_reminders_property_month_year
+            ON rent_reminders(property_id, reminder_month, reminder_year);
+        CREATE INDEX IF NOT EXISTS idx_rent_reminders_due
+            ON rent_reminders(next_reminder_date) WHERE NOT is_rent_recorded;
+    END IF;
+END $$;
@@ -0,0 +1,120 @@
+-- Migration 004: trigger-maintained monthly ledger rollup
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+-- The backfill at the end rebuilds the rollup from income and expenses, so the
+-- migration can be re-run to repair drift.
+
+-- Monthly ledger rollup: one row per organization, property, month, kind and type,
+-- kept current by triggers on income and expenses so reports read a few hundred
+-- pre-aggregated rows instead of re-summing the raw ledger.
+CREATE TABLE IF NOT EXISTS ledger_monthly_rollup (
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('income', 'expense')),
+    type VARCHAR(50) NOT NULL,
+    total_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (organization_id, property_id, month, kind, type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ledger_monthly_rollup_org_month ON ledger_monthly_rollup(organization_id, month);
+CREATE INDEX IF NOT EXISTS idx_ledger_monthly_rollup_property_month ON ledger_monthly_rollup(property_id, month);
+
+-- Organization-level months, summed across properties
+CREATE OR REPLACE VIEW ledger_monthly_org_rollup WITH (security_invoker = true) AS
+SELECT
+    organization_id,
+    month,
+    kind,
+    type,
+    SUM(total_amount) AS total_amount,
+    SUM(transaction_count)::INTEGER AS transaction_count
+FROM ledger_monthly_rollup
+GROUP BY organization_id, month, kind, type;
+
+-- Apply a signed delta to one rollup bucket. Rows without an organization are not rolled up.
+CREATE OR REPLACE FUNCTION bump_ledger_monthly_rollup(
+    p_organization_id INTEGER,
+    p_property_id INTEGER,
+    p_transaction_date DATE,
+    p_kind TEXT,
+    p_type TEXT,
+    p_amount NUMERIC,
+    p_count INTEGER
+)
+RETURNS void AS $$
+BEGIN
+    IF p_organization_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO ledger_monthly_rollup AS r (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+    VALUES (p_organization_id, p_property_id, date_trunc('month', p_transaction_date)::DATE, p_kind, p_type, p_amount, p_count)
+    ON CONFLICT (organization_id, property_id, month, kind, type) DO UPDATE
+    SET total_amount = r.total_amount + EXCLUDED.total_amount,
+        transaction_count = r.transaction_count + EXCLUDED.transaction_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Only the trigger below may move rollup totals; PostgreSQL grants EXECUTE to PUBLIC by
+-- default, which would let any API caller rewrite another organization's rollup
+REVOKE EXECUTE ON FUNCTION bump_ledger_monthly_rollup(INTEGER, INTEGER, DATE, TEXT, TEXT, NUMERIC, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- Row trigger shared by income and expenses: remove the old row's contribution, add the new one's
+CREATE OR REPLACE FUNCTION maintain_ledger_monthly_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_kind TEXT := CASE WHEN TG_TABLE_NAME = 'income' THEN 'income' ELSE 'expense' END;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_ledger_monthly_rollup(
+            OLD.organization_id, OLD.property_id, OLD.transaction_date, v_kind,
+            to_jsonb(OLD) ->> (v_kind || '_type'), -OLD.amount, -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_ledger_monthly_rollup(
+            NEW.organization_id, NEW.property_id, NEW.transaction_date, v_kind,
+            to_jsonb(NEW) ->> (v_kind || '_type'), NEW.amount, 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS maintain_income_monthly_rollup ON income;
+CREATE TRIGGER maintain_income_monthly_rollup AFTER INSERT OR UPDATE OR DELETE ON income
+    FOR EACH ROW EXECUTE FUNCTION maintain_ledger_monthly_rollup();
+
+DROP TRIGGER IF EXISTS maintain_expenses_monthly_rollup ON expenses;
+CREATE TRIGGER maintain_expenses_monthly_rollup AFTER INSERT OR UPDATE OR DELETE ON expenses
+    FOR EACH ROW EXECUTE FUNCTION maintain_ledger_monthly_rollup();
+
+ALTER TABLE ledger_monthly_rollup ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view ledger rollups in their organizations" ON ledger_monthly_rollup;
+CREATE POLICY "Users can view ledger rollups in their organizations" ON ledger_monthly_rollup
+    FOR SELECT USING (
+        organization_id IN (
+            SELECT organization_id 
+            FROM user_organizations 
+            WHERE user_id = auth.uid()
+        )
+    );
+
+-- Backfill from the existing ledger
+TRUNCATE ledger_monthly_rollup;
+
+INSERT INTO ledger_monthly_rollup (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+SELECT organization_id, property_id, date_trunc('month', transaction_date)::DATE, 'income', income_type, SUM(amount), COUNT(*)
+FROM income
+WHERE organization_id IS NOT NULL
+GROUP BY organization_id, property_id, date_trunc('month', transaction_date), income_type;
+
+INSERT INTO ledger_monthly_rollup (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+SELECT organization_id, property_id, date_trunc('month', transaction_date)::DATE, 'expense', expense_type, SUM(amount), COUNT(*)
+FROM expenses
+WHERE organization_id IS NOT NULL
+GROUP BY organization_id, property_id, date_trunc('month', transaction_date), expense_type;
+
+GRANT SELECT ON ledger_monthly_rollup, ledger_monthly_org_rollup TO anon, authenticated;
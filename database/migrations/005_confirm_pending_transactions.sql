@@ -0,0 +1,33 @@
+-- Migration 005: batch pending-transaction confirmation
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+
+-- Move pending transactions into income and expenses in one statement, so a batch is
+-- confirmed completely or not at all. Ids that no longer exist are skipped; the moved
+-- rows are returned so callers know which organizations changed. New rows belong to
+-- the caller, as the income and expenses insert policies require.
+CREATE OR REPLACE FUNCTION confirm_pending_transactions(p_ids INTEGER[])
+RETURNS TABLE (
+    pending_id INTEGER,
+    organization_id INTEGER
+) AS $$
+    WITH moved AS (
+        DELETE FROM pending_transactions
+        WHERE id = ANY(p_ids)
+        RETURNING *
+    ),
+    new_income AS (
+        INSERT INTO income (user_id, organization_id, property_id, amount, income_type, description, transaction_date)
+        SELECT auth.uid(), organization_id, property_id, amount, income_type, description, transaction_date::DATE
+        FROM moved
+        WHERE transaction_type = 'income'
+    ),
+    new_expenses AS (
+        INSERT INTO expenses (user_id, organization_id, property_id, amount, expense_type, description, transaction_date)
+        SELECT auth.uid(), organization_id, property_id, amount, expense_type, description, transaction_date::DATE
+        FROM moved
+        WHERE transaction_type = 'expense'
+    )
+    SELECT id, organization_id FROM moved ORDER BY id;
+$$ LANGUAGE sql VOLATILE;
+
+GRANT EXECUTE ON FUNCTION confirm_pending_transactions(INTEGER[]) TO anon, authenticated;
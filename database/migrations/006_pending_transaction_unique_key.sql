@@ -0,0 +1,84 @@
+-- Migration 006: idempotent pending-transaction generation
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+-- Requires migration 005.
+
+-- Drop duplicate occurrences left by earlier generators, keeping the oldest row
+DELETE FROM pending_transactions duplicate
+USING pending_transactions original
+WHERE duplicate.recurring_transaction_id = original.recurring_transaction_id
+  AND duplicate.transaction_date = original.transaction_date
+  AND duplicate.id > original.id;
+
+-- One row per recurring rule and due date. Generators insert with
+-- ON CONFLICT DO NOTHING, so repeated or concurrent runs can't duplicate an occurrence.
+-- Manual pending transactions have no recurring_transaction_id and are unaffected.
+ALTER TABLE pending_transactions
+    DROP CONSTRAINT IF EXISTS pending_transactions_recurring_date_key;
+ALTER TABLE pending_transactions
+    ADD CONSTRAINT pending_transactions_recurring_date_key UNIQUE (recurring_transaction_id, transaction_date);
+
+-- Confirmed occurrences now stay behind with is_confirmed = TRUE so the key keeps them
+-- from being generated again. Occurrences confirmed before this migration were deleted,
+-- so mark the last 13 months of matching ledger rows (enough to cover a yearly rule).
+INSERT INTO pending_transactions (
+    organization_id, property_id, transaction_type, income_type, expense_type, amount,
+    description, transaction_date, recurring_transaction_id, is_confirmed
+)
+SELECT r.organization_id, r.property_id, 'income', r.income_type, NULL, i.amount,
+       i.description, i.transaction_date::TIMESTAMPTZ, r.id, TRUE
+FROM recurring_transactions r
+JOIN income i
+  ON i.property_id = r.property_id
+ AND i.organization_id = r.organization_id
+ AND i.income_type = r.income_type
+ AND i.amount = r.amount
+WHERE r.transaction_type = 'income'
+  AND i.transaction_date >= CURRENT_DATE - INTERVAL '13 months'
+UNION ALL
+SELECT r.organization_id, r.property_id, 'expense', NULL, r.expense_type, e.amount,
+       e.description, e.transaction_date::TIMESTAMPTZ, r.id, TRUE
+FROM recurring_transactions r
+JOIN expenses e
+  ON e.property_id = r.property_id
+ AND e.organization_id = r.organization_id
+ AND e.expense_type = r.expense_type
+ AND e.amount = r.amount
+WHERE r.transaction_type = 'expense'
+  AND e.transaction_date >= CURRENT_DATE - INTERVAL '13 months'
+ON CONFLICT (recurring_transaction_id, transaction_date) DO NOTHING;
+
+-- Pending lists only read unconfirmed rows, so index just those
+DROP INDEX IF EXISTS idx_pending_transactions_org_type_date;
+CREATE INDEX IF NOT EXISTS idx_pending_transactions_open_org_type_date
+    ON pending_transactions(organization_id, transaction_type, transaction_date, id) WHERE NOT is_confirmed;
+
+-- Copy pending transactions into income and expenses and mark them confirmed in one
+-- statement, so a batch is confirmed completely or not at all. Missing or already
+-- confirmed ids are skipped; the confirmed rows are returned so callers know which
+-- organizations changed. New rows belong to the caller, as the income and expenses
+-- insert policies require.
+CREATE OR REPLACE FUNCTION confirm_pending_transactions(p_ids INTEGER[])
+RETURNS TABLE (
+    pending_id INTEGER,
+    organization_id INTEGER
+) AS $$
+    WITH moved AS (
+        UPDATE pending_transactions
+        SET is_confirmed = TRUE
+        WHERE id = ANY(p_ids) AND NOT is_confirmed
+        RETURNING *
+    ),
+    new_income AS (
+        INSERT INTO income (user_id, organization_id, property_id, amount, income_type, description, transaction_date)
+        SELECT auth.uid(), organization_id, property_id, amount, income_type, description, transaction_date::DATE
+        FROM moved
+        WHERE transaction_type = 'income'
+    ),
+    new_expenses AS (
+        INSERT INTO expenses (user_id, organization_id, property_id, amount, expense_type, description, transaction_date)
+        SELECT auth.uid(), organization_id, property_id, amount, expense_type, description, transaction_date::DATE
+        FROM moved
+        WHERE transaction_type = 'expense'
+    )
+    SELECT id, organization_id FROM moved ORDER BY id;
+$$ LANGUAGE sql VOLATILE;
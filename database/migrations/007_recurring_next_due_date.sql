@@ -0,0 +1,49 @@
+-- Migration 007: next_due_date on recurring transactions
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+
+-- Next occurrence that has not been generated yet. The daily job reads only rules with
+-- next_due_date <= today and advances them after generating; NULL once a rule has ended.
+ALTER TABLE recurring_transactions ADD COLUMN IF NOT EXISTS next_due_date DATE;
+
+-- Existing rules start from their start date, so the first run after the migration
+-- catches each one up to its latest occurrence (duplicates are skipped by the unique key)
+UPDATE recurring_transactions SET next_due_date = start_date WHERE next_due_date IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_recurring_transactions_next_due
+    ON recurring_transactions(next_due_date, id) WHERE is_active;
+
+-- New rules and schedule edits restart from the start date, so rules written directly
+-- by the app are picked up without every writer computing the next occurrence
+CREATE OR REPLACE FUNCTION reset_recurring_next_due_date()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        NEW.next_due_date := COALESCE(NEW.next_due_date, NEW.start_date);
+    ELSIF NEW.start_date IS DISTINCT FROM OLD.start_date
+       OR NEW.end_date IS DISTINCT FROM OLD.end_date
+       OR NEW.interval IS DISTINCT FROM OLD.interval
+       OR (NEW.is_active AND NOT OLD.is_active) THEN
+        NEW.next_due_date := NEW.start_date;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS reset_recurring_next_due_date ON recurring_transactions;
+CREATE TRIGGER reset_recurring_next_due_date BEFORE INSERT OR UPDATE ON recurring_transactions
+    FOR EACH ROW EXECUTE FUNCTION reset_recurring_next_due_date();
+
+-- Set each rule's next due date after generation, in one call for the whole batch
+CREATE OR REPLACE FUNCTION advance_recurring_due_dates(p_ids INTEGER[], p_next_due_dates DATE[])
+RETURNS INTEGER AS $$
+    WITH advanced AS (
+        UPDATE recurring_transactions r
+        SET next_due_date = u.next_due_date
+        FROM unnest(p_ids, p_next_due_dates) AS u(id, next_due_date)
+        WHERE r.id = u.id
+        RETURNING r.id
+    )
+    SELECT COUNT(*)::INTEGER FROM advanced;
+$$ LANGUAGE sql VOLATILE;
+
+GRANT EXECUTE ON FUNCTION advance_recurring_due_dates(INTEGER[], DATE[]) TO anon, authenticated;
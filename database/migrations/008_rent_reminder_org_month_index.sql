@@ -0,0 +1,13 @@
+-- Migration 008: organization-wide rent reminder lookups
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+
+-- The Reminders page reads one month's reminders for a whole organization in a single
+-- query (RentReminderService.get_reminder_statuses) instead of one query per property.
+-- rent_reminders is created by the reminders setup script, so only index it when present
+DO $$
+BEGIN
+    IF to_regclass('rent_reminders') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_rent_reminders_org_year_month
+            ON rent_reminders(organization_id, reminder_year, reminder_month);
+    END IF;
+END $$;
@@ -0,0 +1,43 @@
+-- Migration 009: one rent reminder per property and month
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+
+-- create_monthly_reminders writes a whole organization's month in one upsert with
+-- ON CONFLICT DO NOTHING, so repeated clicks or concurrent runs can't duplicate a reminder.
+-- rent_reminders is created by the reminders setup script, so only change it when present
+DO $$
+BEGIN
+    IF to_regclass('rent_reminders') IS NOT NULL THEN
+        -- Fold duplicates into the oldest reminder per key, keeping the furthest progress
+        UPDATE rent_reminders keeper
+        SET is_rent_recorded = merged.is_rent_recorded,
+            reminder_count = merged.reminder_count,
+            last_sent_date = merged.last_sent_date,
+            next_reminder_date = merged.next_reminder_date
+        FROM (
+            SELECT MIN(id) AS id,
+                   BOOL_OR(is_rent_recorded) AS is_rent_recorded,
+                   MAX(reminder_count) AS reminder_count,
+                   MAX(last_sent_date) AS last_sent_date,
+                   MAX(next_reminder_date) AS next_reminder_date
+            FROM rent_reminders
+            GROUP BY property_id, reminder_month, reminder_year
+            HAVING COUNT(*) > 1
+        ) merged
+        WHERE keeper.id = merged.id;
+
+        DELETE FROM rent_reminders duplicate
+        USING rent_reminders original
+        WHERE duplicate.property_id = original.property_id
+          AND duplicate.reminder_month = original.reminder_month
+          AND duplicate.reminder_year = original.reminder_year
+          AND duplicate.id > original.id;
+
+        ALTER TABLE rent_reminders
+            DROP CONSTRAINT IF EXISTS rent_reminders_property_month_year_key;
+        ALTER TABLE rent_reminders
+            ADD CONSTRAINT rent_reminders_property_month_year_key UNIQUE (property_id, reminder_month, reminder_year);
+
+        -- The constraint's index serves the per-property lookups this index was for
+        DROP INDEX IF EXISTS idx_rent_reminders_property_month_year;
+    END IF;
+END $$;
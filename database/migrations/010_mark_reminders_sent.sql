@@ -0,0 +1,23 @@
+-- Migration 010: batch update for sent rent reminders
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+
+-- Record a dispatched batch of rent reminders in one call: stamp today as the send date,
+-- schedule the next reminder five days out and bump the count, all server-side.
+-- plpgsql so the function can be created before the reminders setup script has
+-- created rent_reminders.
+CREATE OR REPLACE FUNCTION mark_reminders_sent(p_ids INTEGER[])
+RETURNS INTEGER AS $$
+DECLARE
+    marked INTEGER;
+BEGIN
+    UPDATE rent_reminders
+    SET last_sent_date = CURRENT_DATE,
+        next_reminder_date = CURRENT_DATE + 5,
+        reminder_count = reminder_count + 1
+    WHERE id = ANY(p_ids);
+    GET DIAGNOSTICS marked = ROW_COUNT;
+    RETURN marked;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+GRANT EXECUTE ON FUNCTION mark_reminders_sent(INTEGER[]) TO anon, authenticated;
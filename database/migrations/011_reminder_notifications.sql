@@ -0,0 +1,69 @@
+-- Migration 011: reminder notification delivery log and recipient lookup
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+
+-- Delivery log for rent reminder notifications, one row per reminder, channel and
+-- recipient. The dispatcher records results in bulk as batches complete.
+CREATE TABLE IF NOT EXISTS reminder_notifications (
+    id BIGSERIAL PRIMARY KEY,
+    reminder_id INTEGER NOT NULL,
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    channel VARCHAR(10) NOT NULL CHECK (channel IN ('email', 'sms')),
+    recipient TEXT NOT NULL,
+    delivered BOOLEAN NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_reminder_notifications_reminder ON reminder_notifications(reminder_id);
+CREATE INDEX IF NOT EXISTS idx_reminder_notifications_org_created ON reminder_notifications(organization_id, created_at);
+
+ALTER TABLE reminder_notifications ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view reminder notifications in their organizations" ON reminder_notifications;
+CREATE POLICY "Users can view reminder notifications in their organizations" ON reminder_notifications
+    FOR SELECT USING (
+        organization_id IN (
+            SELECT organization_id 
+            FROM user_organizations 
+            WHERE user_id = auth.uid()
+        )
+    );
+
+DROP POLICY IF EXISTS "Users can insert reminder notifications in their organizations" ON reminder_notifications;
+CREATE POLICY "Users can insert reminder notifications in their organizations" ON reminder_notifications
+    FOR INSERT WITH CHECK (
+        organization_id IN (
+            SELECT organization_id 
+            FROM user_organizations 
+            WHERE user_id = auth.uid()
+        )
+    );
+
+-- Email and phone of the users reminders are sent to. auth.users is not exposed through
+-- the API, so this reads it as the definer, limited to the service role, the caller and
+-- members of the caller's organizations.
+CREATE OR REPLACE FUNCTION get_user_contacts(p_user_ids UUID[])
+RETURNS TABLE (
+    user_id UUID,
+    email TEXT,
+    phone TEXT
+) AS $$
+    SELECT u.id, u.email::TEXT, NULLIF(u.phone, '')::TEXT
+    FROM auth.users u
+    WHERE u.id = ANY(p_user_ids)
+      AND (
+          auth.role() = 'service_role'
+          OR u.id = auth.uid()
+          OR EXISTS (
+              SELECT 1
+              FROM user_organizations mine
+              JOIN user_organizations theirs ON theirs.organization_id = mine.organization_id
+              WHERE mine.user_id = auth.uid() AND theirs.user_id = u.id
+          )
+      );
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+GRANT ALL ON reminder_notifications TO anon, authenticated;
+GRANT USAGE, SELECT ON SEQUENCE reminder_notifications_id_seq TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_user_contacts(UUID[]) TO authenticated;
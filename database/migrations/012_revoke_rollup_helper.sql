@@ -0,0 +1,22 @@
+-- Migration 012: stop API callers from running the ledger rollup helper
+-- Run in the Supabase SQL editor on databases that applied migration 004 before it revoked this.
+
+-- bump_ledger_monthly_rollup is SECURITY DEFINER and PostgreSQL grants EXECUTE to PUBLIC by
+-- default, so /rpc/bump_ledger_monthly_rollup let any caller add arbitrary amounts to any
+-- organization's rollup. Only maintain_ledger_monthly_rollup (itself SECURITY DEFINER) needs it.
+REVOKE EXECUTE ON FUNCTION bump_ledger_monthly_rollup(INTEGER, INTEGER, DATE, TEXT, TEXT, NUMERIC, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- Repair totals a caller may have altered: rebuild the rollup from the ledger
+TRUNCATE ledger_monthly_rollup;
+
+INSERT INTO ledger_monthly_rollup (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+SELECT organization_id, property_id, date_trunc('month', transaction_date)::DATE, 'income', income_type, SUM(amount), COUNT(*)
+FROM income
+WHERE organization_id IS NOT NULL
+GROUP BY organization_id, property_id, date_trunc('month', transaction_date), income_type;
+
+INSERT INTO ledger_monthly_rollup (organization_id, property_id, month, kind, type, total_amount, transaction_count)
+SELECT organization_id, property_id, date_trunc('month', transaction_date)::DATE, 'expense', expense_type, SUM(amount), COUNT(*)
+FROM expenses
+WHERE organization_id IS NOT NULL
+GROUP BY organization_id, property_id, date_trunc('month', transaction_date), expense_type;
@@ -0,0 +1,22 @@
+-- Migration 013: retention for confirmed pending-transaction markers
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+-- Requires migration 006.
+
+-- Confirmed occurrence markers by date, for pruning old ones
+CREATE INDEX IF NOT EXISTS idx_pending_transactions_confirmed_date
+    ON pending_transactions(transaction_date) WHERE is_confirmed;
+
+-- Delete confirmed occurrence markers dated before p_before, returning how many were removed.
+-- Generation only ever inserts a rule's latest due date on or before today, which is at
+-- most one interval (a year) back, so older markers can no longer block a duplicate.
+CREATE OR REPLACE FUNCTION prune_confirmed_pending_transactions(p_before DATE)
+RETURNS INTEGER AS $$
+    WITH pruned AS (
+        DELETE FROM pending_transactions
+        WHERE is_confirmed AND transaction_date < p_before
+        RETURNING id
+    )
+    SELECT COUNT(*)::INTEGER FROM pruned;
+$$ LANGUAGE sql VOLATILE;
+
+GRANT EXECUTE ON FUNCTION prune_confirmed_pending_transactions(DATE) TO anon, authenticated;
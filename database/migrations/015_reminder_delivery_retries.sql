@@ -0,0 +1,70 @@
+-- Migration 015: bounded retries for rent reminder delivery
+-- Run in the Supabase SQL editor on databases created from an earlier complete_schema.sql.
+-- Requires migrations 011 and 014.
+
+DROP FUNCTION IF EXISTS get_due_reminders_page(INTEGER, INTEGER);
+
+-- One keyset page of due rent reminders, ordered by id: unrecorded, next reminder on or
+-- before today and still under max_reminders. The RPC result is capped by max-rows like
+-- any other read, so callers page with p_after_id instead of reading them all at once.
+-- Reminders whose delivery has failed on p_max_failures days since they were last sent
+-- are left out, so an unreachable recipient or relay stops being retried.
+-- plpgsql with a declared result so it can be created before rent_reminders exists.
+CREATE OR REPLACE FUNCTION get_due_reminders_page(p_after_id INTEGER, p_limit INTEGER, p_max_failures INTEGER)
+RETURNS TABLE (
+    id INTEGER,
+    property_id INTEGER,
+    organization_id INTEGER,
+    user_id TEXT,
+    reminder_month INTEGER,
+    reminder_year INTEGER,
+    reminder_date DATE,
+    last_sent_date DATE,
+    next_reminder_date DATE,
+    is_rent_recorded BOOLEAN,
+    reminder_count INTEGER,
+    max_reminders INTEGER,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT r.id::INTEGER, r.property_id::INTEGER, r.organization_id::INTEGER, r.user_id::TEXT,
+           r.reminder_month::INTEGER, r.reminder_year::INTEGER, r.reminder_date::DATE,
+           r.last_sent_date::DATE, r.next_reminder_date::DATE, r.is_rent_recorded,
+           r.reminder_count::INTEGER, r.max_reminders::INTEGER,
+           r.created_at::TIMESTAMPTZ, r.updated_at::TIMESTAMPTZ
+    FROM rent_reminders r
+    WHERE r.id > p_after_id
+      AND NOT r.is_rent_recorded
+      AND r.next_reminder_date <= CURRENT_DATE
+      AND r.reminder_count < r.max_reminders
+      AND (
+          SELECT COUNT(DISTINCT n.created_at::DATE)
+          FROM reminder_notifications n
+          WHERE n.reminder_id = r.id
+            AND NOT n.delivered
+            AND (r.last_sent_date IS NULL OR n.created_at::DATE > r.last_sent_date)
+      ) < p_max_failures
+    ORDER BY r.id
+    LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Push reminders' next reminder date p_days out without counting a send: used to retry
+-- undelivered reminders on a later day and to skip reminders with no recipient address.
+CREATE OR REPLACE FUNCTION defer_reminders(p_ids INTEGER[], p_days INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    deferred INTEGER;
+BEGIN
+    UPDATE rent_reminders
+    SET next_reminder_date = CURRENT_DATE + p_days
+    WHERE id = ANY(p_ids);
+    GET DIAGNOSTICS deferred = ROW_COUNT;
+    RETURN deferred;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+GRANT EXECUTE ON FUNCTION get_due_reminders_page(INTEGER, INTEGER, INTEGER) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION defer_reminders(INTEGER[], INTEGER) TO anon, authenticated;
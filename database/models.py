@@ -94,6 +94,15 @@ class Expense(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+class LedgerRollup(BaseModel):
+    organization_id: int
+    property_id: Optional[int] = None  # None for organization-level rows
+    month: datetime  # First day of the month
+    kind: str  # 'income' or 'expense'
+    type: str  # income_type or expense_type
+    total_amount: float
+    transaction_count: int
+
 class Category(BaseModel):
     id: Optional[int] = None
     name: str
@@ -161,6 +170,7 @@ class RecurringTransaction(BaseModel):
     start_date: datetime
     end_date: Optional[datetime] = None
     is_active: bool = True
+    next_due_date: Optional[datetime] = None  # Maintained by the database; None once the rule has ended
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
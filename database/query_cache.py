@@ -0,0 +1,167 @@
+"""
+Query cache for DatabaseOperations
+Read-through LRU cache with a TTL, invalidated per organization by write operations
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+from pydantic import BaseModel
+
+from config import get_query_cache_max_entries, get_query_cache_ttl
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, tables, organization_id, value), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_state = threading.local()
+        # Bumped by every invalidation; a load that straddles one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, tables: tuple, organization_id: Optional[int], key: tuple, loader: Callable):
+        """Return the cached value for key, calling loader on a miss or expiry"""
+        organization_id = _organization_key(organization_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_result(entry[3])
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        # Load outside the lock so slow queries don't block other readers
+        self._load_state.failed = False
+        value = loader()
+        if self._load_state.failed or self.ttl_seconds <= 0:
+            return value
+
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, tables, organization_id, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return _copy_result(value)
+
+    def mark_failed(self):
+        """Called from a loader's error handler so its fallback result is not cached"""
+        self._load_state.failed = True
+
+    def invalidate(self, tables: Iterable[str], organization_id: Optional[int] = None):
+        """Drop entries that read any of tables for organization_id.
+
+        Entries not tied to an organization are always dropped, and an unknown
+        organization_id (None) drops the tables for every organization.
+        """
+        tables = set(tables)
+        organization_id = _organization_key(organization_id)
+        with self._lock:
+            stale = [
+                key for key, (_, entry_tables, entry_org, _) in self._entries.items()
+                if tables.intersection(entry_tables)
+                and (organization_id is None or entry_org is None or entry_org == organization_id)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            self._generation += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries)
+            }
+
+
+def _organization_key(organization_id):
+    """Organization IDs arrive as both int and str; compare them as strings"""
+    return str(organization_id) if organization_id is not None else None
+
+
+def _copy_result(value):
+    """Copy containers, models and DataFrames so callers changing a result in place don't alter the cached value.
+
+    Models get a fresh instance each (their fields are scalars, dates and enums),
+    so a caller setting an attribute on one never leaks into another session's result.
+    """
+    if isinstance(value, BaseModel):
+        return value.model_copy()
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    return value
+
+
+def _freeze(value):
+    """Make an argument usable in a cache key"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def cached_query(*tables: str, organization_arg: Optional[str] = None):
+    """Cache a DatabaseOperations read method.
+
+    tables lists every table the result depends on, so writes to any of them
+    invalidate it. organization_arg names the parameter holding the
+    organization ID, letting writes invalidate only that organization.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {name: value for name, value in bound.arguments.items() if name != 'self'}
+            organization_id = arguments.get(organization_arg) if organization_arg else None
+            key = (method.__name__, _freeze(arguments))
+            return self.cache.get_or_load(tables, organization_id, key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+# Shared by every DatabaseOperations instance in the process, so a write made
+# through one instance invalidates reads cached by another
+query_cache = QueryCache(max_entries=get_query_cache_max_entries(), ttl_seconds=get_query_cache_ttl())
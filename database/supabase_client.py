@@ -1,10 +1,19 @@
 from supabase import create_client, Client
-from config import get_supabase_url, get_supabase_key
+from config import get_supabase_url, get_supabase_key, get_database_backend, get_local_database_path
+from database.instrumentation import InstrumentedClient, query_recorder
 import streamlit as st
 
 @st.cache_resource
 def get_supabase_client() -> Client:
-    """Initialize and return Supabase client"""
+    """Initialize and return Supabase client, instrumented so queries show in the performance panel.
+
+    With DATABASE_BACKEND=local this is an embedded SQLite client exposing the same
+    query-builder surface, so every caller runs unchanged without a Supabase project.
+    """
+    if get_database_backend() == "local":
+        from database.local_backend import LocalClient
+        return InstrumentedClient(LocalClient(get_local_database_path()), query_recorder)
+
     supabase_url = get_supabase_url()
     supabase_key = get_supabase_key()
     
@@ -12,7 +21,7 @@ def get_supabase_client() -> Client:
         st.error("Please set SUPABASE_URL and SUPABASE_KEY in your environment variables")
         st.stop()
     
-    return create_client(supabase_url, supabase_key)
+    return InstrumentedClient(create_client(supabase_url, supabase_key), query_recorder)
 
 def test_connection():
     """Test Supabase connection"""
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Scale benchmark suite for PropLedger.
+
+Times the app's heavy read paths (dashboard, P&L report, property summaries,
+analytics frames, budget analysis, cash-flow forecast), the in-memory recurrence engine and the
+batch jobs (pending transaction generation, reminder processing) against
+whatever database the environment points at, and writes a JSON report so runs can be compared.
+
+The job cases write to the database, so run the suite against a scratch copy,
+e.g. one built by generate_synthetic_portfolio.py:
+    DATABASE_BACKEND=local LOCAL_DATABASE_PATH=bench.db python scripts/benchmark_suite.py
+    python scripts/benchmark_suite.py --compare benchmark_results/baseline.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import os
+import time
+from datetime import datetime, date
+
+import numpy as np
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_database_backend
+from database.database_operations import DatabaseOperations
+from database.instrumentation import query_recorder
+from database.query_cache import query_cache
+from services.forecast import forecast_cash_flow
+from services.recurrence import RuleArrays, latest_due_dates, occurrences
+
+# Synthetic rules expanded by the recurrence_engine case
+RECURRENCE_RULES = 20000
+
+DATASET_TABLES = [
+    "organizations", "properties", "income", "expenses", "recurring_transactions",
+    "pending_transactions", "rent_reminders", "budgets"
+]
+
+
+def dashboard(db: DatabaseOperations, context: dict):
+    org_id = context["organization_id"]
+    return db.gather(
+        lambda: db.get_organization_by_id(org_id),
+        lambda: db.get_properties_by_organization(org_id),
+        lambda: db.get_rollup_totals(org_id),
+        lambda: db.get_income_by_organization(org_id, limit=10),
+        lambda: db.get_expenses_by_organization(org_id, limit=10)
+    )
+
+
+def pnl_report(db: DatabaseOperations, context: dict):
+    """Yearly P&L for the previous calendar year, loaded the way the Reports page does"""
+    year = date.today().year - 1
+    period_filters = [
+        ("eq", "organization_id", context["organization_id"]),
+        ("gte", "transaction_date", date(year, 1, 1).isoformat()),
+        ("lt", "transaction_date", date(year + 1, 1, 1).isoformat()),
+    ]
+    income_rows, expense_rows = db.gather(
+        lambda: list(db.iter_rows("income", period_filters)),
+        lambda: list(db.iter_rows("expenses", period_filters))
+    )
+    return sum(float(row["amount"]) for row in income_rows) - sum(float(row["amount"]) for row in expense_rows)
+
+
+def property_summaries(db: DatabaseOperations, context: dict):
+    return db.get_financial_summaries(context["organization_id"])
+
+
+def analytics_frames(db: DatabaseOperations, context: dict):
+    org_id = context["organization_id"]
+    return db.gather(
+        lambda: db.get_properties_by_organization(org_id),
+        lambda: db.get_income_frame(org_id),
+        lambda: db.get_expenses_frame(org_id)
+    )
+
+
+def budget_analysis(db: DatabaseOperations, context: dict):
+    budgets = db.get_budgets_by_organization(context["organization_id"])
+    if not budgets:
+        raise RuntimeError("benchmark organization has no budgets")
+    return [db.get_budget_analysis(budget.id) for budget in budgets]
+
+
+def cash_flow_forecast(db: DatabaseOperations, context: dict):
+    """Ten-year forecast of the organization's recurring transactions, as the Analytics page builds it"""
+    forecast = forecast_cash_flow(db.get_recurring_transactions_by_organization(context["organization_id"]), date.today(), 120)
+    return {"occurrences": int(forecast["occurrences"].sum()) if not forecast.empty else 0}
+
+
+def pending_generation(db: DatabaseOperations, context: dict):
+    from scripts.generate_pending_transactions import generate_pending_transactions
+    return generate_pending_transactions()
+
+
+def reminder_processing(db: DatabaseOperations, context: dict):
+    """Due reminders sent by email to an in-process SMTP sink with no rate limit, so the case measures the pipeline"""
+    from services.notifications import EmailChannel, LocalSmtpServer, NotificationDispatcher
+    from services.rent_reminder_service import RentReminderService
+    server = LocalSmtpServer(port=0).start()
+    dispatcher = NotificationDispatcher([EmailChannel("127.0.0.1", server.port, "benchmark@propledger.local")])
+    try:
+        processed = RentReminderService(dispatcher).process_due_reminders()
+    finally:
+        dispatcher.close()
+        server.stop()
+    return {"reminders": processed, "emails": server.received}
+
+
+def recurrence_engine(db: DatabaseOperations, context: dict):
+    """Expand synthetic rules over a ten-year window in memory; measures engine throughput, not the database"""
+    rules = context.get("recurrence_rules")
+    if rules is None:
+        rng = np.random.default_rng(0)
+        starts = np.datetime64("2015-01-01") + rng.integers(0, 3650, RECURRENCE_RULES).astype("timedelta64[D]")
+        rules = context["recurrence_rules"] = RuleArrays(starts, rng.choice([0, 1, 1, 1, 3, 12], RECURRENCE_RULES))
+    today = date.today()
+    latest_due_dates(rules, today)
+    _, dates = occurrences(rules, today, today.replace(year=today.year + 10))
+    return {"rules": len(rules), "occurrences": len(dates)}
+
+
+# name -> (function, repeatable); jobs change the data they read, so they run once
+CASES = {
+    "dashboard": (dashboard, True),
+    "pnl_report": (pnl_report, True),
+    "property_summaries": (property_summaries, True),
+    "analytics_frames": (analytics_frames, True),
+    "budget_analysis": (budget_analysis, True),
+    "cash_flow_forecast": (cash_flow_forecast, True),
+    "recurrence_engine": (recurrence_engine, True),
+    "pending_generation": (pending_generation, False),
+    "reminder_processing": (reminder_processing, False),
+}
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_case(db: DatabaseOperations, name: str, context: dict, iterations: int, warmup: int) -> dict:
+    function, repeatable = CASES[name]
+    timings = []
+    error = None
+    metrics = None
+
+    def timed_call(record: bool):
+        nonlocal metrics
+        # Every iteration starts cold, so the numbers measure the database path and not the cache
+        query_cache.clear()
+        query_recorder.begin_run(name, enabled=record)
+        started = time.perf_counter()
+        value = function(db, context)
+        elapsed = time.perf_counter() - started
+        if isinstance(value, dict):
+            metrics = value
+        return elapsed
+
+    try:
+        if repeatable:
+            for _ in range(warmup):
+                timed_call(record=False)
+            for _ in range(iterations):
+                timings.append(timed_call(record=False))
+        # One recorded pass for query counts; for jobs this is the only run
+        recorded = timed_call(record=True)
+        if not repeatable:
+            timings.append(recorded)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    run = query_recorder.current_run()
+    result = {
+        "iterations": len(timings),
+        "queries": run["queries"],
+        "rows": run["rows"],
+        "bytes": run["bytes"],
+        "query_ms": round(run["query_ms"], 2),
+        "error": error,
+    }
+    if metrics:
+        result["metrics"] = metrics
+    if timings:
+        result.update({
+            "min_ms": round(min(timings) * 1000, 2),
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 2),
+            "max_ms": round(max(timings) * 1000, 2),
+            "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        })
+    return result
+
+
+def dataset_counts(db: DatabaseOperations) -> dict:
+    counts = {}
+    for table in DATASET_TABLES:
+        try:
+            counts[table] = db.client.table(table).select("id", count="exact").limit(1).execute().count
+        except Exception:
+            counts[table] = None
+    return counts
+
+
+def pick_organization(db: DatabaseOperations) -> int:
+    """The organization with the most properties, so the read cases see the largest portfolio"""
+    sizes = {}
+    for org in db.client.table("organizations").select("id").execute().data:
+        sizes[org["id"]] = db.client.table("properties").select("id", count="exact").eq(
+            "organization_id", org["id"]
+        ).limit(1).execute().count or 0
+    if not any(sizes.values()):
+        raise SystemExit("No properties found; generate a portfolio first")
+    return max(sizes, key=sizes.get)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_comparison(report: dict, baseline: dict):
+    print(f"\nCompared with {baseline.get('git_commit')} ({baseline.get('generated_at')}):")
+    for name, result in report["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+        if not before or "median_ms" not in before or "median_ms" not in result:
+            print(f"  {name:<22} no comparable baseline")
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0.0
+        print(f"  {name:<22} {before['median_ms']:>10.1f} -> {result['median_ms']:>10.1f} ms ({change:+.1f}%), "
+              f"queries {before['queries']} -> {result['queries']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PropLedger's heavy read paths and batch jobs")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--iterations", type=int, default=5, help="timed runs per read case")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per read case")
+    parser.add_argument("--organization-id", type=int, help="organization for the read cases (default: largest)")
+    parser.add_argument("--output", help="report path (default: benchmark_results/benchmark-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier report to compare medians and query counts against")
+    args = parser.parse_args()
+
+    db = DatabaseOperations()
+    context = {"organization_id": args.organization_id or pick_organization(db)}
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "backend": get_database_backend(),
+        "python": platform.python_version(),
+        "dataset": dataset_counts(db),
+        "config": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "organization_id": context["organization_id"],
+        },
+        "cases": {},
+    }
+
+    print(f"Benchmarking organization {context['organization_id']} on the {report['backend']} backend")
+    for name in args.cases:
+        result = run_case(db, name, context, args.iterations, args.warmup)
+        report["cases"][name] = result
+        if result["error"]:
+            print(f"  {name:<22} failed: {result['error']}")
+        else:
+            print(f"  {name:<22} median {result['median_ms']:>10.1f} ms  p95 {result['p95_ms']:>10.1f} ms  "
+                  f"{result['queries']} queries, {result['rows']} rows")
+            if "occurrences" in result.get("metrics", {}):
+                rate = result["metrics"]["occurrences"] / (result["median_ms"] / 1000) if result["median_ms"] else 0
+                print(f"  {'':<22} {result['metrics']['occurrences']:,} occurrences, {rate:,.0f}/s")
+
+    output = args.output or os.path.join("benchmark_results", f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Report written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            print_comparison(report, json.load(baseline_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,149 +2,260 @@
 """
 Script to automatically generate pending transactions from recurring transactions.
 This should be run daily (e.g., via cron job) to create pending transactions.
+
+By default it reads every due rule in one pass. With --workers it shards the
+organizations and processes the shards concurrently, checkpointing finished
+organizations so a crashed run resumes where it stopped:
+    python scripts/generate_pending_transactions.py --workers 8 --shard-size 50
 """
 
+import argparse
+import json
+import multiprocessing
 import sys
 import os
-from datetime import datetime, timedelta, date
-from typing import List
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import timedelta, date
+from typing import List, Optional, Tuple
 
 # Add the parent directory to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.database_operations import DatabaseOperations
-from database.models import RecurringTransaction, PendingTransaction, RecurringInterval
-from database.supabase_client import get_supabase_client
+from database.models import RecurringTransaction
+from services.recurrence import due_pending_transactions, next_due_dates
+
+# Organizations per shard in worker mode
+DEFAULT_SHARD_SIZE = 50
+
+DEFAULT_CHECKPOINT_PATH = ".pending_generation_checkpoint.json"
+
+# Confirmed occurrence markers are kept this long. Generation only inserts each rule's
+# latest due date, at most a year back, and the ledger check in create_pending_transactions
+# covers anything older, so the markers past this age only take up space.
+CONFIRMED_MARKER_RETENTION_DAYS = 400
+
+# One DatabaseOperations per worker process (or shared by the worker threads)
+_worker_db = None
+_worker_db_lock = threading.Lock()
+
 
-def latest_due_date_on_or_before(recurring_transaction: RecurringTransaction, current_date: date) -> date:
-    """Return the most recent due date that is <= current_date.
-    If current_date precedes start_date, returns start_date.
+def generate_for_rules(db: DatabaseOperations, due_rules: List[RecurringTransaction], as_of: date) -> Optional[Tuple[int, int]]:
+    """Create the pending transactions due for due_rules and advance their due dates.
+
+    Returns (generated, advanced), or None if the insert failed; due dates are then
+    left unchanged so the next run retries the same rules.
     """
-    start_date = recurring_transaction.start_date.date()
-    interval = recurring_transaction.interval
-
-    if current_date <= start_date:
-        return start_date
-
-    if interval == RecurringInterval.WEEKLY:
-        weeks = (current_date - start_date).days // 7
-        return start_date + timedelta(weeks=weeks)
-    elif interval == RecurringInterval.MONTHLY:
-        years = current_date.year - start_date.year
-        months = years * 12 + (current_date.month - start_date.month)
-        # Clamp to at least 0
-        months = max(0, months)
-        # Compute candidate date in same day if possible
-        y = start_date.year + (start_date.month - 1 + months) // 12
-        m = (start_date.month - 1 + months) % 12 + 1
-        d = min(start_date.day, [31,29 if (y%4==0 and (y%100!=0 or y%400==0)) else 28,31,30,31,30,31,31,30,31,30,31][m-1])
-        return date(y, m, d)
-    elif interval == RecurringInterval.QUARTERLY:
-        years = current_date.year - start_date.year
-        months = years * 12 + (current_date.month - start_date.month)
-        quarters = max(0, months // 3)
-        y = start_date.year + (start_date.month - 1 + quarters*3) // 12
-        m = (start_date.month - 1 + quarters*3) % 12 + 1
-        d = start_date.day
-        # Adjust day to valid end-of-month
-        d = min(d, [31,29 if (y%4==0 and (y%100!=0 or y%400==0)) else 28,31,30,31,30,31,31,30,31,30,31][m-1])
-        return date(y, m, d)
-    elif interval == RecurringInterval.YEARLY:
-        years = max(0, current_date.year - start_date.year)
-        y = start_date.year + years
-        m = start_date.month
-        d = min(start_date.day, [31,29 if (y%4==0 and (y%100!=0 or y%400==0)) else 28,31,30,31,30,31,31,30,31,30,31][m-1])
-        return date(y, m, d)
-    else:
-        return start_date
-
-def should_generate_pending_transaction(recurring_transaction: RecurringTransaction, current_date: date) -> bool:
-    if not recurring_transaction.is_active:
-        return False
-    if recurring_transaction.end_date and current_date > recurring_transaction.end_date.date():
-        return False
-    # We always attempt to generate for the latest due date on/before today
-    return True
-
-def generate_pending_transactions():
-    """Generate pending transactions for all active recurring transactions"""
-    db = DatabaseOperations()
-    client = get_supabase_client()
+    # Occurrences that already exist for their rule are skipped by the unique key on insert
+    pending = due_pending_transactions(due_rules, as_of)
+    generated = db.create_pending_transactions(pending) if pending else 0
+    if generated is None:
+        return None
+    advanced = db.advance_recurring_due_dates(next_due_dates(due_rules, as_of))
+    return generated, advanced
+
+
+def prune_confirmed_markers(db: DatabaseOperations, as_of: date) -> int:
+    """Delete confirmed occurrence markers older than the retention period"""
+    pruned = db.prune_confirmed_pending_transactions(as_of - timedelta(days=CONFIRMED_MARKER_RETENTION_DAYS))
+    if pruned:
+        print(f"Pruned {pruned} confirmed pending transactions older than {CONFIRMED_MARKER_RETENTION_DAYS} days")
+    return pruned or 0
+
+
+def generate_pending_transactions(db: Optional[DatabaseOperations] = None) -> dict:
+    """Generate pending transactions for all recurring transactions that are due.
+
+    Returns a summary: rules due, pending transactions generated and rules advanced,
+    plus an error message if the insert failed.
+    """
+    db = db or DatabaseOperations()
     current_date = date.today()
-    
+
     print(f"Generating pending transactions for {current_date}")
-    
-    # Get all organizations
+
+    # Only rules whose next due date has arrived, via the next_due_date index, so the
+    # cost follows the work due rather than the total number of rules
+    due_rules = db.get_due_recurring_transactions(current_date)
+    if due_rules is None:
+        print("Error fetching due recurring transactions")
+        return {"rules": 0, "generated": 0, "advanced": 0, "error": "Error fetching due recurring transactions"}
+    summary = {"rules": len(due_rules), "generated": 0, "advanced": 0,
+               "pruned": prune_confirmed_markers(db, current_date)}
+    print(f"{len(due_rules)} recurring transactions due")
+    if not due_rules:
+        print("Generated 0 pending transactions")
+        return summary
+
+    outcome = generate_for_rules(db, due_rules, current_date)
+    if outcome is None:
+        print("Error creating pending transactions; due dates left unchanged for the next run")
+        summary["error"] = "Error creating pending transactions"
+        return summary
+
+    summary["generated"], summary["advanced"] = outcome
+    print(f"Generated {summary['generated']} pending transactions and advanced {summary['advanced']} recurring transactions")
+    return summary
+
+
+def _shard_db() -> DatabaseOperations:
+    global _worker_db
+    with _worker_db_lock:
+        if _worker_db is None:
+            _worker_db = DatabaseOperations()
+        return _worker_db
+
+
+def process_shard(shard_index: int, organization_ids: List[int], as_of: date) -> dict:
+    """Generate pending transactions for one shard of organizations; runs in a worker thread or process"""
+    started = time.perf_counter()
+    db = _shard_db()
+    due_rules = db.get_due_recurring_transactions(as_of, organization_ids)
+    # A failed read fails the shard, so its organizations stay out of the checkpoint
+    if due_rules is None:
+        outcome = None
+    else:
+        outcome = generate_for_rules(db, due_rules, as_of) if due_rules else (0, 0)
+    generated, advanced = outcome or (0, 0)
+    return {
+        "shard": shard_index,
+        "organization_ids": organization_ids,
+        "rules": len(due_rules or []),
+        "generated": generated,
+        "advanced": advanced,
+        "failed": outcome is None,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def new_checkpoint(as_of: date) -> dict:
+    return {"as_of": as_of.isoformat(), "completed_organization_ids": [], "rules": 0, "generated": 0, "advanced": 0}
+
+
+def load_checkpoint(path: str, as_of: date) -> dict:
+    """The checkpoint of an unfinished run for as_of, or an empty one"""
+    empty = new_checkpoint(as_of)
+    if not os.path.exists(path):
+        return empty
     try:
-        orgs_result = client.table("organizations").select("id").execute()
-        organizations = [org['id'] for org in orgs_result.data]
-    except Exception as e:
-        print(f"Error fetching organizations: {e}")
-        return
-    
-    total_generated = 0
-    
-    for org_id in organizations:
-        print(f"Processing organization {org_id}")
-        
-        # Get all active recurring transactions for this organization
-        recurring_transactions = db.get_recurring_transactions_by_organization(org_id)
-        
-        for recurring in recurring_transactions:
-            if should_generate_pending_transaction(recurring, current_date):
-                # Determine the month key YYYY-MM for idempotence
-                month_key = transaction_date.strftime('%Y-%m')
-                
-                # Guard 1: if last_generated_on is already same month, skip
-                if getattr(recurring, 'last_generated_on', None):
-                    if recurring.last_generated_on.strftime('%Y-%m') == month_key:
-                        print(f"  Skipping recurring {recurring.id}; already generated for {month_key}")
-                        continue
-                
-                # Guard 2: if a pending already exists in that month for this recurring id, skip
-                start_month = transaction_date.replace(day=1)
-                if start_month.month == 12:
-                    next_month = start_month.replace(year=start_month.year+1, month=1, day=1)
-                else:
-                    next_month = start_month.replace(month=start_month.month+1, day=1)
-                existing_pending = client.table("pending_transactions").select("id").eq(
-                    "recurring_transaction_id", recurring.id
-                ).gte("transaction_date", start_month.isoformat()).lt("transaction_date", next_month.isoformat()).execute()
-                if existing_pending.data:
-                    print(f"  Pending already exists for recurring {recurring.id} in {month_key}")
-                    continue
-                
-                # Calculate the transaction date (latest due date on/before today)
-                transaction_date = latest_due_date_on_or_before(recurring, current_date)
-                
-                # Create pending transaction
-                pending_transaction = PendingTransaction(
-                    organization_id=recurring.organization_id,
-                    property_id=recurring.property_id,
-                    transaction_type=recurring.transaction_type,
-                    income_type=recurring.income_type,
-                    expense_type=recurring.expense_type,
-                    amount=recurring.amount,
-                    description=recurring.description,
-                    transaction_date=datetime.combine(transaction_date, datetime.min.time()),
-                    recurring_transaction_id=recurring.id,
-                    is_confirmed=False
-                )
-                
-                # Save to database
-                created = db.create_pending_transaction(pending_transaction)
-                if created:
-                    print(f"  Generated pending transaction for {recurring.transaction_type} - {recurring.description} - ${recurring.amount}")
-                    # Update last_generated_on
-                    try:
-                        client.table("recurring_transactions").update({"last_generated_on": transaction_date.isoformat()}).eq("id", recurring.id).execute()
-                    except Exception:
-                        pass
-                    total_generated += 1
-                else:
-                    print(f"  Failed to create pending transaction for recurring {recurring.id}")
-    
-    print(f"Generated {total_generated} pending transactions")
+        with open(path, encoding="utf-8") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable checkpoint {path}: {e}")
+        return empty
+    # A checkpoint from another day describes work that is no longer due
+    return checkpoint if checkpoint.get("as_of") == as_of.isoformat() else empty
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    """Write the checkpoint atomically so a crash mid-write never leaves it truncated"""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, path)
+
+
+def run_worker(workers: int, shard_size: int = DEFAULT_SHARD_SIZE, executor: str = "thread",
+               checkpoint_path: str = DEFAULT_CHECKPOINT_PATH, fresh: bool = False,
+               as_of: Optional[date] = None) -> dict:
+    """Generate pending transactions for all organizations in concurrent shards and return a summary.
+
+    Organizations are only recorded in the checkpoint once their shard has committed,
+    so a shard interrupted by a crash is redone on resume; the unique key on
+    pending_transactions makes the redo insert nothing twice.
+    """
+    as_of = as_of or date.today()
+    started = time.perf_counter()
+    checkpoint = new_checkpoint(as_of) if fresh else load_checkpoint(checkpoint_path, as_of)
+    completed = set(checkpoint["completed_organization_ids"])
+    if completed:
+        print(f"Resuming from {checkpoint_path}: {len(completed)} organizations already done")
+
+    all_organization_ids = _shard_db().get_organization_ids()
+    if all_organization_ids is None:
+        # Keep the checkpoint; an empty organization list would otherwise look like a finished run
+        print("Error fetching organizations; rerun to resume")
+        return {"as_of": as_of.isoformat(), "organizations": 0, "shards": 0, "failed_shards": 0,
+                "rules": 0, "generated": 0, "advanced": 0, "error": "Error fetching organizations"}
+    organization_ids = [org_id for org_id in all_organization_ids if org_id not in completed]
+    shards = [organization_ids[start:start + shard_size] for start in range(0, len(organization_ids), shard_size)]
+    print(f"Generating pending transactions for {as_of}: {len(organization_ids)} organizations "
+          f"in {len(shards)} shards, {workers} {executor} workers")
+
+    totals = {"rules": 0, "generated": 0, "advanced": 0}
+    failed_shards = 0
+    if executor == "process":
+        # spawn, not fork: each process opens its own database connection
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    with pool:
+        futures = [pool.submit(process_shard, index, shard, as_of) for index, shard in enumerate(shards)]
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[{done}/{len(shards)}] shard failed: {type(e).__name__}: {e}")
+                failed_shards += 1
+                continue
+            if result["failed"]:
+                print(f"[{done}/{len(shards)}] shard {result['shard']}: error reading or creating pending transactions; "
+                      f"{len(result['organization_ids'])} organizations left for the next run")
+                failed_shards += 1
+                continue
+
+            for key in totals:
+                totals[key] += result[key]
+                checkpoint[key] += result[key]
+            checkpoint["completed_organization_ids"].extend(result["organization_ids"])
+            save_checkpoint(checkpoint_path, checkpoint)
+            rate = result["generated"] / result["seconds"] if result["seconds"] else 0.0
+            print(f"[{done}/{len(shards)}] shard {result['shard']}: {len(result['organization_ids'])} organizations, "
+                  f"{result['rules']} due rules, {result['generated']} generated in {result['seconds']:.2f}s "
+                  f"({rate:,.0f} rows/s)")
+
+    pruned = prune_confirmed_markers(_shard_db(), as_of)
+    elapsed = time.perf_counter() - started
+    summary = {
+        "pruned": pruned,
+        "as_of": as_of.isoformat(),
+        "organizations": len(organization_ids),
+        "shards": len(shards),
+        "failed_shards": failed_shards,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(totals["generated"] / elapsed, 1) if elapsed else 0.0,
+        **totals,
+    }
+    # A complete run leaves nothing to resume; keep the checkpoint while shards still need a retry
+    if not failed_shards and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    print(f"Generated {summary['generated']} pending transactions from {summary['rules']} due rules and advanced "
+          f"{summary['advanced']} recurring transactions in {elapsed:.2f}s ({summary['rows_per_second']:,.0f} rows/s)")
+    if failed_shards:
+        print(f"{failed_shards} shards failed; rerun to resume from {checkpoint_path}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate pending transactions from due recurring transactions")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="process organizations in concurrent shards with this many workers (default: single pass)")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="pool the shards run on in worker mode")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="organizations per shard")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="checkpoint file for resuming a crashed run")
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+
+    if args.workers > 0:
+        summary = run_worker(args.workers, args.shard_size, args.executor, args.checkpoint, args.fresh)
+        sys.exit(1 if summary["failed_shards"] or "error" in summary else 0)
+    summary = generate_pending_transactions()
+    sys.exit(1 if "error" in summary else 0)
+
 
 if __name__ == "__main__":
-    generate_pending_transactions()
+    main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Script to generate a synthetic PropLedger portfolio for scale testing.
+
+Creates organizations, properties and several years of income and expenses with
+rent seasonality, late fees, recurring mortgages, taxes, insurance and random
+repairs, plus the recurring rules, pending transactions, rent reminders and
+budgets the batch jobs work on. Rows match the schemas in database/models.py.
+
+Ledger volume beyond the regular monthly items is made up of maintenance, repairs
+and other one-off expenses, so --ledger-rows sets the total size.
+
+Offline run against the embedded backend:
+    DATABASE_BACKEND=local LOCAL_DATABASE_PATH=bench.db \\
+        python scripts/generate_synthetic_portfolio.py --organizations 50 --properties 10000 --ledger-rows 5000000
+"""
+
+import argparse
+import math
+import random
+import sys
+import os
+import time
+from datetime import date, datetime, timedelta
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_database_backend
+from database.models import RecurringInterval
+from database.supabase_client import get_supabase_client
+from services.recurrence import INTERVAL_MONTHS, RuleArrays, following_due_dates, latest_due_dates
+
+# property_type: (share of portfolio, typical purchase price)
+PROPERTY_TYPES = {
+    "apartment": (0.35, 180000),
+    "house": (0.30, 320000),
+    "condo": (0.15, 240000),
+    "townhouse": (0.12, 280000),
+    "commercial": (0.08, 650000),
+}
+
+# Expected regular ledger items per property-month, used to size the random one-offs:
+# rent, late fees, deposits, mortgage, utilities, management, taxes, insurance, HOA
+BASE_ITEMS_PER_PROPERTY_MONTH = 0.95 + 0.06 + 0.02 + 0.70 + 0.60 + 0.50 + 2 / 12 + 1 / 12 + 0.27
+
+# Relative frequency of random one-off expenses
+ONE_OFF_EXPENSE_TYPES = {"maintenance": 0.45, "repairs": 0.35, "other": 0.1, "advertising": 0.05, "legal": 0.02, "home_warranty": 0.03}
+
+
+def vacancy_rate(month: int) -> float:
+    """Share of properties without a paying tenant, highest around January and lowest in summer"""
+    return 0.05 + 0.03 * math.cos(2 * math.pi * (month - 1) / 12)
+
+
+def days_in_month(year: int, month: int) -> int:
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return (next_month - timedelta(days=1)).day
+
+
+def poisson(rng: random.Random, lam: float) -> int:
+    """Knuth's method; lam stays small (one-offs per property-month)"""
+    if lam <= 0:
+        return 0
+    threshold, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= threshold:
+            return k
+        k += 1
+
+
+class BatchWriter:
+    """Buffers rows for one table and inserts them in batches"""
+
+    def __init__(self, client, table: str, batch_size: int, returning: bool = False):
+        self.client = client
+        self.table = table
+        self.batch_size = batch_size
+        self.returning = returning
+        self.rows = []
+        self.inserted = []
+        self.count = 0
+
+    def add(self, row: dict):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        result = self.client.table(self.table).insert(
+            self.rows, returning="representation" if self.returning else "minimal"
+        ).execute()
+        if self.returning:
+            self.inserted.extend(result.data)
+        self.count += len(self.rows)
+        self.rows = []
+
+
+class PortfolioGenerator:
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.today = date.today()
+        first = date(self.today.year, self.today.month, 1)
+        self.months = []
+        for offset in range(args.months - 1, -1, -1):
+            index = first.year * 12 + first.month - 1 - offset
+            self.months.append(date(index // 12, index % 12 + 1, 1))
+        self.period_start = self.months[0]
+
+    def log(self, message: str):
+        print(f"[{datetime.now():%H:%M:%S}] {message}", flush=True)
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        organizations = self.create_organizations()
+        properties = self.create_properties(organizations)
+        ledger_rows = self.create_ledger(properties)
+        rules, generated = self.create_recurring_transactions(properties)
+        pending = self.create_pending_transactions(rules, generated)
+        reminders = self.create_rent_reminders(properties)
+        budgets = self.create_budgets(organizations, properties)
+        elapsed = time.perf_counter() - started
+        counts = {
+            "organizations": len(organizations),
+            "properties": len(properties),
+            "ledger_rows": ledger_rows,
+            "recurring_transactions": len(rules),
+            "pending_transactions": pending,
+            "rent_reminders": reminders,
+            "budgets": budgets,
+        }
+        self.log(f"Done in {elapsed:.1f}s: {counts}")
+        return counts
+
+    def create_organizations(self) -> list:
+        writer = BatchWriter(self.client, "organizations", self.args.batch_size, returning=True)
+        for index in range(1, self.args.organizations + 1):
+            writer.add({
+                "name": f"{self.args.name_prefix} Org {index:03d}",
+                "description": f"Synthetic portfolio (seed {self.args.seed})"
+            })
+        writer.flush()
+        organizations = writer.inserted
+
+        if self.args.user_id:
+            members = BatchWriter(self.client, "user_organizations", self.args.batch_size)
+            for org in organizations:
+                members.add({"user_id": self.args.user_id, "organization_id": org["id"], "role": "owner"})
+            members.flush()
+        self.log(f"Created {len(organizations)} organizations")
+        return organizations
+
+    def create_properties(self, organizations: list) -> list:
+        # Lognormal weights give a few large portfolios and a long tail of small ones
+        weights = [self.rng.lognormvariate(0, 1) for _ in organizations]
+        types = list(PROPERTY_TYPES)
+        type_shares = [PROPERTY_TYPES[t][0] for t in types]
+        writer = BatchWriter(self.client, "properties", self.args.batch_size, returning=True)
+        for index in range(1, self.args.properties + 1):
+            org = self.rng.choices(organizations, weights)[0]
+            property_type = self.rng.choices(types, type_shares)[0]
+            price = round(PROPERTY_TYPES[property_type][1] * self.rng.uniform(0.6, 1.6), -3)
+            purchase_date = self.period_start - timedelta(days=self.rng.randint(30, 3650))
+            writer.add({
+                "user_id": self.args.user_id,
+                "organization_id": org["id"],
+                "name": f"{property_type.title()} {index:05d}",
+                "address": f"{self.rng.randint(1, 9999)} {self.rng.choice(['Oak', 'Maple', 'Pine', 'Cedar', 'Elm', 'Main'])} St",
+                "property_type": property_type,
+                "purchase_price": price,
+                "purchase_date": purchase_date.isoformat(),
+                "monthly_rent": round(price * self.rng.uniform(0.006, 0.009), 0),
+                "description": "Synthetic property"
+            })
+        writer.flush()
+        self.log(f"Created {writer.count} properties")
+        return writer.inserted
+
+    def create_ledger(self, properties: list) -> int:
+        property_months = len(properties) * len(self.months)
+        target = self.args.ledger_rows / property_months if property_months else 0
+        # Thin the regular items when the target is below them, otherwise top up with one-offs
+        keep = min(1.0, target / BASE_ITEMS_PER_PROPERTY_MONTH)
+        one_offs = max(0.0, target - BASE_ITEMS_PER_PROPERTY_MONTH)
+
+        income = BatchWriter(self.client, "income", self.args.batch_size)
+        expenses = BatchWriter(self.client, "expenses", self.args.batch_size)
+        started = time.perf_counter()
+        for number, prop in enumerate(properties, 1):
+            self._property_ledger(prop, keep, one_offs, income, expenses)
+            if number % 500 == 0:
+                rows = income.count + expenses.count
+                self.log(f"  {number}/{len(properties)} properties, {rows:,} ledger rows "
+                         f"({rows / (time.perf_counter() - started):,.0f} rows/s)")
+        income.flush()
+        expenses.flush()
+        self.log(f"Created {income.count:,} income and {expenses.count:,} expense rows")
+        return income.count + expenses.count
+
+    def _property_ledger(self, prop: dict, keep: float, one_offs: float, income: BatchWriter, expenses: BatchWriter):
+        rng = self.rng
+        org_id, property_id = prop["organization_id"], prop["id"]
+        price, rent = prop["purchase_price"], prop["monthly_rent"]
+        property_type = prop["property_type"]
+        mortgaged = (property_id * 7919) % 10 < 7
+        pays_utilities = property_type in ("apartment", "commercial") or property_id % 3 == 0
+        managed = property_id % 2 == 0
+        has_hoa = property_type in ("condo", "townhouse")
+        mortgage_payment = round(price * 0.8 * 0.0055, 2)
+        tax_month = 1 + property_id % 6
+        insurance_month = 1 + property_id % 12
+
+        def add(writer, day, amount, kind_column, kind, description, month_start):
+            if rng.random() > keep:
+                return
+            transaction_date = month_start.replace(day=min(day, days_in_month(month_start.year, month_start.month)))
+            if transaction_date > self.today:
+                return
+            writer.add({
+                "organization_id": org_id,
+                "property_id": property_id,
+                "amount": round(amount, 2),
+                kind_column: kind,
+                "description": description,
+                "transaction_date": transaction_date.isoformat()
+            })
+
+        one_off_types, one_off_weights = list(ONE_OFF_EXPENSE_TYPES), list(ONE_OFF_EXPENSE_TYPES.values())
+        for month_start in self.months:
+            month, years = month_start.month, (month_start - self.period_start).days / 365.25
+            current_rent = rent * 1.03 ** years
+
+            if rng.random() >= vacancy_rate(month):
+                late = rng.random() < 0.06
+                add(income, rng.randint(6, 15) if late else rng.randint(1, 5), current_rent, "income_type", "rent", "Monthly rent", month_start)
+                if late:
+                    add(income, rng.randint(6, 15), 50, "income_type", "late_fee", "Late payment fee", month_start)
+            elif rng.random() < 0.4:
+                add(income, rng.randint(15, 28), current_rent, "income_type", "deposit", "Security deposit", month_start)
+
+            if mortgaged:
+                add(expenses, 1, mortgage_payment, "expense_type", "mortgage", "Mortgage payment", month_start)
+            if pays_utilities:
+                winter = 1.35 if month in (12, 1, 2) else 1.0
+                add(expenses, rng.randint(10, 20), rent * 0.06 * winter * rng.uniform(0.8, 1.2), "expense_type", "utilities", "Utilities", month_start)
+            if managed:
+                add(expenses, rng.randint(5, 10), current_rent * 0.08, "expense_type", "management", "Management fee", month_start)
+            if has_hoa:
+                add(expenses, 1, rent * 0.12, "expense_type", "hoa", "HOA dues", month_start)
+            if month in (tax_month, tax_month + 6):
+                add(expenses, rng.randint(1, 28), price * 0.006, "expense_type", "taxes", "Property tax installment", month_start)
+            if month == insurance_month:
+                add(expenses, rng.randint(1, 28), price * 0.004, "expense_type", "insurance", "Annual insurance premium", month_start)
+
+            for _ in range(poisson(rng, one_offs)):
+                expense_type = rng.choices(one_off_types, one_off_weights)[0]
+                amount = rng.lognormvariate(math.log(250), 0.9)
+                add(expenses, rng.randint(1, 28), amount, "expense_type", expense_type, f"{expense_type.replace('_', ' ').title()} work", month_start)
+
+    def create_recurring_transactions(self, properties: list) -> tuple:
+        """Rent, mortgage and insurance rules per property, plus which of them already have this month's occurrence"""
+        rows = []
+        start = self.period_start.isoformat()
+        for prop in properties:
+            base = {"organization_id": prop["organization_id"], "property_id": prop["id"], "start_date": start}
+            rows.append({**base, "transaction_type": "income", "income_type": "rent", "expense_type": None,
+                         "amount": prop["monthly_rent"], "description": "Monthly rent", "interval": "monthly",
+                         "is_active": prop["id"] % 20 != 0})
+            if (prop["id"] * 7919) % 10 < 7:
+                rows.append({**base, "transaction_type": "expense", "income_type": None, "expense_type": "mortgage",
+                             "amount": round(prop["purchase_price"] * 0.8 * 0.0055, 2), "description": "Mortgage payment",
+                             "interval": "monthly", "is_active": True})
+            rows.append({**base, "transaction_type": "expense", "income_type": None, "expense_type": "insurance",
+                         "amount": round(prop["purchase_price"] * 0.004, 2), "description": "Annual insurance premium",
+                         "interval": "yearly", "is_active": True})
+
+        # A share of the monthly rules was generated this month and waits as pending; the rest are
+        # due for the daily job. Yearly rules are treated as generated.
+        generated = [
+            row["interval"] != "monthly" or (row["is_active"] and self.rng.random() < self.args.pending_share)
+            for row in rows
+        ]
+        rule_arrays = RuleArrays([self.period_start] * len(rows), [INTERVAL_MONTHS[RecurringInterval(row["interval"])] for row in rows])
+        latest = latest_due_dates(rule_arrays, self.today)
+        following = following_due_dates(rule_arrays, self.today)
+
+        writer = BatchWriter(self.client, "recurring_transactions", self.args.batch_size, returning=True)
+        for row, done, latest_due, next_due in zip(rows, generated, latest, following):
+            writer.add({**row, "next_due_date": str(next_due if done else latest_due)})
+        writer.flush()
+        self.log(f"Created {writer.count} recurring transactions")
+        return writer.inserted, generated
+
+    def create_pending_transactions(self, rules: list, generated: list) -> int:
+        """Unconfirmed occurrences of this month's generated monthly rules, as the daily job would have left them"""
+        writer = BatchWriter(self.client, "pending_transactions", self.args.batch_size)
+        due = datetime.combine(self.today.replace(day=1), datetime.min.time()).isoformat()
+        for rule, done in zip(rules, generated):
+            if rule["interval"] != "monthly" or not done:
+                continue
+            writer.add({
+                "organization_id": rule["organization_id"],
+                "property_id": rule["property_id"],
+                "transaction_type": rule["transaction_type"],
+                "income_type": rule["income_type"],
+                "expense_type": rule["expense_type"],
+                "amount": rule["amount"],
+                "description": rule["description"],
+                "transaction_date": due,
+                "recurring_transaction_id": rule["id"],
+                "is_confirmed": False
+            })
+        writer.flush()
+        self.log(f"Created {writer.count} pending transactions")
+        return writer.count
+
+    def create_rent_reminders(self, properties: list) -> int:
+        """Recorded reminders for the previous two months and open, due ones for the current month"""
+        writer = BatchWriter(self.client, "rent_reminders", self.args.batch_size)
+        for prop in properties:
+            for month_start in self.months[-3:]:
+                current = month_start == self.months[-1]
+                reminder_count = self.rng.randint(0, 3) if current else self.rng.randint(0, 1)
+                writer.add({
+                    "property_id": prop["id"],
+                    "organization_id": prop["organization_id"],
+                    "user_id": self.args.user_id,
+                    "reminder_month": month_start.month,
+                    "reminder_year": month_start.year,
+                    "reminder_date": month_start.replace(day=5).isoformat(),
+                    "last_sent_date": None,
+                    "next_reminder_date": (self.today - timedelta(days=self.rng.randint(0, 5))).isoformat()
+                    if current else month_start.replace(day=10).isoformat(),
+                    "is_rent_recorded": not current and self.rng.random() < 0.97,
+                    "reminder_count": reminder_count,
+                    "max_reminders": 6
+                })
+        writer.flush()
+        self.log(f"Created {writer.count} rent reminders")
+        return writer.count
+
+    def create_budgets(self, organizations: list, properties: list) -> int:
+        """An organization-wide budget for the year and monthly budgets for a few properties per organization"""
+        by_org = {}
+        for prop in properties:
+            by_org.setdefault(prop["organization_id"], []).append(prop)
+        year_start = datetime(self.today.year, 1, 1)
+        year_end = datetime(self.today.year, 12, 31)
+        month_start = datetime(self.today.year, self.today.month, 1)
+        month_end = datetime(self.today.year, self.today.month, days_in_month(self.today.year, self.today.month))
+
+        writer = BatchWriter(self.client, "budgets", self.args.batch_size)
+        for org in organizations:
+            org_properties = by_org.get(org["id"], [])
+            base = {"organization_id": org["id"], "user_id": self.args.user_id, "is_active": True}
+            writer.add({**base, "property_id": None, "name": f"{self.today.year} operating budget",
+                        "description": "Synthetic organization budget",
+                        "budget_amount": round(sum(p["monthly_rent"] for p in org_properties) * 12 * 0.6, 2),
+                        "period": "yearly", "scope": "organization",
+                        "start_date": year_start.isoformat(), "end_date": year_end.isoformat()})
+            for prop in org_properties[:3]:
+                writer.add({**base, "property_id": prop["id"], "name": f"{prop['name']} monthly budget",
+                            "description": "Synthetic property budget",
+                            "budget_amount": round(prop["monthly_rent"] * 0.5, 2),
+                            "period": "monthly", "scope": "property",
+                            "start_date": month_start.isoformat(), "end_date": month_end.isoformat()})
+        writer.flush()
+        self.log(f"Created {writer.count} budgets")
+        return writer.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic PropLedger portfolio")
+    parser.add_argument("--organizations", type=int, default=50)
+    parser.add_argument("--properties", type=int, default=10000)
+    parser.add_argument("--ledger-rows", type=int, default=5000000, help="approximate income + expense rows")
+    parser.add_argument("--months", type=int, default=60, help="months of history ending with the current month")
+    parser.add_argument("--pending-share", type=float, default=0.3,
+                        help="share of monthly rules already generated this month; the rest are due")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per insert request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--name-prefix", default="Synthetic", help="organization name prefix (names must be unique)")
+    parser.add_argument("--user-id", help="user made owner of every organization; defaults to the local bench user")
+    parser.add_argument("--user-email", default="bench@example.com", help="local backend user to own the data")
+    args = parser.parse_args()
+
+    if not args.user_id:
+        if get_database_backend() != "local":
+            parser.error("--user-id is required with the Supabase backend")
+        from database.local_backend import local_user_id
+        args.user_id = local_user_id(args.user_email)
+
+    client = get_supabase_client()
+    print(f"Generating synthetic portfolio on the {get_database_backend()} backend")
+    PortfolioGenerator(client, args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink for developing and load-testing reminder notifications.
+Accepts every message on localhost:1025 (run the app with NOTIFICATION_CHANNELS=email
+SMTP_HOST=localhost SMTP_PORT=1025 to use it) and delivers nothing; prints a running
+count of received messages.
+"""
+
+import argparse
+import sys
+import os
+import time
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.notifications import LocalSmtpServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an SMTP server that accepts and discards all mail")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--verbose", action="store_true", help="print each message's recipients and subject")
+    args = parser.parse_args()
+
+    server = LocalSmtpServer(args.host, args.port).start()
+    print(f"Local SMTP sink listening on {server.host}:{server.port}")
+    reported = 0
+    try:
+        while True:
+            time.sleep(1)
+            if server.received != reported:
+                if args.verbose:
+                    for sender, recipients, data in list(server.messages)[-(server.received - reported):]:
+                        subject = next((line[9:] for line in data.splitlines() if line.startswith("Subject: ")), "")
+                        print(f"  {', '.join(recipients)}: {subject}")
+                reported = server.received
+                print(f"{reported} messages received")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Background script to process rent reminders
-This script should be run as a scheduled task (cron job on Linux/Mac, Task Scheduler on Windows)
+This script should be run as a scheduled task (cron job on Linux/Mac, Task Scheduler on Windows),
+or left to scripts/scheduler_daemon.py, which runs it on an interval from a warm process
 """
 import sys
 import os
@@ -23,6 +24,11 @@ def main():
         # Initialize the reminder service
         reminder_service = RentReminderService()
         
+        # Raises for settings that enable a channel without its relay or webhook
+        if not reminder_service.dispatcher.channels:
+            print(f"[{datetime.now()}] Reminder notifications are off (NOTIFICATION_CHANNELS is not set); nothing to send")
+            return
+        
         # Process due reminders
         processed_count = reminder_service.process_due_reminders()
         
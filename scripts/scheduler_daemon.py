@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Long-running scheduler for PropLedger's background jobs.
+
+Runs pending transaction generation and rent reminder processing on an interval
+from one warm process instead of cron: the modules are imported, the database
+client and the SMTP connections are created once and reused by every run, so a
+run costs only the work that is due. Replace the cron entries for
+generate_pending_transactions.py and process_reminders.py with:
+    python scripts/scheduler_daemon.py --pending-interval 900 --reminder-interval 900
+
+Each run starts after a random jitter, never overlaps the previous run of the same
+job, and takes a per-job lock file so two daemons on one host don't run a job at
+the same time. GET /health and GET /metrics on --port report the jobs' state.
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process overlap check applies
+    fcntl = None
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database_operations import DatabaseOperations
+from scripts.generate_pending_transactions import generate_pending_transactions, run_worker
+from services.notifications import NotificationConfigError
+from services.rent_reminder_service import RentReminderService
+
+# Consecutive failures after which /health reports the daemon as unhealthy
+UNHEALTHY_AFTER_FAILURES = 3
+
+
+def log(message: str):
+    print(f"[{datetime.now().isoformat(timespec='seconds')}] {message}", flush=True)
+
+
+class Job:
+    """A function run every interval seconds (plus jitter), with its last-run metrics"""
+
+    def __init__(self, name: str, function: Callable[[], dict], interval: float, jitter: float):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.jitter = jitter
+        self.running = threading.Lock()
+        # Spread the first runs too, so several daemons started together don't fire at once
+        self.next_run = time.time() + random.uniform(0, jitter)
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.skipped = 0
+        self.last_started = None
+        self.last_finished = None
+        self.last_duration = None
+        self.last_result = None
+        self.last_error = None
+
+    def schedule_next(self):
+        self.next_run = time.time() + self.interval + random.uniform(0, self.jitter)
+
+    def metrics(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "running": self.running.locked(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "skipped_overlaps": self.skipped,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_duration_seconds": self.last_duration,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+            "next_run": datetime.fromtimestamp(self.next_run).isoformat(timespec="seconds"),
+        }
+
+
+class Scheduler:
+    def __init__(self, jobs: list, lock_dir: str):
+        self.jobs = {job.name: job for job in jobs}
+        self.lock_dir = lock_dir
+        self.started_at = datetime.now()
+        self.stopping = threading.Event()
+        # One thread per job, so a long reminder run never delays generation
+        self.pool = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="job")
+
+    @contextmanager
+    def host_lock(self, job: Job):
+        """Exclusive lock file for the job on this host; yields False if another process holds it"""
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.lock_dir, f"propledger-{job.name}.lock"), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def run_job(self, job: Job):
+        try:
+            with self.host_lock(job) as acquired:
+                if not acquired:
+                    job.skipped += 1
+                    log(f"{job.name}: skipped, another process is running it")
+                    return
+                job.last_started = datetime.now().isoformat(timespec="seconds")
+                started = time.perf_counter()
+                try:
+                    result = job.function() or {}
+                    error = result.get("error") or (f"{result['failed_shards']} shards failed" if result.get("failed_shards") else None)
+                except Exception as e:
+                    result, error = {}, f"{type(e).__name__}: {e}"
+                    traceback.print_exc()
+                job.last_duration = round(time.perf_counter() - started, 3)
+                job.last_finished = datetime.now().isoformat(timespec="seconds")
+                job.last_result = result
+                job.last_error = error
+                job.runs += 1
+                if error:
+                    job.failures += 1
+                    job.consecutive_failures += 1
+                    log(f"{job.name}: failed after {job.last_duration}s: {error}")
+                else:
+                    job.consecutive_failures = 0
+                    log(f"{job.name}: finished in {job.last_duration}s {result}")
+        finally:
+            job.running.release()
+
+    def run(self):
+        """Start due jobs until stop() is called, then wait for running jobs to finish"""
+        while not self.stopping.is_set():
+            now = time.time()
+            for job in self.jobs.values():
+                if now < job.next_run:
+                    continue
+                job.schedule_next()
+                # The previous run is still going; skip rather than queue a second one
+                if not job.running.acquire(blocking=False):
+                    job.skipped += 1
+                    log(f"{job.name}: skipped, previous run still in progress")
+                    continue
+                self.pool.submit(self.run_job, job)
+            wait = min(job.next_run for job in self.jobs.values()) - time.time()
+            self.stopping.wait(max(0.1, min(wait, 1.0)))
+        self.pool.shutdown(wait=True)
+
+    def stop(self, *_):
+        if self.stopping.is_set():
+            # Second signal: don't wait for a stuck run (e.g. an unreachable SMTP server)
+            log("Exiting without waiting for running jobs")
+            os._exit(1)
+        log("Stopping after running jobs finish; signal again to exit now")
+        self.stopping.set()
+
+    def healthy(self) -> bool:
+        return all(job.consecutive_failures < UNHEALTHY_AFTER_FAILURES for job in self.jobs.values())
+
+    def metrics(self) -> dict:
+        return {
+            "status": "ok" if self.healthy() else "failing",
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "uptime_seconds": round((datetime.now() - self.started_at).total_seconds()),
+            "jobs": {name: job.metrics() for name, job in self.jobs.items()},
+        }
+
+
+def start_status_server(scheduler: Scheduler, host: str, port: int) -> ThreadingHTTPServer:
+    """Serve GET /health (200 or 503) and GET /metrics (JSON) on a background thread"""
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/health":
+                status = 200 if scheduler.healthy() else 503
+                body = {"status": "ok" if status == 200 else "failing"}
+            elif self.path == "/metrics":
+                status, body = 200, scheduler.metrics()
+            else:
+                status, body = 404, {"error": "not found"}
+            payload = json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StatusHandler)
+    threading.Thread(target=server.serve_forever, name="status-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run PropLedger's background jobs on a schedule")
+    parser.add_argument("--pending-interval", type=float, default=900,
+                        help="seconds between pending transaction generation runs (0 disables)")
+    parser.add_argument("--reminder-interval", type=float, default=900,
+                        help="seconds between reminder processing runs (0 disables)")
+    parser.add_argument("--jitter", type=float, default=30, help="random delay of up to this many seconds per run")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="generate pending transactions in sharded worker mode with this many threads")
+    parser.add_argument("--host", default="127.0.0.1", help="address for the health and metrics endpoint")
+    parser.add_argument("--port", type=int, default=8765, help="port for the health and metrics endpoint (0 disables)")
+    parser.add_argument("--lock-dir", default=tempfile.gettempdir(), help="directory for the per-job lock files")
+    args = parser.parse_args()
+
+    # Built once and shared by every run: one client and connection pool, one set of SMTP connections
+    db = DatabaseOperations()
+    reminder_service = RentReminderService()
+    if args.reminder_interval > 0:
+        try:
+            notifications_enabled = bool(reminder_service.dispatcher.channels)
+        except NotificationConfigError as e:
+            sys.exit(f"Invalid notification settings: {e}")
+        if not notifications_enabled:
+            log("Reminder notifications are off (NOTIFICATION_CHANNELS is not set); not scheduling reminder processing")
+            args.reminder_interval = 0
+
+    def pending_generation() -> dict:
+        if args.workers > 0:
+            return run_worker(args.workers, executor="thread")
+        return generate_pending_transactions(db)
+
+    def reminder_processing() -> dict:
+        return {"reminders": reminder_service.process_due_reminders()}
+
+    jobs = []
+    if args.pending_interval > 0:
+        jobs.append(Job("pending_generation", pending_generation, args.pending_interval, args.jitter))
+    if args.reminder_interval > 0:
+        jobs.append(Job("reminder_processing", reminder_processing, args.reminder_interval, args.jitter))
+    if not jobs:
+        parser.error("every job is disabled")
+
+    scheduler = Scheduler(jobs, args.lock_dir)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+
+    status_server = start_status_server(scheduler, args.host, args.port) if args.port else None
+    log(f"Scheduler started: {', '.join(f'{job.name} every {job.interval:g}s' for job in jobs)}"
+        + (f"; status on http://{args.host}:{status_server.server_address[1]}" if status_server else ""))
+    try:
+        scheduler.run()
+    finally:
+        if status_server:
+            status_server.shutdown()
+        if args.reminder_interval > 0:
+            reminder_service.dispatcher.close()
+    log("Scheduler stopped")
+
+
+if __name__ == "__main__":
+    main()
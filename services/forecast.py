@@ -0,0 +1,87 @@
+"""
+Cash-flow forecast
+Projects future income and expenses from an organization's recurring transactions
+"""
+from datetime import date, timedelta
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from database.models import RecurringTransaction
+from services.recurrence import RuleArrays, add_months, occurrences
+
+# Longest horizon the forecast accepts
+MAX_HORIZON_MONTHS = 120
+
+FORECAST_COLUMNS = ["month", "property_id", "transaction_type", "category", "amount", "occurrences"]
+
+
+def forecast_window(as_of: date, months: int):
+    """(first, last) day of a forecast starting the day after as_of and running for months"""
+    months = max(1, min(months, MAX_HORIZON_MONTHS))
+    start = as_of + timedelta(days=1)
+    end = add_months(np.array([np.datetime64(as_of, "D")]), np.array([months]))[0]
+    return start, end.astype(object)
+
+
+def _category(rule: RecurringTransaction) -> str:
+    category = rule.income_type if rule.transaction_type == "income" else rule.expense_type
+    return getattr(category, "value", category) or "other"
+
+
+def forecast_cash_flow(rules: List[RecurringTransaction], as_of: date, months: int = 12) -> pd.DataFrame:
+    """Every future occurrence of the active rules within the horizon, summed by month, property and type.
+
+    All rules are expanded in one vectorized pass, so an organization with thousands
+    of rules over ten years costs a few array operations rather than a loop per occurrence.
+    Returns one row per (month, property_id, transaction_type, category) with the
+    total amount and number of occurrences; month is the first day of the month.
+    """
+    rules = [rule for rule in rules if rule.is_active]
+    if not rules:
+        return pd.DataFrame(columns=FORECAST_COLUMNS)
+
+    start, end = forecast_window(as_of, months)
+    rule_index, dates = occurrences(RuleArrays.from_rules(rules), start, end)
+    if len(dates) == 0:
+        return pd.DataFrame(columns=FORECAST_COLUMNS)
+
+    # Each rule belongs to one (property, type, category) group; occurrences are summed
+    # per group and month with bincount over integer cell numbers instead of a groupby
+    groups = {}
+    rule_groups = np.array([
+        groups.setdefault((rule.property_id, rule.transaction_type, _category(rule)), len(groups))
+        for rule in rules
+    ])
+    amounts = np.array([rule.amount for rule in rules], dtype=float)
+    months_since_epoch = dates.astype("datetime64[M]").astype(np.int64)
+    first_month = months_since_epoch.min()
+    span = int(months_since_epoch.max() - first_month) + 1
+    cells = rule_groups[rule_index] * span + (months_since_epoch - first_month)
+    totals = np.bincount(cells, weights=amounts[rule_index], minlength=len(groups) * span)
+    counts = np.bincount(cells, minlength=len(groups) * span)
+
+    present = np.flatnonzero(counts)
+    group_index, month_offset = np.divmod(present, span)
+    group_keys = list(groups)
+    frame = pd.DataFrame({
+        "month": (first_month + month_offset).astype("datetime64[M]").astype("datetime64[ns]"),
+        "property_id": [group_keys[index][0] for index in group_index],
+        "transaction_type": [group_keys[index][1] for index in group_index],
+        "category": [group_keys[index][2] for index in group_index],
+        "amount": totals[present],
+        "occurrences": counts[present],
+    })
+    return frame.sort_values(["month", "property_id", "transaction_type", "category"], ignore_index=True)
+
+
+def monthly_cash_flow(forecast: pd.DataFrame) -> pd.DataFrame:
+    """Forecast totals per month: income, expense and net columns indexed by month"""
+    if forecast.empty:
+        return pd.DataFrame(columns=["income", "expense", "net"])
+    monthly = forecast.pivot_table(
+        index="month", columns="transaction_type", values="amount", aggfunc="sum", fill_value=0.0
+    ).reindex(columns=["income", "expense"], fill_value=0.0)
+    monthly["net"] = monthly["income"] - monthly["expense"]
+    return monthly
@@ -0,0 +1,432 @@
+"""
+Notification dispatch
+Delivers email and SMS notifications through an asyncio worker pool with
+per-channel rate limits and retry with backoff
+"""
+import asyncio
+import random
+import smtplib
+import threading
+import time
+from collections import deque
+from email.message import EmailMessage
+from typing import Callable, Dict, List, Optional
+
+import requests
+from pydantic import BaseModel
+
+from config import (
+    get_email_rate_limit, get_notification_channels, get_notification_sender, get_notification_workers,
+    get_smtp_host, get_smtp_password, get_smtp_port, get_smtp_use_tls, get_smtp_username,
+    get_sms_rate_limit, get_sms_webhook_token, get_sms_webhook_url
+)
+
+# Attempts per notification before it is recorded as failed
+DEFAULT_MAX_ATTEMPTS = 4
+
+# Results handed to the on_results callback at a time
+DEFAULT_RESULT_BATCH_SIZE = 200
+
+
+class Notification(BaseModel):
+    key: int  # Caller's reference, e.g. the rent reminder id
+    organization_id: Optional[int] = None
+    channel: str  # 'email' or 'sms'
+    recipient: str
+    subject: str
+    body: str
+
+
+class DeliveryResult(BaseModel):
+    notification: Notification
+    delivered: bool
+    attempts: int
+    error: Optional[str] = None
+
+
+class NotificationConfigError(ValueError):
+    """The notification settings enable a channel without what it needs to deliver"""
+
+
+class PermanentDeliveryError(Exception):
+    """Delivery failed in a way retrying cannot fix, e.g. a rejected recipient"""
+
+
+class Channel:
+    """A way of delivering notifications. Subclasses implement the blocking _send_blocking"""
+
+    name = None
+
+    def __init__(self, rate_per_second: float = 0, max_concurrency: int = 4):
+        self.rate_per_second = rate_per_second
+        self.max_concurrency = max_concurrency
+
+    def _send_blocking(self, notification: Notification):
+        raise NotImplementedError
+
+    async def send(self, notification: Notification):
+        # The SMTP and HTTP clients block, so each send runs on the default thread pool
+        await asyncio.to_thread(self._send_blocking, notification)
+
+    def close(self):
+        pass
+
+
+class EmailChannel(Channel):
+    """Email over SMTP, reusing up to max_concurrency open connections"""
+
+    name = "email"
+
+    def __init__(self, host: str, port: int, sender: str, username: str = None, password: str = None,
+                 use_tls: bool = False, rate_per_second: float = 0, max_concurrency: int = 8, timeout: float = 30):
+        super().__init__(rate_per_second, max_concurrency)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle = []
+        self._idle_lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        return connection
+
+    def _send_blocking(self, notification: Notification):
+        with self._idle_lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._connect()
+
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = notification.recipient
+        message["Subject"] = notification.subject
+        message.set_content(notification.body)
+        try:
+            connection.send_message(message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+            # The server answered, so the connection is still usable
+            self._release(connection)
+            code = getattr(e, "smtp_code", 550)
+            if 500 <= code < 600:
+                raise PermanentDeliveryError(str(e)) from e
+            raise
+        except Exception:
+            self._discard(connection)
+            raise
+        self._release(connection)
+
+    def _release(self, connection: smtplib.SMTP):
+        with self._idle_lock:
+            self._idle.append(connection)
+
+    @staticmethod
+    def _discard(connection: smtplib.SMTP):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._idle_lock:
+            connections, self._idle = self._idle, []
+        for connection in connections:
+            try:
+                connection.quit()
+            except Exception:
+                self._discard(connection)
+
+
+class WebhookSmsChannel(Channel):
+    """SMS through an HTTP gateway that accepts {"to", "body", "reference"} JSON"""
+
+    name = "sms"
+
+    def __init__(self, url: str, token: str = None, rate_per_second: float = 0, max_concurrency: int = 4,
+                 timeout: float = 10):
+        super().__init__(rate_per_second, max_concurrency)
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _send_blocking(self, notification: Notification):
+        response = self.session.post(self.url, json={
+            "to": notification.recipient,
+            "body": notification.body,
+            "reference": notification.key
+        }, timeout=self.timeout)
+        # 4xx other than throttling means the message itself was rejected
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            raise PermanentDeliveryError(f"SMS gateway rejected message: HTTP {response.status_code} {response.text[:200]}")
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class RateLimiter:
+    """Token bucket: at most rate_per_second acquisitions per second, with bursts up to one second's worth"""
+
+    def __init__(self, rate_per_second: float):
+        self.rate = rate_per_second
+        self.capacity = max(1.0, rate_per_second)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class NotificationDispatcher:
+    """Delivers notifications with a pool of asyncio workers.
+
+    Each channel has its own workers (up to `workers` per channel), rate limit and
+    concurrency cap, so a slow SMS gateway doesn't hold back email. Failed sends are retried with jittered exponential
+    backoff; PermanentDeliveryError fails a notification immediately. Results are
+    handed to on_results in batches while the run is in progress, so callers can
+    record them in bulk.
+    """
+
+    def __init__(self, channels: List[Channel], workers: int = 20, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0):
+        self.channels = {channel.name: channel for channel in channels}
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def dispatch(self, notifications: List[Notification], on_results: Callable[[List[DeliveryResult]], None] = None,
+                 batch_size: int = DEFAULT_RESULT_BATCH_SIZE) -> List[DeliveryResult]:
+        """Deliver notifications and return their results; blocks until all are delivered or failed"""
+        return asyncio.run(self.dispatch_async(notifications, on_results, batch_size))
+
+    async def dispatch_async(self, notifications: List[Notification],
+                             on_results: Callable[[List[DeliveryResult]], None] = None,
+                             batch_size: int = DEFAULT_RESULT_BATCH_SIZE) -> List[DeliveryResult]:
+        # Limits are per run: asyncio primitives belong to the event loop that created them
+        limits = {
+            name: (asyncio.Semaphore(channel.max_concurrency),
+                   RateLimiter(channel.rate_per_second) if channel.rate_per_second else None)
+            for name, channel in self.channels.items()
+        }
+        # A queue and a set of workers per channel, so workers waiting on one channel's
+        # rate limit or retries never leave another channel's queue unserved
+        queues = {}
+        for notification in notifications:
+            queues.setdefault(notification.channel, asyncio.Queue()).put_nowait(notification)
+        finished = asyncio.Queue()
+        results = []
+
+        async def worker(work: asyncio.Queue):
+            while True:
+                try:
+                    notification = work.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await self._deliver(notification, limits)
+                results.append(result)
+                await finished.put(result)
+
+        async def recorder():
+            # One consumer, so on_results is never called concurrently
+            batch = []
+            while True:
+                result = await finished.get()
+                if result is not None:
+                    batch.append(result)
+                if batch and (result is None or len(batch) >= batch_size):
+                    if on_results:
+                        await asyncio.to_thread(on_results, batch)
+                    batch = []
+                if result is None:
+                    return
+
+        recording = asyncio.create_task(recorder())
+        await asyncio.gather(*(
+            worker(work) for work in queues.values() for _ in range(max(1, min(self.workers, work.qsize())))
+        ))
+        await finished.put(None)
+        await recording
+        return results
+
+    async def _deliver(self, notification: Notification, limits: dict) -> DeliveryResult:
+        channel = self.channels.get(notification.channel)
+        if channel is None:
+            return DeliveryResult(notification=notification, delivered=False, attempts=0,
+                                  error=f"No {notification.channel} channel configured")
+        semaphore, limiter = limits[notification.channel]
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            if limiter:
+                await limiter.acquire()
+            try:
+                async with semaphore:
+                    await channel.send(notification)
+                return DeliveryResult(notification=notification, delivered=True, attempts=attempt)
+            except PermanentDeliveryError as e:
+                return DeliveryResult(notification=notification, delivered=False, attempts=attempt, error=str(e))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt < self.max_attempts:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+        return DeliveryResult(notification=notification, delivered=False, attempts=self.max_attempts, error=error)
+
+    def close(self):
+        for channel in self.channels.values():
+            channel.close()
+
+
+def build_channels() -> List[Channel]:
+    """Channels enabled by NOTIFICATION_CHANNELS, none when it is unset.
+
+    Raises NotificationConfigError for an unknown channel, email without SMTP_HOST or
+    SMS without SMS_WEBHOOK_URL, so a misconfigured deployment fails on startup instead
+    of retrying every reminder against an address that was never meant to receive it.
+    """
+    channels = []
+    enabled = get_notification_channels()
+    unknown = sorted(set(enabled) - {"email", "sms"})
+    if unknown:
+        raise NotificationConfigError(f"Unknown NOTIFICATION_CHANNELS: {', '.join(unknown)}")
+    if "email" in enabled:
+        if not get_smtp_host():
+            raise NotificationConfigError("NOTIFICATION_CHANNELS includes email but SMTP_HOST is not set")
+        channels.append(EmailChannel(
+            get_smtp_host(), get_smtp_port(), get_notification_sender(),
+            username=get_smtp_username(), password=get_smtp_password(), use_tls=get_smtp_use_tls(),
+            rate_per_second=get_email_rate_limit()
+        ))
+    if "sms" in enabled:
+        if not get_sms_webhook_url():
+            raise NotificationConfigError("NOTIFICATION_CHANNELS includes sms but SMS_WEBHOOK_URL is not set")
+        channels.append(WebhookSmsChannel(
+            get_sms_webhook_url(), token=get_sms_webhook_token(), rate_per_second=get_sms_rate_limit()
+        ))
+    return channels
+
+
+def build_dispatcher() -> NotificationDispatcher:
+    return NotificationDispatcher(build_channels(), workers=get_notification_workers())
+
+
+class LocalSmtpServer:
+    """In-process SMTP sink for development, tests and benchmarks.
+
+    Accepts every message and keeps the most recent ones in memory; nothing is
+    delivered anywhere. Runs its own event loop on a background thread:
+        server = LocalSmtpServer(port=0).start()   # port 0 picks a free port
+        ... EmailChannel("127.0.0.1", server.port, ...)
+        server.stop()
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1025, keep: int = 1000):
+        self.host = host
+        self.port = port
+        self.received = 0
+        self.messages = deque(maxlen=keep)  # (sender, recipients, data)
+        self._loop = None
+        self._thread = None
+        self._server = None
+        self._connections = {}  # handler task -> writer
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[asyncio.current_task()] = writer
+
+        async def reply(text: str):
+            writer.write(f"{text}\r\n".encode())
+            await writer.drain()
+
+        sender, recipients = None, []
+        await reply("220 propledger-local ESMTP")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                verb = command[:4].upper()
+                if verb in ("HELO", "EHLO"):
+                    await reply("250 propledger-local")
+                elif verb == "MAIL":
+                    sender, recipients = command.split(":", 1)[-1].strip(), []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[-1].strip())
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b".\r\n", b".\n", b""):
+                            break
+                        lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                    self.messages.append((sender, recipients, b"".join(lines).decode("utf-8", "replace")))
+                    self.received += 1
+                    await reply("250 OK")
+                elif verb in ("RSET", "NOOP"):
+                    if verb == "RSET":
+                        sender, recipients = None, []
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _shutdown(self):
+        self._server.close()
+        # Closing the transports ends each handler's readline, so handlers finish on their own
+        handlers = list(self._connections)
+        for writer in list(self._connections.values()):
+            writer.close()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        self._loop.stop()
+
+    def start(self) -> "LocalSmtpServer":
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            try:
+                self._loop.run_forever()
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="local-smtp-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread.join()
+            self._loop = None
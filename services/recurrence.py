@@ -0,0 +1,164 @@
+"""
+Recurrence engine
+Vectorized due-date computation for recurring transactions
+"""
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from database.models import PendingTransaction, RecurringInterval, RecurringTransaction
+
+# Months between occurrences; weekly rules step by days instead and are marked with 0
+INTERVAL_MONTHS = {
+    RecurringInterval.WEEKLY: 0,
+    RecurringInterval.MONTHLY: 1,
+    RecurringInterval.QUARTERLY: 3,
+    RecurringInterval.YEARLY: 12,
+}
+
+
+class RuleArrays:
+    """Column arrays for a set of recurring rules: start and end dates (datetime64[D]) and step in months"""
+
+    def __init__(self, starts, step_months, ends=None):
+        self.starts = np.asarray(starts, dtype="datetime64[D]")
+        self.step_months = np.asarray(step_months, dtype=np.int64)
+        if ends is None:
+            self.ends = np.full(len(self.starts), np.datetime64("NaT"), dtype="datetime64[D]")
+        else:
+            self.ends = np.asarray(ends, dtype="datetime64[D]")
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_rules(cls, rules: List[RecurringTransaction]) -> "RuleArrays":
+        return cls(
+            [_to_date(rule.start_date) for rule in rules],
+            [INTERVAL_MONTHS[RecurringInterval(rule.interval)] for rule in rules],
+            [_to_date(rule.end_date) if rule.end_date else None for rule in rules]
+        )
+
+
+def _to_date(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _to_day(value) -> np.datetime64:
+    return np.datetime64(_to_date(value), "D")
+
+
+def add_months(starts: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """starts + months, keeping the start's day of month and clamping it to the target month's length.
+
+    Each occurrence is computed from the start date, so a rule starting on the 31st
+    falls on Feb 28/29 and comes back to the 31st in March.
+    """
+    start_months = starts.astype("datetime64[M]")
+    day_offsets = (starts - start_months.astype("datetime64[D]")).astype(np.int64)
+    target_months = start_months + months.astype("timedelta64[M]")
+    first_days = target_months.astype("datetime64[D]")
+    month_lengths = ((target_months + 1).astype("datetime64[D]") - first_days).astype(np.int64)
+    return first_days + np.minimum(day_offsets, month_lengths - 1).astype("timedelta64[D]")
+
+
+def _occurrence_dates(rules: RuleArrays, index: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """Date of occurrence k (0 = start date) of each rule in index"""
+    starts, steps = rules.starts[index], rules.step_months[index]
+    monthly = add_months(starts, k * steps)
+    weekly = starts + (k * 7).astype("timedelta64[D]")
+    return np.where(steps == 0, weekly, monthly)
+
+
+def _month_index(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[M]").astype(np.int64)
+
+
+def _last_occurrence_index(rules: RuleArrays, limit: np.ndarray) -> np.ndarray:
+    """Index k of each rule's last occurrence on or before limit; -1 when the rule starts after it"""
+    steps = rules.step_months
+    weekly = steps == 0
+    k = np.where(
+        weekly,
+        (limit - rules.starts).astype(np.int64) // 7,
+        (_month_index(limit) - _month_index(rules.starts)) // np.where(weekly, 1, steps)
+    )
+    # In the limit's month the occurrence can fall after the limit's day
+    overshoot = (~weekly) & (k >= 0) & (_occurrence_dates(rules, np.arange(len(rules)), np.maximum(k, 0)) > limit)
+    k = np.where(overshoot, k - 1, k)
+    return np.where(rules.starts > limit, -1, k)
+
+
+def latest_due_dates(rules: RuleArrays, as_of) -> np.ndarray:
+    """Most recent due date on or before as_of (and the rule's end date) per rule, NaT if none yet"""
+    limit = np.full(len(rules), _to_day(as_of))
+    limit = np.where(np.isnat(rules.ends), limit, np.minimum(limit, rules.ends))
+    k = _last_occurrence_index(rules, limit)
+    dates = _occurrence_dates(rules, np.arange(len(rules)), np.maximum(k, 0))
+    return np.where(k >= 0, dates, np.datetime64("NaT"))
+
+
+def following_due_dates(rules: RuleArrays, after) -> np.ndarray:
+    """First due date strictly after `after` per rule, NaT once the rule's end date has passed"""
+    k = _last_occurrence_index(rules, np.full(len(rules), _to_day(after))) + 1
+    dates = _occurrence_dates(rules, np.arange(len(rules)), k)
+    return np.where(np.isnat(rules.ends) | (dates <= rules.ends), dates, np.datetime64("NaT"))
+
+
+def occurrences(rules: RuleArrays, window_start, window_end) -> Tuple[np.ndarray, np.ndarray]:
+    """All due dates of all rules within [window_start, window_end].
+
+    Returns (rule_index, dates): parallel arrays with one entry per occurrence,
+    ordered by rule and then date. rule_index points into the RuleArrays.
+    """
+    count = len(rules)
+    if count == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[D]")
+    low = np.full(count, _to_day(window_start))
+    high = np.full(count, _to_day(window_end))
+    high = np.where(np.isnat(rules.ends), high, np.minimum(high, rules.ends))
+
+    # First occurrence on or after low = one past the last occurrence before low
+    first = _last_occurrence_index(rules, low - np.timedelta64(1, "D")) + 1
+    last = _last_occurrence_index(rules, high)
+    counts = np.maximum(last - first + 1, 0)
+
+    rule_index = np.repeat(np.arange(count), counts)
+    run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    k = first[rule_index] + (np.arange(counts.sum()) - run_starts)
+    return rule_index, _occurrence_dates(rules, rule_index, k)
+
+
+def due_pending_transactions(rules: List[RecurringTransaction], as_of: date) -> List[PendingTransaction]:
+    """Pending transactions for the latest due date on or before as_of of every active, unexpired rule"""
+    rules = [
+        rule for rule in rules
+        if rule.is_active and not (rule.end_date and as_of > _to_date(rule.end_date))
+    ]
+    due_dates = latest_due_dates(RuleArrays.from_rules(rules), as_of)
+    return [
+        PendingTransaction(
+            organization_id=rule.organization_id,
+            property_id=rule.property_id,
+            transaction_type=rule.transaction_type,
+            income_type=rule.income_type,
+            expense_type=rule.expense_type,
+            amount=rule.amount,
+            description=rule.description,
+            transaction_date=datetime.combine(due_date.astype(object), datetime.min.time()),
+            recurring_transaction_id=rule.id,
+            is_confirmed=False
+        )
+        for rule, due_date in zip(rules, due_dates)
+        if not np.isnat(due_date)
+    ]
+
+
+def next_due_dates(rules: List[RecurringTransaction], after: date) -> dict:
+    """{rule id: first due date after `after`, or None when the rule has ended}"""
+    following = following_due_dates(RuleArrays.from_rules(rules), after)
+    return {
+        rule.id: None if np.isnat(due_date) else due_date.astype(object)
+        for rule, due_date in zip(rules, following)
+    }
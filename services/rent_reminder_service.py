@@ -2,38 +2,64 @@
 Rent Reminder Service
 Handles rent reminder scheduling and management
 """
+from collections import defaultdict
 from datetime import datetime, date, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import streamlit as st
-from database.database_operations import DatabaseOperations
+from database.database_operations import DatabaseOperations, DEFAULT_INSERT_BATCH_SIZE, DEFAULT_PAGE_SIZE
 from database.models import RentReminder, Property, Income
+from services.notifications import DeliveryResult, Notification, NotificationConfigError, NotificationDispatcher, build_dispatcher
 from config import get_supabase_url, get_supabase_key
 
+# Delivery results recorded, and reminders advanced, per batch
+REMINDER_BATCH_SIZE = 200
+
+# Days until a reminder nobody could be notified of is tried again, and the days it may
+# fail on (since it was last sent) before it is no longer retried at all
+DELIVERY_RETRY_DAYS = 1
+MAX_DELIVERY_FAILURE_DAYS = 3
+
+# Days until a reminder whose owner has no address on any enabled channel comes up again,
+# the same spacing as sent reminders (mark_reminders_sent)
+REMINDER_INTERVAL_DAYS = 5
+
 class RentReminderService:
-    def __init__(self):
+    def __init__(self, dispatcher: Optional[NotificationDispatcher] = None):
         self.db = DatabaseOperations()
+        self._dispatcher = dispatcher
+    
+    @property
+    def dispatcher(self) -> NotificationDispatcher:
+        """Notification dispatcher, built from the notification settings on first use"""
+        if self._dispatcher is None:
+            self._dispatcher = build_dispatcher()
+        return self._dispatcher
+    
+    @staticmethod
+    def _reminder_row(property_id: int, organization_id: int, user_id: str, month: int, year: int) -> dict:
+        """New rent_reminders row for a property and month"""
+        # Calculate reminder dates
+        reminder_date = date(year, month, 5)  # Start on 5th of month
+        next_reminder_date = reminder_date + timedelta(days=5)  # First reminder after 5 days
+        
+        return {
+            "property_id": property_id,
+            "organization_id": organization_id,
+            "user_id": user_id,
+            "reminder_month": month,
+            "reminder_year": year,
+            "reminder_date": reminder_date.isoformat(),
+            "next_reminder_date": next_reminder_date.isoformat(),
+            "is_rent_recorded": False,
+            "reminder_count": 0,
+            "max_reminders": 6
+        }
     
     def create_rent_reminder(self, property_id: int, organization_id: int, user_id: str, 
                            month: int, year: int) -> Optional[RentReminder]:
         """Create a new rent reminder for a property and month"""
         try:
-            # Calculate reminder dates
-            reminder_date = date(year, month, 5)  # Start on 5th of month
-            next_reminder_date = reminder_date + timedelta(days=5)  # First reminder after 5 days
-            
-            reminder_data = {
-                "property_id": property_id,
-                "organization_id": organization_id,
-                "user_id": user_id,
-                "reminder_month": month,
-                "reminder_year": year,
-                "reminder_date": reminder_date.isoformat(),
-                "next_reminder_date": next_reminder_date.isoformat(),
-                "is_rent_recorded": False,
-                "reminder_count": 0,
-                "max_reminders": 6
-            }
-            
+            reminder_data = self._reminder_row(property_id, organization_id, user_id, month, year)
             result = self.db.supabase.table("rent_reminders").insert(reminder_data).execute()
             
             if result.data:
@@ -62,12 +88,20 @@ class RentReminderService:
     def get_due_reminders(self) -> List[RentReminder]:
         """Get all reminders that are due to be sent"""
         try:
-            today = date.today().isoformat()
-            # Use raw SQL query to properly compare columns
-            result = self.db.supabase.rpc("get_due_reminders").execute()
+            # Server-side so reminder_count can be compared with max_reminders; paged by id
+            # because the RPC result is capped at max-rows like any other read
+            due_rows, last_id = [], 0
+            while True:
+                result = self.db.supabase.rpc("get_due_reminders_page", {
+                    "p_after_id": last_id, "p_limit": DEFAULT_PAGE_SIZE, "p_max_failures": MAX_DELIVERY_FAILURE_DAYS
+                }).execute()
+                due_rows.extend(result.data or [])
+                if len(result.data or []) < DEFAULT_PAGE_SIZE:
+                    break
+                last_id = result.data[-1]['id']
             
             reminders = []
-            for reminder_data in result.data:
+            for reminder_data in due_rows:
                 # Convert the result to RentReminder object
                 reminder_dict = {
                     "id": reminder_data.get("id"),
@@ -97,22 +131,29 @@ class RentReminderService:
     
     def update_reminder_sent(self, reminder_id: int) -> bool:
         """Update reminder after it has been sent"""
+        return self.mark_reminders_sent([reminder_id]) == 1
+    
+    def mark_reminders_sent(self, reminder_ids: List[int]) -> int:
+        """Advance last_sent_date, next_reminder_date and reminder_count for a batch of sent reminders in one call"""
+        if not reminder_ids:
+            return 0
         try:
-            today = date.today()
-            next_reminder = today + timedelta(days=5)
-            
-            update_data = {
-                "last_sent_date": today.isoformat(),
-                "next_reminder_date": next_reminder.isoformat(),
-                "reminder_count": self.db.supabase.rpc("increment_reminder_count", {"reminder_id": reminder_id}).execute()
-            }
-            
-            result = self.db.supabase.table("rent_reminders").update(update_data).eq("id", reminder_id).execute()
-            return len(result.data) > 0
-            
+            result = self.db.supabase.rpc("mark_reminders_sent", {"p_ids": list(reminder_ids)}).execute()
+            return result.data or 0
         except Exception as e:
-            st.error(f"Error updating reminder: {str(e)}")
-            return False
+            st.error(f"Error updating reminders: {str(e)}")
+            return 0
+    
+    def defer_reminders(self, reminder_ids: List[int], days: int) -> int:
+        """Move next_reminder_date for a batch of reminders `days` out without counting a send"""
+        if not reminder_ids:
+            return 0
+        try:
+            result = self.db.supabase.rpc("defer_reminders", {"p_ids": list(reminder_ids), "p_days": days}).execute()
+            return result.data or 0
+        except Exception as e:
+            st.error(f"Error deferring reminders: {str(e)}")
+            return 0
     
     def mark_rent_recorded(self, property_id: int, month: int, year: int, organization_id: int = None, user_id: str = None) -> bool:
         """Mark rent as recorded for a property and month"""
@@ -207,105 +248,253 @@ class RentReminderService:
             st.error(f"Error checking rent recorded: {str(e)}")
             return False
     
+    @staticmethod
+    def build_reminder_status(reminders: List[RentReminder], rent_recorded: bool) -> dict:
+        """Status dict for one property's reminders in a month"""
+        if not reminders:
+            return {
+                "has_reminder": False,
+                "rent_recorded": rent_recorded,
+                "next_reminder": None,
+                "reminder_count": 0,
+                "is_due": False
+            }
+        
+        latest_reminder = max(reminders, key=lambda r: r.reminder_count)
+        
+        # Convert next_reminder_date to date for comparison if it's a datetime
+        next_reminder_date = latest_reminder.next_reminder_date
+        if hasattr(next_reminder_date, 'date'):
+            next_reminder_date = next_reminder_date.date()
+        elif isinstance(next_reminder_date, str):
+            next_reminder_date = datetime.fromisoformat(next_reminder_date).date()
+        
+        return {
+            "has_reminder": True,
+            "rent_recorded": rent_recorded,
+            "next_reminder": latest_reminder.next_reminder_date,
+            "reminder_count": latest_reminder.reminder_count,
+            "is_due": next_reminder_date <= date.today() and not rent_recorded
+        }
+    
     def get_reminder_status(self, property_id: int, month: int, year: int) -> dict:
         """Get reminder status for a property and month"""
         try:
             reminders = self.get_reminders_for_property(property_id, month, year)
             rent_recorded = self.check_rent_recorded(property_id, month, year)
+            return self.build_reminder_status(reminders, rent_recorded)
+        except Exception as e:
+            st.error(f"Error getting reminder status: {str(e)}")
+            return self.build_reminder_status([], False)
+    
+    def get_reminder_statuses(self, organization_id: int, month: int, year: int,
+                              batch_size: int = 200) -> Dict[int, dict]:
+        """Get reminder status for every property in an organization for a month, keyed by property id.
+
+        Reads the organization's property ids, the month's reminders and the rent income for
+        those properties (paged past the PostgREST row cap, income batch_size properties per
+        query) instead of two or three queries per property.
+        """
+        try:
+            # Paged, so organizations past the max-rows cap get a status for every property
+            property_ids = [row['id'] for row in self.db.iter_rows_by_id(
+                "properties", [("eq", "organization_id", organization_id)], columns="id"
+            )]
             
-            if not reminders:
-                return {
-                    "has_reminder": False,
-                    "rent_recorded": rent_recorded,
-                    "next_reminder": None,
-                    "reminder_count": 0,
-                    "is_due": False
-                }
-            
-            latest_reminder = max(reminders, key=lambda r: r.reminder_count)
+            reminders_by_property = defaultdict(list)
+            try:
+                last_id = 0
+                while True:
+                    result = self.db.supabase.table("rent_reminders").select("*").eq(
+                        "organization_id", organization_id
+                    ).eq("reminder_year", year).eq("reminder_month", month).gt(
+                        "id", last_id
+                    ).order("id").limit(DEFAULT_PAGE_SIZE).execute()
+                    for reminder in result.data:
+                        reminders_by_property[reminder['property_id']].append(RentReminder(**reminder))
+                    if len(result.data) < DEFAULT_PAGE_SIZE:
+                        break
+                    last_id = result.data[-1]['id']
+            except Exception as e:
+                # Without the rent_reminders table, rent income alone decides the status
+                if "Could not find the table" not in str(e):
+                    raise
+                reminders_by_property.clear()
             
-            # Convert next_reminder_date to date for comparison if it's a datetime
-            next_reminder_date = latest_reminder.next_reminder_date
-            if hasattr(next_reminder_date, 'date'):
-                next_reminder_date = next_reminder_date.date()
-            elif isinstance(next_reminder_date, str):
-                next_reminder_date = datetime.fromisoformat(next_reminder_date).date()
+            # Keyed on property rather than organization: older income rows have no organization_id
+            month_start = date(year, month, 1)
+            next_month_start = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+            properties_with_rent = set()
+            for start in range(0, len(property_ids), batch_size):
+                rent_income = self.db.iter_rows("income", [
+                    ("in_", "property_id", property_ids[start:start + batch_size]),
+                    ("eq", "income_type", "rent"),
+                    ("gte", "transaction_date", month_start.isoformat()),
+                    ("lt", "transaction_date", next_month_start.isoformat()),
+                ], columns="id, property_id, transaction_date")
+                properties_with_rent.update(row['property_id'] for row in rent_income)
             
-            return {
-                "has_reminder": True,
-                "rent_recorded": rent_recorded,
-                "next_reminder": latest_reminder.next_reminder_date,
-                "reminder_count": latest_reminder.reminder_count,
-                "is_due": next_reminder_date <= date.today() and not rent_recorded
-            }
+            statuses = {}
+            for property_id in property_ids:
+                reminders = reminders_by_property.get(property_id, [])
+                # Same rule as check_rent_recorded: a reminder marked recorded or any rent income
+                rent_recorded = property_id in properties_with_rent or any(
+                    reminder.is_rent_recorded for reminder in reminders
+                )
+                statuses[property_id] = self.build_reminder_status(reminders, rent_recorded)
+            return statuses
         except Exception as e:
-            st.error(f"Error getting reminder status: {str(e)}")
-            return {
-                "has_reminder": False,
-                "rent_recorded": False,
-                "next_reminder": None,
-                "reminder_count": 0,
-                "is_due": False
-            }
+            st.error(f"Error getting reminder statuses: {str(e)}")
+            return {}
     
     def create_monthly_reminders(self, organization_id: int, user_id: str) -> int:
-        """Create reminders for all properties in an organization for the current month"""
+        """Create reminders for all properties in an organization for the current month.
+
+        Property ids are read in id-keyset pages and the reminders written in multi-row
+        upserts; properties that already have this month's reminder are skipped by the
+        (property_id, reminder_month, reminder_year) key. Returns the number of reminders created.
+        """
         try:
-            # Get all properties for the organization
-            properties = self.db.get_properties_by_organization(organization_id)
             current_date = date.today()
-            current_month = current_date.month
-            current_year = current_date.year
-            
-            reminders_created = 0
+            rows = [
+                self._reminder_row(row['id'], organization_id, user_id, current_date.month, current_date.year)
+                for row in self.db.iter_rows_by_id("properties", [("eq", "organization_id", organization_id)], columns="id")
+            ]
             
-            for property_obj in properties:
-                # Check if reminder already exists for this month
-                existing_reminders = self.get_reminders_for_property(
-                    str(property_obj.id), current_month, current_year
-                )
-                
-                if not existing_reminders:
-                    # Create new reminder
-                    reminder = self.create_rent_reminder(
-                        str(property_obj.id), organization_id, user_id, 
-                        current_month, current_year
-                    )
-                    if reminder:
-                        reminders_created += 1
-            
-            return reminders_created
+            created = 0
+            for start in range(0, len(rows), DEFAULT_INSERT_BATCH_SIZE):
+                result = self.db.supabase.table("rent_reminders").upsert(
+                    rows[start:start + DEFAULT_INSERT_BATCH_SIZE],
+                    on_conflict="property_id,reminder_month,reminder_year",
+                    ignore_duplicates=True
+                ).execute()
+                created += len(result.data or [])
+            return created
             
         except Exception as e:
             st.error(f"Error creating monthly reminders: {str(e)}")
             return 0
     
-    def send_reminder_notification(self, reminder: RentReminder, property: Property) -> bool:
-        """Send a reminder notification (placeholder for email/SMS integration)"""
+    def get_user_contacts(self, user_ids: List[str]) -> Dict[str, dict]:
+        """Email and phone for each user id, as {user_id: {"email": ..., "phone": ...}}"""
+        contacts = {}
+        user_ids = sorted({user_id for user_id in user_ids if user_id})
         try:
-            # This is where you would integrate with email/SMS services
-            # For now, we'll just log the reminder
-            st.info(f"🔔 Rent Reminder: {property.address} - Month {reminder.reminder_month}/{reminder.reminder_year}")
-            st.info(f"Reminder #{reminder.reminder_count + 1} of {reminder.max_reminders}")
-            
-            # Update the reminder
-            return self.update_reminder_sent(reminder.id)
-            
+            for start in range(0, len(user_ids), DEFAULT_PAGE_SIZE):
+                result = self.db.supabase.rpc("get_user_contacts", {
+                    "p_user_ids": user_ids[start:start + DEFAULT_PAGE_SIZE]
+                }).execute()
+                contacts.update((str(row['user_id']), row) for row in result.data or [])
+            return contacts
         except Exception as e:
-            st.error(f"Error sending reminder: {str(e)}")
-            return False
+            st.error(f"Error fetching reminder recipients: {str(e)}")
+            return contacts
     
-    def process_due_reminders(self) -> int:
-        """Process all due reminders"""
-        due_reminders = self.get_due_reminders()
-        processed = 0
+    def build_notifications(self, batch: List[Tuple[RentReminder, Property]]) -> List[Notification]:
+        """One notification per reminder and enabled channel the reminder's user has an address for"""
+        contacts = self.get_user_contacts([reminder.user_id for reminder, _ in batch])
+        notifications = []
+        for reminder, property_obj in batch:
+            contact = contacts.get(str(reminder.user_id), {})
+            subject = f"Rent reminder: {property_obj.address} ({reminder.reminder_month:02d}/{reminder.reminder_year})"
+            body = (
+                f"Rent for {property_obj.name} at {property_obj.address} has not been recorded for "
+                f"{reminder.reminder_month:02d}/{reminder.reminder_year}. "
+                f"This is reminder {reminder.reminder_count + 1} of {reminder.max_reminders}."
+            )
+            for channel, recipient in (("email", contact.get("email")), ("sms", contact.get("phone"))):
+                if recipient and channel in self.dispatcher.channels:
+                    notifications.append(Notification(
+                        key=reminder.id, organization_id=reminder.organization_id,
+                        channel=channel, recipient=recipient, subject=subject, body=body
+                    ))
+        return notifications
+    
+    def record_deliveries(self, results: List[DeliveryResult]) -> int:
+        """Write a batch of delivery results to reminder_notifications in one insert"""
+        if not results:
+            return 0
+        rows = [{
+            "reminder_id": result.notification.key,
+            "organization_id": result.notification.organization_id,
+            "channel": result.notification.channel,
+            "recipient": result.notification.recipient,
+            "delivered": result.delivered,
+            "attempts": result.attempts,
+            "error": result.error
+        } for result in results]
+        try:
+            self.db.supabase.table("reminder_notifications").insert(rows, returning="minimal").execute()
+            return len(rows)
+        except Exception as e:
+            st.error(f"Error recording reminder deliveries: {str(e)}")
+            return 0
+    
+    def send_reminder_notifications(self, batch: List[Tuple[RentReminder, Property]],
+                                    batch_size: int = REMINDER_BATCH_SIZE) -> List[int]:
+        """Send reminders on every enabled channel and record them, returning the ids delivered on at least one.
+
+        Delivery results are written and the delivered reminders advanced (mark_reminders_sent)
+        batch_size results at a time while the dispatcher is still sending. Reminders that
+        could not be delivered are deferred DELIVERY_RETRY_DAYS, and reminders whose owner
+        has no address on an enabled channel are deferred to their next regular reminder,
+        so neither is retried on every run.
+        """
+        notifications = self.build_notifications(batch)
+        addressed = {notification.key for notification in notifications}
+        unaddressed = sorted({reminder.id for reminder, _ in batch} - addressed)
+        if unaddressed:
+            self.defer_reminders(unaddressed, REMINDER_INTERVAL_DAYS)
+        if not notifications:
+            return []
+        sent = []
         
-        for reminder in due_reminders:
-            # Get property details
-            property_obj = self.db.get_property_by_id(reminder.property_id)
-            if property_obj:
-                # Send reminder
-                if self.send_reminder_notification(reminder, property_obj):
-                    processed += 1
+        def record(results: List[DeliveryResult]):
+            self.record_deliveries(results)
+            # A reminder sent on both email and SMS is only advanced once
+            delivered = sorted({result.notification.key for result in results if result.delivered} - set(sent))
+            if delivered:
+                self.mark_reminders_sent(delivered)
+                sent.extend(delivered)
         
-        return processed
+        self.dispatcher.dispatch(notifications, on_results=record, batch_size=batch_size)
+        self.defer_reminders(sorted(addressed - set(sent)), DELIVERY_RETRY_DAYS)
+        return sent
+    
+    def send_reminder_notification(self, reminder: RentReminder, property: Property) -> bool:
+        """Send a reminder notification and record it"""
+        return bool(self.send_reminder_notifications([(reminder, property)]))
+    
+    def process_due_reminders(self, batch_size: int = REMINDER_BATCH_SIZE) -> int:
+        """Process all due reminders.
+
+        Properties for every due reminder are fetched up front with in_ queries and all
+        notifications go through the dispatcher's worker pool in one run; results and
+        reminder updates are written batch_size at a time as deliveries complete.
+        Nothing is sent or updated while notifications are off (no NOTIFICATION_CHANNELS).
+        """
+        try:
+            if not self.dispatcher.channels:
+                st.warning("Reminder notifications are off: set NOTIFICATION_CHANNELS to send them")
+                return 0
+        except NotificationConfigError as e:
+            st.error(f"Reminder notifications are misconfigured: {str(e)}")
+            return 0
+        due_reminders = self.get_due_reminders()
+        if not due_reminders:
+            return 0
+        properties = self.db.get_properties_by_ids([reminder.property_id for reminder in due_reminders])
+        if properties is None:
+            # The read failed (already reported); the reminders stay due for the next run
+            return 0
+        # Deleted or not visible to this client: push them back instead of re-reading them every run
+        orphaned = [reminder.id for reminder in due_reminders if reminder.property_id not in properties]
+        if orphaned:
+            st.warning(f"Deferring {len(orphaned)} due reminders whose property could not be found")
+            self.defer_reminders(orphaned, REMINDER_INTERVAL_DAYS)
+        batch = [
+            (reminder, properties[reminder.property_id])
+            for reminder in due_reminders
+            if reminder.property_id in properties
+        ]
+        return len(self.send_reminder_notifications(batch, batch_size))